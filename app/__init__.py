@@ -1,6 +1,13 @@
 # __init__.py
 from flask import Flask
 
-from .app import application
+from .app import create_app, get_application
 from .model.rate_output import RateOutput
 from .model.price_output import PriceOutput
+
+
+def __getattr__(name: str):
+    # The application is created on first access, see app.app.get_application
+    if name == 'application':
+        return get_application()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
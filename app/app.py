@@ -1,123 +1,478 @@
 import json
-import logging
 import os
+import threading
+
+from time import perf_counter
+from typing import IO, Iterator, Optional
+
+from flask import Blueprint, Flask, current_app, g, request, jsonify, render_template, stream_with_context
+
+from app.model import EncodedOutput, PriceBatchOutput, PriceOutput, RateOutput
+from app.profiling import ProfilingMiddleware
+from app.request_logging import RouteSampler, configure_logging, parse_sampling
+from libs.rates import (RatesService, PriceService, RatesRepository, LotRatesRepository, SharedRatesRepository,
+                        SqliteRatesRepository)
+from libs.rates.price_metrics import PriceMetrics
+from libs.rates.rate_snapshot import RateSnapshot
+from libs.rates.rate_table import RateTable
+from libs.rates.rate_validator import validate_rates, validation_executor
+from libs.utils.datetime_helper import isodate_to_datetime
+from libs.utils.errors import RateConflictError, RatesValidationError
+from libs.utils.json_stream import DEFAULT_CHUNK_SIZE, iter_array_items
+from libs.utils.metrics import CONTENT_TYPE, Registry
+
+encoded_rates: Optional[EncodedOutput] = None
+_application: Optional[Flask] = None
+_application_lock = threading.Lock()
+
+MAX_BATCH_SIZE = 1000
+VERSION_HEADER = 'X-Rates-Version'
+PRICE_CACHE_SIZE = 4096
+STREAMING_THRESHOLD = 1024 * 1024
+JSON_WHITESPACE = b' \t\n\r'
+PARALLEL_VALIDATION_THRESHOLD = 8 * 1024 * 1024
+RATES_DATABASE = os.environ.get('RATES_DATABASE')
+RATES_SNAPSHOT = os.environ.get('RATES_SNAPSHOT')
+RATES_SHARED_MEMORY = os.environ.get('RATES_SHARED_MEMORY')
+STRICT_RATES = os.environ.get('RATES_STRICT', '').lower() in ('1', 'true', 'yes')
+RATES_PROFILE_DIR = os.environ.get('RATES_PROFILE_DIR')
+RATES_PROFILE_TOKEN = os.environ.get('RATES_PROFILE_TOKEN')
+RATES_LOG_LEVEL = os.environ.get('RATES_LOG_LEVEL', 'INFO')
+RATES_LOG_SAMPLING = os.environ.get('RATES_LOG_SAMPLING', '')
+READY_CONFIG = 'RATES_READY'
+# Paths under /prices taken by other endpoints than the prices of a lot, so no lot can use them as id
+RESERVED_LOT_IDS = frozenset({'batch'})
+
+api = Blueprint('api', __name__)
+log_sampler = RouteSampler(parse_sampling(RATES_LOG_SAMPLING))
+
+if RATES_DATABASE:
+    rate_repository = SqliteRatesRepository(RATES_DATABASE)
+elif RATES_SHARED_MEMORY:
+    rate_repository = SharedRatesRepository(RATES_SHARED_MEMORY)
+else:
+    rate_repository = RatesRepository()
+
+metrics = Registry()
+price_metrics = PriceMetrics(metrics)
+parse_latency = price_metrics.stage('parse')
+serialize_latency = price_metrics.stage('serialize')
+request_latency = metrics.histogram('rates_http_request_duration_seconds', "Latency of HTTP requests",
+                                    ['route', 'method', 'status'])
+
+price_service = PriceService(rates_repository=rate_repository, cache_size=PRICE_CACHE_SIZE, metrics=price_metrics)
+rate_service = RatesService(rates_repository=rate_repository, strict=STRICT_RATES)
+lot_rates_repository = LotRatesRepository()
+
+metrics.callback('rates_version', "Version of the current rate set", lambda: rate_repository.version)
+metrics.callback('rates_count', "Rates in the current rate set", lambda: len(rate_repository.table.ids()))
+metrics.callback('rates_lots', "Parking lots with their own rate set", lambda: len(lot_rates_repository))
+metrics.callback('rates_price_cache_hits_total', "Prices served from the price cache",
+                 lambda: price_service.cache.hits, kind='counter')
+metrics.callback('rates_price_cache_misses_total', "Prices not found in the price cache",
+                 lambda: price_service.cache.misses, kind='counter')
+metrics.callback('rates_price_cache_hit_ratio', "Share of the price cache lookups served from it",
+                 lambda: price_service.cache.hits / max(price_service.cache.hits + price_service.cache.misses, 1))
+
+
+def create_app(ingest: bool = True, profile_dir: Optional[str] = RATES_PROFILE_DIR,
+               profile_token: Optional[str] = RATES_PROFILE_TOKEN) -> Flask:
+    """
+    Creates the application, ingesting the rates and building their indexes before it serves requests.
 
-from flask import Flask, request, jsonify, render_template
+    Rates persisted by a previous run are kept instead of being overwritten by the file.
 
-from app.model import PriceOutput, RateOutput
-from libs.rates.dto import Rate
-from libs.rates import RatesService, PriceService, RatesRepository
-from libs.utils.datetime_helper import isodate_to_datetime
+    Parameters:
+        ingest (bool): Whether to ingest the rates. The application only reports ready once they are.
+        profile_dir (str): Directory storing the profiles of requests sent with the X-Profile header.
+            Requests are never profiled without it.
+        profile_token (str): Token requests must send in the X-Profile-Token header to be profiled.
+            Requests are never profiled without it.
 
-ingestion_completed = False
+    Returns:
+        Flask: The application.
+    """
+    # Configured before the Flask logger is created, so that it does not add its own handler
+    configure_logging(RATES_LOG_LEVEL, log_sampler)
+    app = Flask(__name__)
+    app.register_blueprint(api)
+    app.config[READY_CONFIG] = False
+
+    if profile_dir and profile_token:
+        app.wsgi_app = ProfilingMiddleware(app.wsgi_app, profile_dir, profile_token, lambda: rate_repository.version,
+                                           VERSION_HEADER)
+    elif profile_dir:
+        app.logger.warning("RATES_PROFILE_DIR is set without RATES_PROFILE_TOKEN, requests are not profiled")
+
+    if ingest:
+        with app.app_context():
+            if rate_repository.version:
+                price_service.compile_rates()
+                ingested = True
+            else:
+                ingested = ingest_rates()
+        app.config[READY_CONFIG] = ingested
+
+    return app
 
-application = Flask(__name__)
-rate_repository = RatesRepository()
-price_service = PriceService(rates_repository=rate_repository)
-rate_service = RatesService(rates_repository=rate_repository)
 
-# Set up logging
-application.logger.setLevel(logging.DEBUG)
+@api.before_app_request
+def start_timer():
+    g.request_started = perf_counter()
+    if request.url_rule is not None:
+        g.log_sampled = log_sampler.sample(request.url_rule.rule)
 
 
+@api.after_app_request
+def record_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        request_latency.labels(route, request.method, str(response.status_code)).observe(perf_counter() - started)
+    return response
 
-@application.route('/')
+
+@api.route('/metrics')
+def metrics_endpoint():
+    """
+    Metrics of the application in the Prometheus text format.
+
+    Returns:
+        Response with the request and pricing latency histograms, the rate set size and version,
+        and the price cache statistics.
+    """
+    return current_app.response_class(metrics.render(), mimetype=None, content_type=CONTENT_TYPE)
+
+
+@api.route('/')
 def home():
     return render_template('index.html')
 
 
-@application.before_request
-def before_first_request():
+@api.route('/ready')
+def ready():
     """
-    Runs the ingestion process before the first request if not already completed.
+    Readiness probe, successful once the rates are ingested and indexed.
+
+    Returns:
+        JSON response with the readiness and the version of the rates.
     """
-    global ingestion_completed
-    if not ingestion_completed:
-        ingest_rates()
-        ingestion_completed = True
+    if not current_app.config[READY_CONFIG]:
+        return jsonify({'ready': False}), 503
+    return jsonify({'ready': True, 'version': rate_repository.version})
 
 
-def ingest_rates():
+def ingest_rates() -> bool:
     """
-    Runs the ingestion process to update rates from a JSON file.
+    Runs the ingestion process to update rates from the configured snapshot file or a JSON file.
+
+    Returns:
+        bool: False if the rates of the file could not be stored, True otherwise, including
+            when there is no file to ingest.
     """
-    application.logger.info("Ingestion process running")
+    current_app.logger.info("Ingestion process running")
+
+    # A binary snapshot is mapped in place, skipping the parsing and validation of the JSON file
+    if RATES_SNAPSHOT:
+        rate_repository.load_snapshot_file(RATES_SNAPSHOT)
+        price_service.compile_rates()
+        current_app.logger.info("Rates loaded from snapshot.")
+        return True
 
-    static_folder = application.static_folder
+    static_folder = current_app.static_folder
     file_path = os.path.join(static_folder, 'rates.json')
 
     if not os.path.exists(file_path):
-        application.logger.warning("File not found. Could not ingest rates.")
-        return
+        current_app.logger.warning("File not found. Could not ingest rates.")
+        return True
 
-    # Read and parse the JSON data from the file
-    with open(file_path, 'r') as file:
+    ingested = False
+    # Read and parse the JSON data from the file, one rate at a time
+    with open(file_path, 'rb') as file:
         try:
-            # Load JSON data from file
-            rates_json = json.load(file)
-
-            # Extract rates from JSON data and convert them into Rate objects
-            rates_list = [Rate.to_model(rate) for rate in rates_json.get('rates', [])]
+            # Validate and store the rates using the rate_service
+            executor = validation_executor_for(os.path.getsize(file_path))
+            rate_service.ingest_rates(iter_array_items(file, 'rates'), executor)
+            price_service.compile_rates()
+            ingested = True
 
-            # Update rates using the rate_service
-            rate_service.update_rates(rates_list)
-
-            application.logger.info("Rates updated successfully.")
+            current_app.logger.info("Rates updated successfully.")
         except json.JSONDecodeError as e:
-            application.logger.error("Error decoding JSON:", e)
+            current_app.logger.error("Error decoding JSON: %s", e)
         except Exception as e:
-            application.logger.error("Error occurred while ingesting rates:", e)
+            current_app.logger.error("Error occurred while ingesting rates: %s", e)
         finally:
             file.close()
 
-    application.logger.info("Ingestion process finished.")
+    current_app.logger.info("Ingestion process finished.")
+    return ingested
 
 
-@application.route('/rates', methods=['GET', 'PUT'])
+@api.route('/rates', methods=['GET', 'PUT', 'PATCH'])
 def rates():
     """
      Retrieves or updates rates based on the HTTP request method.
 
      For GET requests, retrieves a list of rates.
      For PUT requests, updates the rates with new data.
+     For PATCH requests, upserts and deletes rates by id.
 
      Returns:
      JSON response with rates or error message.
      """
     if request.method == 'GET':
-        application.logger.info("Fetching all rates...")
-        rates_list = rate_service.get_rates()
-        result = [RateOutput.from_model(rate).to_json() for rate in rates_list]
-        return jsonify({"rates": result})
+        current_app.logger.info("Fetching all rates...")
+        output = get_encoded_rates()
+
+        response = current_app.response_class(output.body, mimetype='application/json')
+        response.set_etag(output.etag)
+        response.headers[VERSION_HEADER] = str(output.version)
+        return response.make_conditional(request)
 
     elif request.method == 'PUT':
-        application.logger.warning("Overwriting existing rates with new rates...")
-        try:
-            # Convert rates to model objects using map
-            if isinstance(request.json, str):
-                data: dict = json.loads(request.json)
-            else:
-                data: dict = request.json
+        current_app.logger.warning("Overwriting existing rates with new rates...")
+        return put_rates(rate_service, on_update=price_service.compile_rates)
+    elif request.method == 'PATCH':
+        current_app.logger.info("Patching rates...")
+        return patch_rates(rate_service, on_update=price_service.compile_rates)
+    else:
+        current_app.logger.error("Method not allowed.")
+        return 'Method not allowed', 405
+
 
-            rates_input = [Rate.to_model(rate) for rate in data.get('rates', [])]
+def put_rates(service: RatesService, on_update=None):
+    """
+    Updates the rates of a service from the JSON body of the request.
 
-            # Update rates and convert them back to model objects using map
-            rates_list = rate_service.update_rates(rates_input)
-            result = [RateOutput.from_model(rate).to_json() for rate in rates_list]
+    Parameters:
+        service (RatesService): Service whose rates are overwritten.
+        on_update (callable): Called once the rates are updated.
 
-            return jsonify({"rates": result})
-        except ValueError as e:
-            application.logger.error("Error updating rates: %s", e)
-            return jsonify({'error': str(e)}), 400
-        except Exception as e:
-            application.logger.error("Error updating rates: %s", e)
-            return jsonify({'error': str(e)}), 400
+    Overlapping rates are listed by id under 'conflicts', or the update is rejected with
+    their indexes in strict mode. At most 100 pairs are listed.
+
+    Returns:
+        JSON response with the stored rates or an error message.
+    """
+    try:
+        # Large bodies are parsed and stored incrementally instead of being loaded at once
+        if request.content_length is None or request.content_length > STREAMING_THRESHOLD:
+            executor = validation_executor_for(request.content_length)
+            table = service.ingest_rates(iter_rates_json(request.stream), executor)
+            if on_update is not None:
+                on_update()
+            conflicts = service.get_conflicts()
+            if conflicts:
+                current_app.logger.warning("%d stored rates overlap, e.g. %s", len(conflicts), conflicts.pairs[:10])
+            body = encode_rates(table, conflicts.pairs)
+            return current_app.response_class(stream_with_context(body), mimetype='application/json')
+
+        # Convert rates to model objects using map
+        if isinstance(request.json, str):
+            data: dict = json.loads(request.json)
+        else:
+            data: dict = request.json
+
+        rates_input = list(validate_rates(data.get('rates', [])))
+
+        # Update rates and convert them back to model objects using map
+        rates_list = service.update_rates(rates_input)
+        if on_update is not None:
+            on_update()
+        result = [RateOutput.from_model(rate, rate_id).to_json() for rate_id, rate in enumerate(rates_list)]
+
+        conflicts = service.get_conflicts()
+        if conflicts:
+            current_app.logger.warning("%d stored rates overlap, e.g. %s", len(conflicts), conflicts.pairs[:10])
+            return jsonify({"rates": result, "conflicts": conflicts.pairs})
+        return jsonify({"rates": result})
+    except RatesValidationError as e:
+        current_app.logger.error("Error updating rates: %s", e)
+        errors = [{'index': index, 'error': error} for index, error in e.errors]
+        return jsonify({'error': str(e), 'errors': errors}), 400
+    except RateConflictError as e:
+        current_app.logger.error("Error updating rates: %s", e)
+        return jsonify({'error': str(e), 'conflicts': e.conflicts}), 400
+    except ValueError as e:
+        current_app.logger.error("Error updating rates: %s", e)
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error("Error updating rates: %s", e)
+        return jsonify({'error': str(e)}), 400
+
+
+def patch_rates(service: RatesService, on_update=None):
+    """
+    Upserts and deletes rates of a service from the JSON body of the request.
+
+    The body holds an 'upsert' list of rates, replacing the rate given by their 'id' or
+    inserted if they have none, and a 'delete' list of rate ids.
+
+    Parameters:
+        service (RatesService): Service whose rates are patched.
+        on_update (callable): Called once the rates are updated.
+
+    As for PUT, overlapping rates are listed by id under 'conflicts', or the patch is
+    rejected in strict mode.
+
+    Returns:
+        JSON response with the upserted rates and deleted ids, or an error message.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'A JSON object with upsert and delete lists is required'}), 400
+
+    upserts_json = data.get('upsert', [])
+    deletes = data.get('delete', [])
+    if not isinstance(upserts_json, list) or not isinstance(deletes, list):
+        return jsonify({'error': 'Upsert and delete must be lists'}), 400
+    if any(not is_rate_id(rate_id) for rate_id in deletes):
+        return jsonify({'error': 'Rate ids to delete must be non-negative integers'}), 400
+
+    try:
+        rate_ids = []
+        rates_json = []
+        for rate in upserts_json:
+            rate = dict(rate) if isinstance(rate, dict) else rate
+            rate_id = rate.pop('id', None) if isinstance(rate, dict) else None
+            if rate_id is not None and not is_rate_id(rate_id):
+                return jsonify({'error': 'Rate ids to upsert must be non-negative integers'}), 400
+            rate_ids.append(rate_id)
+            rates_json.append(rate)
+
+        rates_list = list(validate_rates(rates_json))
+        ids = service.patch_rates(list(zip(rate_ids, rates_list)), deletes)
+        if on_update is not None:
+            on_update()
+
+        result = [RateOutput.from_model(rate, rate_id).to_json() for rate_id, rate in zip(ids, rates_list)]
+        output = {"rates": result, "deleted": deletes}
+        conflicts = service.get_conflicts()
+        if conflicts:
+            current_app.logger.warning("%d stored rates overlap, e.g. %s", len(conflicts), conflicts.pairs[:10])
+            output["conflicts"] = conflicts.pairs
+        return jsonify(output), 200, {VERSION_HEADER: str(service.rates_repository.version)}
+    except RatesValidationError as e:
+        current_app.logger.error("Error patching rates: %s", e)
+        errors = [{'index': index, 'error': error} for index, error in e.errors]
+        return jsonify({'error': str(e), 'errors': errors}), 400
+    except RateConflictError as e:
+        current_app.logger.error("Error patching rates: %s", e)
+        return jsonify({'error': str(e), 'conflicts': e.conflicts}), 400
+    except KeyError as e:
+        current_app.logger.error("Error patching rates: unknown rate id %s", e.args[0])
+        return jsonify({'error': f'Unknown rate id: {e.args[0]}'}), 404
+    except Exception as e:
+        current_app.logger.error("Error patching rates: %s", e)
+        return jsonify({'error': str(e)}), 400
+
+
+def is_rate_id(rate_id) -> bool:
+    return isinstance(rate_id, int) and not isinstance(rate_id, bool) and rate_id >= 0
+
+
+def validation_executor_for(size: Optional[int]):
+    """
+    Returns the process pool validating rates in parallel for payloads known to be large
+    enough to make up for it, or None to validate inline.
+
+    Parameters:
+        size (int): Size of the payload in bytes, or None if unknown, e.g. for chunked requests.
+    """
+    if size is not None and size > PARALLEL_VALIDATION_THRESHOLD:
+        return validation_executor()
+    return None
+
+
+def iter_rates_json(stream: IO) -> Iterator[dict]:
+    """
+    Parses the rates of a PUT body one at a time, from a binary stream.
+
+    Accepts the same bodies as when they are parsed at once: a JSON object with a 'rates'
+    array, or a JSON string holding such an object, which is then decoded whole.
+
+    Parameters:
+        stream (IO): Binary stream of the body.
+
+    Returns:
+        Iterator[dict]: The rates, in their JSON form.
+    """
+    head = b''
+    while not head.lstrip(JSON_WHITESPACE):
+        chunk = stream.read(DEFAULT_CHUNK_SIZE)
+        if not chunk:
+            break
+        head += chunk
+
+    if head.lstrip(JSON_WHITESPACE).startswith(b'"'):
+        body = head + b''.join(iter(lambda: stream.read(DEFAULT_CHUNK_SIZE), b''))
+        yield from json.loads(json.loads(body)).get('rates', [])
     else:
-        application.logger.error("Method not allowed.")
-        return 'Method not allowed', 405
+        yield from iter_array_items(_PrefixedStream(head, stream), 'rates')
+
 
+class _PrefixedStream:
+    """
+    Binary stream reading bytes already read from another stream, then the rest of it.
+    """
 
-@application.route('/prices', methods=['GET'])
+    def __init__(self, prefix: bytes, stream: IO):
+        self.prefix = prefix
+        self.stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        if self.prefix:
+            prefix, self.prefix = self.prefix, b''
+            return prefix
+        return self.stream.read(size)
+
+
+def encode_rates(table: RateTable, conflicts: Optional[list[tuple[int, int]]] = None, rates_per_chunk: int = 1000):
+    """
+    Serializes the rates of a table as a JSON body, in chunks of rates.
+
+    Parameters:
+        table (RateTable): Rates to serialize.
+        conflicts (list[tuple[int, int]]): Overlapping pairs of rate ids, written after the rates if any.
+        rates_per_chunk (int): Number of rates serialized per chunk.
+
+    Returns:
+        Iterator[str]: Chunks of the '{"rates": [...], "conflicts": [...]}' body.
+    """
+    dumps = current_app.json.dumps
+    ids = table.ids()
+    yield '{"rates":['
+    for chunk_start in range(0, len(ids), rates_per_chunk):
+        chunk = ids[chunk_start:chunk_start + rates_per_chunk]
+        separator = ',' if chunk_start else ''
+        yield separator + ','.join(dumps(RateOutput.from_model(table.rate(rate_id), rate_id).to_json())
+                                   for rate_id in chunk)
+    if conflicts:
+        yield '],"conflicts":' + dumps(conflicts) + '}\n'
+    else:
+        yield ']}\n'
+
+
+def get_encoded_rates() -> EncodedOutput:
+    """
+    Returns the serialized GET /rates body for the current rates.
+
+    The body only changes when the rates are updated, so it is encoded once per
+    rates version and reused until the next update.
+    """
+    global encoded_rates
+    snapshot = rate_repository.snapshot
+    output = encoded_rates
+    if output is None or output.version != snapshot.version:
+        rates_list = rate_service.get_rates(snapshot)
+        result = [RateOutput.from_model(rate, rate_id).to_json()
+                  for rate_id, rate in zip(snapshot.table.ids(), rates_list)]
+        output = EncodedOutput(snapshot.version, current_app.json.dumps({"rates": result}).encode())
+        encoded_rates = output
+    return output
+
+
+@api.route('/prices', methods=['GET'])
 def prices():
     """
     Endpoint to retrieve the price for a specific time range.
@@ -126,6 +481,20 @@ def prices():
     and calculates the price using the PriceService. Returns the price
     in JSON format.
 
+    Returns:
+        JSON response containing the price or an error message.
+    """
+    return get_price(price_service, rate_repository.snapshot)
+
+
+def get_price(service: PriceService, snapshot: RateSnapshot):
+    """
+    Prices the time range given by the start and end query parameters.
+
+    Parameters:
+        service (PriceService): Service calculating the price.
+        snapshot (RateSnapshot): Rates to price against.
+
     Returns:
         JSON response containing the price or an error message.
     """
@@ -133,7 +502,7 @@ def prices():
     start_date = request.args.get('start', '')
     end_date = request.args.get('end', '')
 
-    application.logger.info(f"Fetching price for start: {start_date} and end: {end_date}")
+    current_app.logger.info("Fetching price for start: %s and end: %s", start_date, end_date)
 
     # Validate start and end dates
     if not start_date or not end_date:
@@ -141,22 +510,140 @@ def prices():
 
     try:
         # Convert start and end dates to datetime objects
+        began = perf_counter()
         start = isodate_to_datetime(start_date)
         end = isodate_to_datetime(end_date)
+        parse_latency.observe(perf_counter() - began)
 
         # Get the price for the specified time range
-        price = price_service.get_price(start, end)
+        price = service.get_price(start, end, snapshot)
 
-        # Return the price in JSON format
-        return PriceOutput(price).to_json()
+        # Return the price in JSON format, along with the version of the rates that produced it
+        began = perf_counter()
+        response = jsonify(PriceOutput(price).to_json()), 200, {VERSION_HEADER: str(snapshot.version)}
+        serialize_latency.observe(perf_counter() - began)
+        return response
 
     except ValueError as e:
-        application.logger.error("Error fetching prices:", e)
+        current_app.logger.error("Error fetching prices: %s", e)
         return jsonify({'error': str(e)}), 400
     except Exception as e:
-        application.logger.error("Error fetching prices:", e)
+        current_app.logger.error("Error fetching prices: %s", e)
         return jsonify({'error': str(e)}), 400
 
 
+@api.route('/rates/<lot_id>', methods=['GET', 'PUT'])
+def lot_rates(lot_id: str):
+    """
+     Retrieves or updates the rates of a parking lot.
+
+     For GET requests, retrieves the rates of the lot.
+     For PUT requests, overwrites the rates of the lot, creating it if needed.
+
+     Returns:
+     JSON response with rates or error message.
+     """
+    service = RatesService(rates_repository=lot_rates_repository.lot(lot_id), strict=STRICT_RATES)
+
+    if request.method == 'GET':
+        current_app.logger.info("Fetching rates of lot %s...", lot_id)
+        if lot_id not in lot_rates_repository:
+            return jsonify({'error': f'Unknown lot: {lot_id}'}), 404
+        result = [RateOutput.from_model(rate, rate_id).to_json() for rate_id, rate in enumerate(service.get_rates())]
+        return jsonify({"rates": result})
+
+    if lot_id in RESERVED_LOT_IDS:
+        return jsonify({'error': f'Reserved lot id: {lot_id}'}), 400
+    current_app.logger.warning("Overwriting rates of lot %s...", lot_id)
+    return put_rates(service)
+
+
+@api.route('/prices/<lot_id>', methods=['GET'])
+def lot_prices(lot_id: str):
+    """
+    Endpoint to retrieve the price for a specific time range in a parking lot.
+
+    Returns:
+        JSON response containing the price or an error message.
+    """
+    if lot_id in RESERVED_LOT_IDS:
+        # e.g. GET /prices/batch, which only accepts POST
+        return jsonify({'error': 'Method not allowed'}), 405, {'Allow': 'POST'}
+    if lot_id not in lot_rates_repository:
+        return jsonify({'error': f'Unknown lot: {lot_id}'}), 404
+
+    service = lot_rates_repository.price_service(lot_id, price_metrics)
+    return get_price(service, service.rate_repository.snapshot)
+
+
+@api.route('/prices/batch', methods=['POST'])
+def prices_batch():
+    """
+    Endpoint to retrieve the prices for a list of time ranges.
+
+    Expects a JSON body with an 'intervals' list of objects holding start and end
+    dates in ISO-8601 format. All intervals are priced against the same rates and
+    errors are reported inline, one result per interval.
+
+    Returns:
+        JSON response containing one price or error per interval, or an error message.
+    """
+    data = request.get_json(silent=True)
+    intervals = data.get('intervals') if isinstance(data, dict) else None
+
+    if not isinstance(intervals, list):
+        return jsonify({'error': 'A list of intervals is required'}), 400
+    if len(intervals) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'At most {MAX_BATCH_SIZE} intervals can be priced at once'}), 400
+
+    current_app.logger.info("Fetching prices for %d intervals", len(intervals))
+
+    # Parse every interval, keeping errors in place of the ones that cannot be priced
+    results: list = [None] * len(intervals)
+    parsed = []
+    for position, item in enumerate(intervals):
+        start_date = item.get('start', '') if isinstance(item, dict) else ''
+        end_date = item.get('end', '') if isinstance(item, dict) else ''
+        if not start_date or not end_date:
+            results[position] = ValueError('Start and end date times are required')
+            continue
+        try:
+            parsed.append((position, isodate_to_datetime(start_date), isodate_to_datetime(end_date)))
+        except (TypeError, ValueError) as e:
+            results[position] = ValueError(str(e))
+
+    snapshot = rate_repository.snapshot
+    prices_list = price_service.get_price_batch([(start, end) for _, start, end in parsed], snapshot)
+    for (position, _, _), price in zip(parsed, prices_list):
+        results[position] = price
+
+    return PriceBatchOutput(results).to_json(), 200, {VERSION_HEADER: str(snapshot.version)}
+
+
+def get_application() -> Flask:
+    """
+    Returns the application served by default, creating it on first use.
+
+    It is not created when the module is imported, so that processes importing it without
+    serving requests, such as the workers validating rates, do not ingest the rates.
+
+    Returns:
+        Flask: The application.
+    """
+    global _application
+    if _application is None:
+        with _application_lock:
+            if _application is None:
+                _application = create_app()
+    return _application
+
+
+def __getattr__(name: str):
+    # `application` is resolved on first access, e.g. by the WSGI server
+    if name == 'application':
+        return get_application()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 if __name__ == '__main__':
-    application.run(port=5000)
+    get_application().run(port=5000)
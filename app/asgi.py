@@ -0,0 +1,332 @@
+"""
+ASGI entry point serving /rates, /prices and /metrics from an asyncio event loop.
+
+It shares the rates, services and JSON contract of the Flask application, but waiting on
+slow clients costs no worker thread: requests are read and answered on the event loop,
+prices are computed inline and rate updates are offloaded to an executor, which parses
+large or chunked bodies while they are still being received.
+
+Usage:
+    uvicorn app.asgi:application
+    python -m app.asgi [--host HOST] [--port PORT]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Optional
+from urllib.parse import parse_qs
+
+from app.app import (STREAMING_THRESHOLD, VERSION_HEADER, get_application, get_encoded_rates, iter_rates_json, metrics,
+                     price_service, rate_repository, rate_service, request_latency, validation_executor_for)
+from app.model import PriceOutput, RateOutput
+from libs.rates.rate_validator import validate_rates
+from libs.utils.datetime_helper import isodate_to_datetime
+from libs.utils.errors import RateConflictError, RatesValidationError
+from libs.utils.metrics import CONTENT_TYPE
+
+logger = logging.getLogger(__name__)
+
+# Rate updates are applied one at a time, off the event loop
+update_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rates-update')
+
+
+class Response:
+    def __init__(self, body, status: int = 200, headers: Optional[dict] = None,
+                 content_type: str = 'application/json'):
+        """
+        Initialize a Response object.
+
+        Parameters:
+            body (dict or bytes): JSON-serializable body, or an already encoded body.
+            status (int): HTTP status code.
+            headers (dict): Extra response headers.
+            content_type (str): Content type of the body.
+        """
+        self.body = body if isinstance(body, bytes) else encode_json(body)
+        self.status = status
+        self.headers = headers or {}
+        self.content_type = content_type
+
+    async def send(self, send) -> None:
+        headers = [(b'content-type', self.content_type.encode('latin-1')),
+                   (b'content-length', str(len(self.body)).encode())]
+        headers.extend((name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in self.headers.items())
+        await send({'type': 'http.response.start', 'status': self.status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': self.body})
+
+
+def encode_json(value) -> bytes:
+    # Same output as Flask's jsonify outside debug mode
+    return (json.dumps(value, sort_keys=True, separators=(',', ':')) + '\n').encode()
+
+
+async def application(scope, receive, send) -> None:
+    """
+    ASGI 3 application.
+
+    Parameters:
+        scope (dict): Connection scope.
+        receive (callable): Awaitable returning the next event of the connection.
+        send (callable): Awaitable sending an event to the connection.
+    """
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    # Ingests the rates before the first request if the server sent no lifespan startup
+    get_application()
+
+    started = perf_counter()
+    method, path = scope['method'], scope['path']
+    route = path
+    if path == '/prices':
+        response = get_price(scope) if method == 'GET' else method_not_allowed()
+    elif path == '/rates':
+        if method == 'GET':
+            response = get_rates(scope)
+        elif method == 'PUT':
+            response = await put_rates_body(scope, receive)
+        else:
+            response = method_not_allowed()
+    elif path == '/metrics':
+        response = Response(metrics.render().encode(), content_type=CONTENT_TYPE)
+    else:
+        route = 'unmatched'
+        response = Response({'error': 'Not found'}, 404)
+    await response.send(send)
+    request_latency.labels(route, method, str(response.status)).observe(perf_counter() - started)
+
+
+async def lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # The rates are ingested by the Flask application, created once per process
+            get_application()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            update_executor.shutdown(wait=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            break
+    return b''.join(chunks)
+
+
+class BodyStream:
+    """
+    Binary file-like reader of a request body received on the event loop, read from another thread.
+
+    At most `max_chunks` received chunks are held at once, so a body is never buffered whole.
+    """
+
+    def __init__(self, max_chunks: int = 16):
+        self._chunks: queue.Queue = queue.Queue(max_chunks)
+        self._eof = False
+        self.closed = False
+
+    async def feed(self, receive) -> None:
+        """
+        Receive the body, handing over its chunks until it ends. Chunks received after the
+        reader closed the stream are discarded.
+
+        Parameters:
+            receive (callable): Awaitable returning the next event of the connection.
+        """
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    break
+                chunk = message.get('body', b'')
+                if chunk and not self.closed:
+                    await self._put(chunk)
+                if not message.get('more_body', False):
+                    break
+        finally:
+            await self._put(b'')
+
+    async def _put(self, chunk: bytes) -> None:
+        try:
+            self._chunks.put_nowait(chunk)
+        except queue.Full:
+            # Waits off the event loop until the reader catches up, or closes the stream and empties it
+            await asyncio.to_thread(self._chunks.put, chunk)
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read the next received chunk, waiting for it. Empty at the end of the body.
+        """
+        if self._eof:
+            return b''
+        chunk = self._chunks.get()
+        if not chunk:
+            self._eof = True
+        return chunk
+
+    def close(self) -> None:
+        self.closed = True
+        # Wakes up a feed waiting for room
+        while True:
+            try:
+                self._chunks.get_nowait()
+            except queue.Empty:
+                break
+
+
+async def put_rates_body(scope, receive) -> Response:
+    """
+    Stores the rates of a PUT /rates request in the update executor, handing large or chunked
+    bodies over as they are received rather than once read whole.
+
+    Parameters:
+        scope (dict): Connection scope of the request.
+        receive (callable): Awaitable returning the next event of the connection.
+
+    Returns:
+        Response: The stored rates or an error message.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        content_length = int(dict(scope['headers'])[b'content-length'])
+    except (KeyError, ValueError):
+        content_length = None
+    if content_length is not None and content_length <= STREAMING_THRESHOLD:
+        body = await read_body(receive)
+        return await loop.run_in_executor(update_executor, put_rates, body)
+
+    stream = BodyStream()
+    update = loop.run_in_executor(update_executor, put_rates, stream, content_length)
+    await stream.feed(receive)
+    return await update
+
+
+def method_not_allowed() -> Response:
+    return Response({'error': 'Method not allowed'}, 405)
+
+
+def get_price(scope) -> Response:
+    """
+    Prices the time range given by the start and end query parameters, on the event loop.
+
+    Parameters:
+        scope (dict): Connection scope of the request.
+
+    Returns:
+        Response: The price or an error message.
+    """
+    query = parse_qs(scope['query_string'].decode('latin-1'))
+    start_date = query.get('start', [''])[0]
+    end_date = query.get('end', [''])[0]
+
+    if not start_date or not end_date:
+        return Response({'error': 'Start and end date times are required'}, 400)
+
+    snapshot = rate_repository.snapshot
+    try:
+        start = isodate_to_datetime(start_date)
+        end = isodate_to_datetime(end_date)
+        price = price_service.get_price(start, end, snapshot)
+        return Response(PriceOutput(price).to_json(), 200, {VERSION_HEADER: str(snapshot.version)})
+    except Exception as e:
+        logger.error("Error fetching prices: %s", e)
+        return Response({'error': str(e)}, 400)
+
+
+def get_rates(scope) -> Response:
+    """
+    Returns the rates, sharing the encoded body and its ETag with the Flask application.
+
+    Parameters:
+        scope (dict): Connection scope of the request.
+
+    Returns:
+        Response: The rates, or 304 if the client has them already.
+    """
+    with get_application().app_context():
+        output = get_encoded_rates()
+    headers = {'ETag': f'"{output.etag}"', VERSION_HEADER: str(output.version)}
+    if_none_match = dict(scope['headers']).get(b'if-none-match', b'').decode('latin-1')
+    if headers['ETag'] in (tag.strip() for tag in if_none_match.split(',')):
+        return Response(b'', 304, headers)
+    return Response(output.body, 200, headers)
+
+
+def put_rates(body, content_length: Optional[int] = None) -> Response:
+    """
+    Validates and stores the rates of a PUT /rates body. Runs in the update executor.
+
+    Parameters:
+        body (bytes or BodyStream): The JSON body of the request, or a stream of it, parsed
+            incrementally, for large or chunked bodies.
+        content_length (int): Size of a streamed body, if known.
+
+    Returns:
+        Response: The stored rates or an error message.
+    """
+    try:
+        if isinstance(body, BodyStream):
+            table = rate_service.ingest_rates(iter_rates_json(body), validation_executor_for(content_length))
+            rates_list = [(rate_id, table.rate(rate_id)) for rate_id in table.ids()]
+        else:
+            data = json.loads(body)
+            if isinstance(data, str):
+                data = json.loads(data)
+            rates_input = list(validate_rates(data.get('rates', [])))
+            rates_list = list(enumerate(rate_service.update_rates(rates_input)))
+        price_service.compile_rates()
+
+        output = {"rates": [RateOutput.from_model(rate, rate_id).to_json() for rate_id, rate in rates_list]}
+        conflicts = rate_service.get_conflicts()
+        if conflicts:
+            output["conflicts"] = conflicts.pairs
+        return Response(output)
+    except RatesValidationError as e:
+        logger.error("Error updating rates: %s", e)
+        errors = [{'index': index, 'error': error} for index, error in e.errors]
+        return Response({'error': str(e), 'errors': errors}, 400)
+    except RateConflictError as e:
+        logger.error("Error updating rates: %s", e)
+        return Response({'error': str(e), 'conflicts': e.conflicts}, 400)
+    except Exception as e:
+        logger.error("Error updating rates: %s", e)
+        return Response({'error': str(e)}, 400)
+    finally:
+        if isinstance(body, BodyStream):
+            body.close()
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the rates API from an asyncio event loop.")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    parser.add_argument('--port', type=int, default=8000, help="port to listen on")
+    args = parser.parse_args(argv)
+
+    # uvicorn is optional, the built-in server is enough for development and benchmarks
+    try:
+        import uvicorn
+    except ImportError:
+        from app.http_server import serve
+
+        print(f"Serving on http://{args.host}:{args.port}", flush=True)
+        asyncio.run(serve(application, args.host, args.port))
+    else:
+        uvicorn.run(application, host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
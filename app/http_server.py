@@ -0,0 +1,145 @@
+"""
+Minimal asyncio HTTP/1.1 server for ASGI applications.
+
+It only implements what the rates API needs: keep-alive connections, request bodies
+with a Content-Length, and responses with a Content-Length or chunked. It lets the ASGI
+entry point run without extra dependencies; production deployments should use an ASGI
+server such as uvicorn instead.
+"""
+import asyncio
+from http import HTTPStatus
+from typing import Callable, Optional
+from urllib.parse import unquote
+
+MAX_HEADER_LINES = 100
+
+
+async def serve(app: Callable, host: str = '127.0.0.1', port: int = 8000,
+                started: Optional[asyncio.Future] = None) -> None:
+    """
+    Serve an ASGI application until cancelled.
+
+    Parameters:
+        app (callable): ASGI 3 application.
+        host (str): Address to listen on.
+        port (int): Port to listen on, 0 to pick a free one.
+        started (asyncio.Future): Set to the bound (host, port) once the server listens.
+    """
+    server = await asyncio.start_server(lambda reader, writer: _handle(app, reader, writer), host, port)
+    async with server:
+        if started is not None:
+            started.set_result(server.sockets[0].getsockname()[:2])
+        await server.serve_forever()
+
+
+async def _handle(app: Callable, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while await _handle_request(app, reader, writer):
+            pass
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _handle_request(app: Callable, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+    """
+    Serve one request of a connection. Returns whether the connection is kept alive.
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        return False
+    try:
+        method, target, http_version = request_line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+    except ValueError:
+        await _write_error(writer, 400)
+        return False
+
+    headers = []
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        if len(headers) == MAX_HEADER_LINES:
+            await _write_error(writer, 431)
+            return False
+        name, _, value = line.decode('latin-1').partition(':')
+        headers.append((name.strip().lower().encode('latin-1'), value.strip().encode('latin-1')))
+    header_map = dict(headers)
+
+    if b'transfer-encoding' in header_map:
+        await _write_error(writer, 411)
+        return False
+    try:
+        body = await reader.readexactly(int(header_map.get(b'content-length', b'0')))
+    except ValueError:
+        await _write_error(writer, 400)
+        return False
+
+    keep_alive = http_version == 'HTTP/1.1' and header_map.get(b'connection', b'').lower() != b'close'
+    path, _, query = target.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0', 'spec_version': '2.3'},
+        'http_version': http_version.partition('/')[2],
+        'method': method,
+        'scheme': 'http',
+        'path': unquote(path),
+        'raw_path': path.encode('latin-1'),
+        'query_string': query.encode('latin-1'),
+        'root_path': '',
+        'headers': headers,
+        'client': writer.get_extra_info('peername'),
+        'server': writer.get_extra_info('sockname'),
+    }
+
+    received = False
+
+    async def receive() -> dict:
+        nonlocal received
+        if received:
+            return {'type': 'http.disconnect'}
+        received = True
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    chunked = False
+
+    async def send(message: dict) -> None:
+        nonlocal chunked
+        if message['type'] == 'http.response.start':
+            response_headers = list(message.get('headers', []))
+            chunked = all(name.lower() != b'content-length' for name, _ in response_headers)
+            if chunked:
+                response_headers.append((b'transfer-encoding', b'chunked'))
+            if not keep_alive:
+                response_headers.append((b'connection', b'close'))
+            status = message['status']
+            lines = [f"HTTP/1.1 {status} {_reason(status)}\r\n".encode('latin-1')]
+            lines.extend(name + b': ' + value + b'\r\n' for name, value in response_headers)
+            writer.write(b''.join(lines) + b'\r\n')
+        elif message['type'] == 'http.response.body':
+            data = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if chunked:
+                if data:
+                    writer.write(b'%x\r\n%s\r\n' % (len(data), data))
+                if not more_body:
+                    writer.write(b'0\r\n\r\n')
+            else:
+                writer.write(data)
+            await writer.drain()
+
+    await app(scope, receive, send)
+    return keep_alive
+
+
+async def _write_error(writer: asyncio.StreamWriter, status: int) -> None:
+    writer.write(f"HTTP/1.1 {status} {_reason(status)}\r\ncontent-length: 0\r\nconnection: close\r\n\r\n".encode())
+    await writer.drain()
+
+
+def _reason(status: int) -> str:
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return ''
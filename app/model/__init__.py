@@ -1,2 +1,4 @@
+from .encoded_output import EncodedOutput
 from .price_output import PriceOutput
+from .price_batch_output import PriceBatchOutput
 from .rate_output import RateOutput
\ No newline at end of file
@@ -0,0 +1,18 @@
+import hashlib
+
+
+class EncodedOutput:
+    def __init__(self, version: int, body: bytes):
+        """
+        Initialize an EncodedOutput object holding a serialized response.
+
+        Parameters:
+            version (int): Version of the rates the body was built from.
+            body (bytes): Serialized JSON body.
+
+        Returns:
+            EncodedOutput: An EncodedOutput object with a strong ETag computed from the body.
+        """
+        self.version = version
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()
@@ -0,0 +1,29 @@
+from app.model.price_output import PriceOutput
+
+
+class PriceBatchOutput:
+    def __init__(self, results: list):
+        """
+        Initialize a PriceBatchOutput object with the results of a batch.
+
+        Parameters:
+            results (list): One price or exception per requested interval, in order.
+
+        Returns:
+            PriceBatchOutput: A PriceBatchOutput object with the specified results.
+        """
+        self.results = results
+
+    def to_json(self) -> dict:
+        """
+        Convert the PriceBatchOutput object into a dictionary in JSON format.
+
+        Returns:
+            dict: A dictionary with one price or error entry per requested interval.
+        """
+        return {
+            "prices": [
+                {"error": str(result)} if isinstance(result, Exception) else PriceOutput(result).to_json()
+                for result in self.results
+            ]
+        }
@@ -1,8 +1,10 @@
+from typing import Optional
+
 from libs.rates.dto import number_to_days_mapping, Rate
 
 
 class RateOutput:
-    def __init__(self, days: str, times: str, timezone: str, price: int):
+    def __init__(self, days: str, times: str, timezone: str, price: int, rate_id: Optional[int] = None):
         """
         Initialize a RateOutput object with the specified attributes.
 
@@ -11,6 +13,7 @@ class RateOutput:
             times (str): A string representing the time interval.
             timezone (str): A string representing the timezone.
             price (int): An integer representing the price.
+            rate_id (int): Id of the rate, used to patch it. Omitted from the JSON if None.
 
         Returns:
             RateOutput: A RateOutput object with the specified attributes.
@@ -19,14 +22,16 @@ class RateOutput:
         self.times = times
         self.timezone = timezone
         self.price = price
+        self.rate_id = rate_id
 
     @classmethod
-    def from_model(cls, rate: Rate) -> 'RateOutput':
+    def from_model(cls, rate: Rate, rate_id: Optional[int] = None) -> 'RateOutput':
         """
         Convert a Rate object into a RateOutput object.
 
         Parameters:
             rate (Rate): The Rate object to convert.
+            rate_id (int): Id of the rate, if known.
 
         Returns:
             RateOutput: The converted RateOutput object.
@@ -36,7 +41,7 @@ class RateOutput:
         interval_str = f"{start_time_str}-{end_time_str}"
         days = ','.join([number_to_days_mapping[day] for day in rate.days_of_week])
 
-        return RateOutput(days=days, times=interval_str, timezone=rate.timezone, price=rate.price)
+        return RateOutput(days=days, times=interval_str, timezone=rate.timezone, price=rate.price, rate_id=rate_id)
 
     def to_json(self) -> dict:
         """
@@ -45,9 +50,12 @@ class RateOutput:
         Returns:
             dict: A dictionary containing the RateOutput attributes in JSON format.
         """
-        return {
+        output = {
             "days": self.days,
             "price": self.price,
             "times": self.times,
             "tz": self.timezone
-        }
\ No newline at end of file
+        }
+        if self.rate_id is not None:
+            output["id"] = self.rate_id
+        return output
\ No newline at end of file
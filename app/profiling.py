@@ -0,0 +1,146 @@
+"""
+Opt-in profiling of single /prices and /rates requests.
+
+The middleware is only installed when a profile directory and a token are configured, so
+requests cost nothing extra otherwise. Once installed, a request is profiled when it
+carries the X-Profile header along with the token in the X-Profile-Token header. The
+value of X-Profile selects the format: 'pstats' (the default) for a deterministic cProfile
+dump, or 'collapsed' for sampled stacks. The profile is stored next to a JSON file tagging
+it with the request and the version of the rates, and its name is returned in the
+X-Profile-Artifact response header. Only the newest profiles are kept.
+"""
+import hmac
+import io
+import json
+import os
+import time
+import uuid
+from typing import Callable, Optional
+
+from libs.utils.profiling import EXTENSIONS, FORMATS, PSTATS, CallProfiler
+
+PROFILE_HEADER = 'X-Profile'
+TOKEN_HEADER = 'X-Profile-Token'
+ARTIFACT_HEADER = 'X-Profile-Artifact'
+PROFILED_PATHS = ('/prices', '/rates')
+# Request bodies up to this size are kept in the tags of the profile
+MAX_TAGGED_BODY = 64 * 1024
+DEFAULT_MAX_PROFILES = 100
+
+
+class ProfilingMiddleware:
+    def __init__(self, wsgi_app, directory: str, token: str, version: Callable[[], int], version_header: str,
+                 interval: float = 0.001, max_profiles: int = DEFAULT_MAX_PROFILES):
+        """
+        Initialize a ProfilingMiddleware object.
+
+        Parameters:
+            wsgi_app (callable): WSGI application to profile.
+            directory (str): Directory the profiles are stored in, created if needed.
+            token (str): Value of the X-Profile-Token header required to profile a request.
+            version (callable): Returns the version of the rates, for responses without a version header.
+            version_header (str): Response header holding the version of the rates priced against.
+            interval (float): Seconds between two samples of a collapsed profile.
+            max_profiles (int): Number of profiles kept, the older ones being removed.
+        """
+        self.wsgi_app = wsgi_app
+        self.directory = directory
+        self.token = token.encode()
+        self.version = version
+        self.version_header = version_header.lower()
+        self.interval = interval
+        self.max_profiles = max_profiles
+        os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, environ, start_response):
+        output_format = environ.get('HTTP_X_PROFILE')
+        if output_format is None or not is_profiled_path(environ.get('PATH_INFO', '')) \
+                or not self._authorized(environ):
+            return self.wsgi_app(environ, start_response)
+
+        output_format = output_format.strip().lower()
+        if output_format not in FORMATS:
+            output_format = PSTATS
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        tags = self._request_tags(environ)
+        tags.update({'name': name, 'format': output_format, 'version': self.version()})
+
+        def profiled_start_response(status, headers, exc_info=None):
+            tags['status'] = int(status.split(' ', 1)[0])
+            for header, value in headers:
+                if header.lower() == self.version_header:
+                    tags['version'] = int(value)
+            return start_response(status, headers + [(ARTIFACT_HEADER, name)], exc_info)
+
+        # The response is consumed while profiling, so that streamed bodies are part of the profile
+        profiler = CallProfiler(output_format, self.interval)
+        started = time.perf_counter()
+        with profiler:
+            iterable = self.wsgi_app(environ, profiled_start_response)
+            try:
+                body = list(iterable)
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+        tags['duration'] = time.perf_counter() - started
+
+        self._store(name, profiler, tags)
+        return body
+
+    def _request_tags(self, environ) -> dict:
+        """
+        Describes the request, buffering its body so that the application can still read it.
+        """
+        tags = {'method': environ.get('REQUEST_METHOD'), 'path': environ.get('PATH_INFO'),
+                'query': environ.get('QUERY_STRING', '')}
+        length = _content_length(environ)
+        if length is not None:
+            body = environ['wsgi.input'].read(length)
+            environ['wsgi.input'] = io.BytesIO(body)
+            tags['body_size'] = len(body)
+            if len(body) <= MAX_TAGGED_BODY:
+                tags['body'] = body.decode('utf-8', errors='replace')
+        return tags
+
+    def _authorized(self, environ) -> bool:
+        token = environ.get('HTTP_X_PROFILE_TOKEN', '').encode('latin-1')
+        return hmac.compare_digest(token, self.token)
+
+    def _store(self, name: str, profiler: CallProfiler, tags: dict) -> None:
+        path = os.path.join(self.directory, name)
+        profiler.write(path + EXTENSIONS[profiler.output_format])
+        with open(path + '.json', 'w') as file:
+            json.dump(tags, file, indent=2)
+        self._prune()
+
+    def _prune(self) -> None:
+        """
+        Remove the oldest profiles, with their tags, beyond the number kept.
+        """
+        profiles = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                try:
+                    profiles.append((entry.stat().st_mtime_ns, entry.name[:-len('.json')]))
+                except FileNotFoundError:
+                    continue
+        profiles.sort(reverse=True)
+        for _, name in profiles[self.max_profiles:]:
+            # Another request pruning meanwhile may have removed them already
+            for extension in ('.json', *EXTENSIONS.values()):
+                try:
+                    os.remove(os.path.join(self.directory, name + extension))
+                except FileNotFoundError:
+                    pass
+
+
+def is_profiled_path(path: str) -> bool:
+    return any(path == prefix or path.startswith(prefix + '/') for prefix in PROFILED_PATHS)
+
+
+def _content_length(environ) -> Optional[int]:
+    try:
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return None
+    return length or None
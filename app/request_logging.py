@@ -0,0 +1,89 @@
+"""
+Logging of the application: JSON lines written from a background thread, with the
+records of each route sampled at a configurable rate.
+
+Sampling is decided once per request, so a sampled request keeps all its records.
+Warnings and errors are always kept.
+"""
+import atexit
+import logging
+import random
+import sys
+from typing import Optional
+
+from flask import g, has_request_context, request
+
+from libs.utils.structured_logging import DeferredQueueHandler, JsonFormatter, start_queue_logging
+
+LOGGER_NAME = 'app'
+
+
+class RouteSampler(logging.Filter):
+    def __init__(self, rates: Optional[dict[str, float]] = None):
+        """
+        Initialize a RouteSampler object.
+
+        Parameters:
+            rates (dict): Share of the requests logged, between 0 and 1, by route template,
+                e.g. {'/prices': 0.01}. Requests to other routes are all logged.
+        """
+        super().__init__()
+        self.rates = rates or {}
+
+    def sample(self, route: str) -> bool:
+        """
+        Decides whether the records of a request are kept.
+
+        Parameters:
+            route (str): Route template of the request.
+
+        Returns:
+            bool: True if they are.
+        """
+        rate = self.rates.get(route, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not has_request_context():
+            return True
+        if record.levelno < logging.WARNING and not g.get('log_sampled', True):
+            return False
+        record.method = request.method
+        record.route = request.url_rule.rule if request.url_rule is not None else request.path
+        return True
+
+
+def parse_sampling(value: str) -> dict[str, float]:
+    """
+    Parses sampling rates given as comma-separated route=rate pairs, e.g. '/prices=0.01,/rates=1'.
+
+    Raises:
+        ValueError: If a pair is malformed or a rate is not between 0 and 1.
+    """
+    rates = {}
+    for pair in filter(None, (pair.strip() for pair in value.split(','))):
+        route, separator, rate = pair.rpartition('=')
+        if not separator or not route or not 0 <= float(rate) <= 1:
+            raise ValueError(f"Invalid log sampling rate: {pair}")
+        rates[route] = float(rate)
+    return rates
+
+
+def configure_logging(level: str, sampler: RouteSampler) -> None:
+    """
+    Sends the records of the application loggers to standard error as JSON lines, from a
+    background thread. Only configures them once per process.
+
+    Parameters:
+        level (str): Name of the lowest level logged, e.g. 'INFO'.
+        sampler (RouteSampler): Sampler of the records logged while serving requests.
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    if any(isinstance(handler, DeferredQueueHandler) for handler in logger.handlers):
+        return
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter())
+    _, listener = start_queue_logging(logger, [output], [sampler], level=logging.getLevelName(level.upper()))
+    # Records still queued when the process exits are written before it does
+    atexit.register(listener.stop)
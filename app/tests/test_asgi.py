@@ -0,0 +1,124 @@
+import asyncio
+import json
+
+from app.asgi import application
+from app.app import rate_repository
+from app.http_server import serve
+
+
+def call(method, path, query_string=b'', body=b'', headers=()):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query_string, 'headers': list(headers)}
+    asyncio.run(application(scope, receive, send))
+    start, response_body = messages
+    return start['status'], dict(start['headers']), response_body['body']
+
+
+def test_prices():
+    status, headers, body = call('GET', '/prices', b'start=2024-02-12T09:05:00-06:00&end=2024-02-12T12:00:00-06:00')
+    assert status == 200
+    assert 'price' in json.loads(body)
+    assert headers[b'x-rates-version'] == str(rate_repository.version).encode()
+
+    status, _, body = call('GET', '/prices', b'start=2024-02-12T09:05:00-06:00')
+    assert status == 400
+    assert json.loads(body) == {'error': 'Start and end date times are required'}
+
+
+def test_put_and_get_rates(monkeypatch):
+    monkeypatch.setattr('app.app.encoded_rates', None)
+    rates_json = {'rates': [
+        {'days': 'mon,tues', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': 1500},
+        {'days': 'wed', 'times': '0600-1800', 'tz': 'America/Chicago', 'price': 1750},
+    ]}
+
+    status, _, body = call('PUT', '/rates', body=json.dumps(rates_json).encode())
+    assert status == 200
+    assert [rate['id'] for rate in json.loads(body)['rates']] == [0, 1]
+
+    status, headers, body = call('GET', '/rates')
+    assert status == 200
+    assert json.loads(body)['rates'][1]['price'] == 1750
+
+    status, _, _ = call('GET', '/rates', headers=[(b'if-none-match', headers[b'etag'])])
+    assert status == 304
+
+    status, _, body = call('PUT', '/rates', body=b'{"rates": [{"days": "mon"}]}')
+    assert status == 400
+    assert 'errors' in json.loads(body)
+
+
+def put_chunked(body, chunk_size=16):
+    chunks = [body[offset:offset + chunk_size] for offset in range(0, len(body), chunk_size)]
+    messages = [{'type': 'http.request', 'body': chunk, 'more_body': True} for chunk in chunks]
+    messages.append({'type': 'http.request', 'body': b'', 'more_body': False})
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'PUT', 'path': '/rates', 'query_string': b'', 'headers': []}
+    asyncio.run(application(scope, receive, send))
+    start, response_body = sent
+    assert not messages
+    return start['status'], json.loads(response_body['body'])
+
+
+def test_put_rates_streams_chunked_body(monkeypatch):
+    monkeypatch.setattr('app.app.encoded_rates', None)
+    rates = [{'days': 'mon', 'times': f'{hour:02d}00-{hour:02d}59', 'tz': 'UTC', 'price': 100 + hour}
+             for hour in range(24)]
+
+    # Many more chunks than the stream holds at once, so receiving waits for the parser to catch up
+    status, output = put_chunked(json.dumps({'rates': rates}).encode())
+    assert status == 200
+    assert [rate['price'] for rate in output['rates']] == [rate['price'] for rate in rates]
+
+    status, output = put_chunked(json.dumps(json.dumps({'rates': rates})).encode())
+    assert status == 200
+    assert len(output['rates']) == len(rates)
+
+    # The rest of the body is received and discarded once parsing failed
+    status, output = put_chunked(b'{"rates": 5' + b' ' * 4096 + b'}')
+    assert status == 400
+    assert 'error' in output
+
+
+def test_unknown_routes():
+    assert call('GET', '/nowhere')[0] == 404
+    assert call('DELETE', '/rates')[0] == 405
+
+
+def test_http_server():
+    async def request_prices():
+        started = asyncio.get_running_loop().create_future()
+        server = asyncio.create_task(serve(application, '127.0.0.1', 0, started))
+        host, port = await started
+
+        reader, writer = await asyncio.open_connection(host, port)
+        responses = []
+        for _ in range(2):
+            writer.write(b'GET /prices?start=2024-02-12T09:05:00-06:00&end=2024-02-12T12:00:00-06:00 HTTP/1.1\r\n'
+                         b'Host: localhost\r\n\r\n')
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = int(head.lower().split(b'content-length: ')[1].split(b'\r\n')[0])
+            responses.append((head.split(b'\r\n')[0], json.loads(await reader.readexactly(length))))
+        writer.close()
+        await writer.wait_closed()
+        server.cancel()
+        return responses
+
+    responses = asyncio.run(request_prices())
+
+    assert [status for status, _ in responses] == [b'HTTP/1.1 200 OK'] * 2
+    assert all('price' in body for _, body in responses)
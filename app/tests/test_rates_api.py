@@ -1,8 +1,17 @@
+import json
+import os
+import subprocess
+import sys
+
 import pytest
 from unittest.mock import patch
 
-from app import application
+from app import application, create_app
+from app.app import rate_repository, rate_service, validation_executor_for
 from libs.rates.dto import Rate
+from libs.rates.rate_index import RateIndex
+from libs.rates.rate_snapshot import RateSnapshot
+from libs.rates.rate_table import RateTable
 
 
 @pytest.fixture
@@ -12,16 +21,43 @@ def test_client():
         yield client
 
 
-@patch('libs.rates.rates_service.RatesService.update_rates')
-def test_before_first_request(mock_update_rates, test_client, monkeypatch):
-    # Mocking the existence of the rates.json file
+@patch('libs.rates.rates_service.RatesService.ingest_rates')
+def test_create_app_ingests_rates(mock_update_rates, monkeypatch):
+    # Mocking the existence of the rates.json file and an empty repository
     monkeypatch.setattr('os.path.exists', lambda x: True)
+    monkeypatch.setattr(rate_repository, '_snapshot', RateSnapshot(0, RateTable(), RateIndex(RateTable())))
 
-    response = test_client.get('/')
+    app = create_app()
+    mock_update_rates.assert_called_once()
+
+    response = app.test_client().get('/')
     assert response.status_code == 200
     mock_update_rates.assert_called_once()
 
 
+@patch('libs.rates.rates_service.RatesService.ingest_rates', side_effect=ValueError("Invalid rates"))
+def test_create_app_is_not_ready_if_ingestion_fails(mock_ingest_rates, monkeypatch):
+    monkeypatch.setattr('os.path.exists', lambda x: True)
+    monkeypatch.setattr(rate_repository, '_snapshot', RateSnapshot(0, RateTable(), RateIndex(RateTable())))
+
+    app = create_app()
+    mock_ingest_rates.assert_called_once()
+
+    response = app.test_client().get('/ready')
+    assert response.status_code == 503
+
+
+def test_ready(test_client):
+    response = test_client.get('/ready')
+    assert response.status_code == 200
+    assert response.json['ready'] is True
+    assert response.json['version'] == rate_repository.version
+
+    response = create_app(ingest=False).test_client().get('/ready')
+    assert response.status_code == 503
+    assert response.json['ready'] is False
+
+
 def test_home(test_client):
     response = test_client.get('/')
     assert response.status_code == 200
@@ -393,3 +429,349 @@ def test_put_rates_throws_error(test_client, input_data, expected_error):
     data = response.json
     assert 'error' in data
     assert data['error'] == expected_error
+
+
+@patch('libs.rates.price_service.PriceService.get_price_batch')
+def test_prices_batch(mock_get_price_batch, test_client):
+    mock_get_price_batch.return_value = [1500, None, 'unavailable']
+
+    response = test_client.post('/prices/batch', json={'intervals': [
+        {'start': '2024-02-12T09:05:00-05:00', 'end': '2024-02-12T12:00:00-05:00'},
+        {'start': '2024-02-12T09:05:00-05:00'},
+        {'start': '2024-02-12T09:05:00-05:00', 'end': '2024-02-12T12:00:00-05:00'},
+        {'start': 'invalid', 'end': '2024-02-12T12:00:00-05:00'},
+        {'start': '2024-02-12T09:05:00-05:00', 'end': '2024-02-13T12:00:00-05:00'},
+    ]})
+    assert response.status_code == 200
+    data = response.json
+    assert data['prices'][0] == {'price': 1500}
+    assert data['prices'][1] == {'error': 'Start and end date times are required'}
+    assert data['prices'][2] == {'price': 0}
+    assert 'error' in data['prices'][3]
+    assert data['prices'][4] == {'price': 'unavailable'}
+
+    actual_args, _ = mock_get_price_batch.call_args
+    assert len(actual_args[0]) == 3
+
+
+@pytest.mark.parametrize("input_data", [None, {}, {'intervals': 'a'}, {'intervals': [{}] * 1001}])
+def test_prices_batch_throws_error(test_client, input_data):
+    response = test_client.post('/prices/batch', json=input_data)
+    assert response.status_code == 400
+    assert 'error' in response.json
+
+
+def test_prices_reports_rates_version(test_client):
+    test_client.put('/rates', json={'rates': [
+        {'days': 'mon', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': 1500}
+    ]})
+    version = rate_repository.version
+
+    response = test_client.get('/prices', query_string={
+        'start': '2024-02-12T09:05:00-06:00',
+        'end': '2024-02-12T12:00:00-06:00'
+    })
+    assert response.status_code == 200
+    assert response.json['price'] == 1500
+    assert response.headers['X-Rates-Version'] == str(version)
+
+
+def test_get_rates_etag(test_client):
+    test_client.put('/rates', json={'rates': [
+        {'days': 'mon', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': 1500}
+    ]})
+
+    response = test_client.get('/rates')
+    assert response.status_code == 200
+    assert response.json['rates'][0]['price'] == 1500
+    etag = response.headers['ETag']
+
+    response = test_client.get('/rates', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    test_client.put('/rates', json={'rates': [
+        {'days': 'mon', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': 1750}
+    ]})
+
+    response = test_client.get('/rates', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.json['rates'][0]['price'] == 1750
+    assert response.headers['ETag'] != etag
+
+
+def test_lot_rates_and_prices(test_client):
+    response = test_client.get('/rates/lot-1')
+    assert response.status_code == 404
+
+    response = test_client.put('/rates/lot-1', json={'rates': [
+        {'days': 'mon', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': 1200}
+    ]})
+    assert response.status_code == 200
+
+    response = test_client.get('/rates/lot-1')
+    assert response.status_code == 200
+    assert response.json['rates'][0]['price'] == 1200
+
+    response = test_client.get('/prices/lot-1', query_string={
+        'start': '2024-02-12T09:05:00-06:00',
+        'end': '2024-02-12T12:00:00-06:00'
+    })
+    assert response.status_code == 200
+    assert response.json['price'] == 1200
+
+    response = test_client.get('/prices/lot-2', query_string={
+        'start': '2024-02-12T09:05:00-06:00',
+        'end': '2024-02-12T12:00:00-06:00'
+    })
+    assert response.status_code == 404
+
+    # /prices/batch is not the prices of a lot
+    response = test_client.put('/rates/batch', json={'rates': [
+        {'days': 'mon', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': 1200}
+    ]})
+    assert response.status_code == 400
+    response = test_client.get('/prices/batch')
+    assert response.status_code == 405
+    assert response.headers['Allow'] == 'POST'
+
+
+def test_put_rates_streaming(test_client, monkeypatch):
+    monkeypatch.setattr('app.app.STREAMING_THRESHOLD', 0)
+    input_data = {'rates': [
+        {'days': 'mon,wed', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': 1500},
+        {'days': 'sun', 'times': '0100-0700', 'tz': 'America/Chicago', 'price': 925},
+    ]}
+
+    response = test_client.put('/rates', json=input_data)
+    assert response.status_code == 200
+    assert response.json['rates'] == test_client.get('/rates').json['rates']
+    assert [rate['price'] for rate in response.json['rates']] == [1500, 925]
+    assert 'conflicts' not in response.json
+
+    # Bodies holding the rates as a JSON string are accepted as when they are parsed at once
+    string_response = test_client.put('/rates', json=json.dumps(input_data))
+    assert string_response.status_code == 200
+    assert string_response.json == response.json
+    version = rate_repository.version
+
+    overlapping = {'rates': [*input_data['rates'], {'days': 'wed', 'times': '2000-2200', 'tz': 'America/Chicago',
+                                                    'price': 500}]}
+    response = test_client.put('/rates', json=overlapping)
+    assert response.status_code == 200
+    assert len(response.json['rates']) == 3
+    assert response.json['conflicts'] == [[0, 2]]
+    version = rate_repository.version
+
+    # An invalid rate anywhere in the body leaves the rates untouched
+    input_data['rates'].append({'days': 'mon', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': -1})
+    response = test_client.put('/rates', json=input_data)
+    assert response.status_code == 400
+    assert 'error' in response.json
+    assert rate_repository.version == version
+
+    response = test_client.put('/rates', data='{"rates": [{"days": "mon"', content_type='application/json')
+    assert response.status_code == 400
+    assert rate_repository.version == version
+
+
+def test_put_rates_reports_every_error(test_client):
+    valid_rate = {'days': 'mon', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': 1500}
+    response = test_client.put('/rates', json={'rates': [
+        valid_rate,
+        {**valid_rate, 'price': -1},
+        valid_rate,
+        {**valid_rate, 'tz': 'Nowhere/Town'},
+    ]})
+    assert response.status_code == 400
+    assert response.json['error'] == "2 rates are invalid"
+    assert response.json['errors'] == [
+        {'index': 1, 'error': "Invalid value for 'price'. Must be a positive integer"},
+        {'index': 3, 'error': "Invalid value for 'tz'. Must be a string and a valid timezone"},
+    ]
+
+
+def test_patch_rates(test_client):
+    test_client.put('/rates', json={'rates': [
+        {'days': 'mon', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': 1500},
+        {'days': 'tues', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': 1000},
+    ]})
+    rates_list = test_client.get('/rates').json['rates']
+    assert [rate['id'] for rate in rates_list] == [0, 1]
+
+    response = test_client.patch('/rates', json={
+        'upsert': [
+            {'id': 0, 'days': 'mon', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': 1750},
+            {'days': 'wed', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': 500},
+        ],
+        'delete': [1],
+    })
+    assert response.status_code == 200
+    assert [rate['id'] for rate in response.json['rates']] == [0, 2]
+    assert response.json['deleted'] == [1]
+    assert response.headers['X-Rates-Version'] == str(rate_repository.version)
+
+    rates_list = test_client.get('/rates').json['rates']
+    assert [(rate['id'], rate['price']) for rate in rates_list] == [(0, 1750), (2, 500)]
+
+    response = test_client.get('/prices', query_string={
+        'start': '2024-02-12T09:05:00-06:00',
+        'end': '2024-02-12T12:00:00-06:00'
+    })
+    assert response.json['price'] == 1750
+
+    response = test_client.patch('/rates', json={'delete': [1]})
+    assert response.status_code == 404
+
+    response = test_client.patch('/rates', json={'upsert': [{'id': 0, 'days': 'mon'}]})
+    assert response.status_code == 400
+    assert response.json['errors'][0]['index'] == 0
+
+    response = test_client.patch('/rates', json={'delete': ['a']})
+    assert response.status_code == 400
+
+
+def test_put_rates_reports_conflicts(test_client, monkeypatch):
+    rates_json = {'rates': [
+        {'days': 'mon', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': 1500},
+        {'days': 'mon', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': 1500},
+        {'days': 'mon,tues', 'times': '2000-2200', 'tz': 'America/Chicago', 'price': 1000},
+    ]}
+
+    response = test_client.put('/rates', json=rates_json)
+    assert response.status_code == 200
+    assert len(response.json['rates']) == 2
+    assert response.json['conflicts'] == [[0, 1]]
+
+    monkeypatch.setattr(rate_service, 'strict', True)
+    version = rate_repository.version
+    response = test_client.put('/rates', json=rates_json)
+    assert response.status_code == 400
+    assert response.json['error'] == "Rates 0 and 2 overlap"
+    assert response.json['conflicts'] == [[0, 2]]
+    assert rate_repository.version == version
+
+
+def test_patch_rates_reports_conflicts(test_client, monkeypatch):
+    test_client.put('/rates', json={'rates': [
+        {'days': 'mon', 'times': '0900-1200', 'tz': 'America/Chicago', 'price': 1500},
+    ]})
+    overlapping = {'days': 'mon', 'times': '1100-1300', 'tz': 'America/Chicago', 'price': 1000}
+
+    monkeypatch.setattr(rate_service, 'strict', True)
+    version = rate_repository.version
+    response = test_client.patch('/rates', json={'upsert': [overlapping]})
+    assert response.status_code == 400
+    assert response.json['conflicts'] == [[0, 1]]
+    assert rate_repository.version == version
+
+    monkeypatch.setattr(rate_service, 'strict', False)
+    response = test_client.patch('/rates', json={'upsert': [
+        overlapping,
+        {'days': 'mon', 'times': '0900-1200', 'tz': 'America/Chicago', 'price': 1500},
+    ]})
+    assert response.status_code == 200
+    assert [rate['id'] for rate in response.json['rates']] == [1, 0]
+    assert response.json['conflicts'] == [[0, 1]]
+    assert len(test_client.get('/rates').json['rates']) == 2
+
+
+def test_metrics(test_client):
+    test_client.get('/prices', query_string={'start': '2024-02-12T09:05:00-06:00', 'end': '2024-02-12T12:00:00-06:00'})
+
+    response = test_client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    metrics = response.get_data(as_text=True)
+    assert 'rates_http_request_duration_seconds_count{route="/prices",method="GET",status="200"}' in metrics
+    assert 'rates_price_stage_seconds_count{stage="parse"}' in metrics
+    assert 'rates_price_stage_seconds_count{stage="serialize"}' in metrics
+    assert f'rates_version {rate_repository.version}' in metrics
+    assert 'rates_price_cache_hit_ratio' in metrics
+
+
+def test_profile_price_request(tmp_path):
+    # Prepare
+    client = create_app(ingest=False, profile_dir=str(tmp_path), profile_token='secret').test_client()
+    query = {'start': '2024-02-12T09:05:00-06:00', 'end': '2024-02-12T12:00:00-06:00'}
+
+    # Run
+    response = client.get('/prices', query_string=query, headers={'X-Profile': 'pstats', 'X-Profile-Token': 'secret'})
+
+    # Expect
+    assert response.status_code == 200
+    name = response.headers['X-Profile-Artifact']
+    assert (tmp_path / f'{name}.prof').stat().st_size > 0
+    tags = json.loads((tmp_path / f'{name}.json').read_text())
+    assert tags['path'] == '/prices'
+    assert 'start=2024-02-12T09' in tags['query']
+    assert tags['status'] == 200
+    assert tags['version'] == rate_repository.version
+
+
+def test_profile_rates_update_collapsed(tmp_path):
+    # Prepare
+    client = create_app(ingest=False, profile_dir=str(tmp_path), profile_token='secret').test_client()
+    body = {'rates': [{'days': 'mon', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': 1000}]}
+    headers = {'X-Profile': 'collapsed', 'X-Profile-Token': 'secret'}
+
+    # Run
+    response = client.put('/lots/none', json=body, headers=headers)
+    profiled = client.put('/rates/lot-profiled', json=body, headers=headers)
+
+    # Expect
+    assert 'X-Profile-Artifact' not in response.headers
+    assert profiled.status_code == 200
+    name = profiled.headers['X-Profile-Artifact']
+    assert (tmp_path / f'{name}.collapsed').exists()
+    tags = json.loads((tmp_path / f'{name}.json').read_text())
+    assert tags['method'] == 'PUT'
+    assert tags['format'] == 'collapsed'
+    assert json.loads(tags['body']) == body
+
+
+def test_profiles_require_token_and_are_bounded(tmp_path):
+    # Prepare
+    app = create_app(ingest=False, profile_dir=str(tmp_path), profile_token='secret')
+    app.wsgi_app.max_profiles = 2
+    client = app.test_client()
+    query = {'start': '2024-02-12T09:05:00-06:00', 'end': '2024-02-12T12:00:00-06:00'}
+
+    # Run
+    unauthorized = [client.get('/prices', query_string=query, headers={'X-Profile': 'pstats', **token})
+                    for token in ({}, {'X-Profile-Token': 'wrong'})]
+    names = [client.get('/prices', query_string=query,
+                        headers={'X-Profile': 'pstats', 'X-Profile-Token': 'secret'}).headers['X-Profile-Artifact']
+             for _ in range(4)]
+
+    # Expect
+    assert all(response.status_code == 200 and 'X-Profile-Artifact' not in response.headers
+               for response in unauthorized)
+    assert len(set(names)) == 4
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        f'{name}{extension}' for name in names[-2:] for extension in ('.json', '.prof'))
+
+
+def test_requests_not_profiled_by_default(test_client):
+    response = test_client.get('/prices', query_string={'start': '2024-02-12T09:05:00-06:00',
+                                                        'end': '2024-02-12T12:00:00-06:00'},
+                               headers={'X-Profile': 'pstats'})
+    assert response.status_code == 200
+    assert 'X-Profile-Artifact' not in response.headers
+
+
+def test_validation_executor_for(monkeypatch):
+    pool = object()
+    monkeypatch.setattr('app.app.validation_executor', lambda: pool)
+    monkeypatch.setattr('app.app.PARALLEL_VALIDATION_THRESHOLD', 100)
+
+    assert validation_executor_for(None) is None
+    assert validation_executor_for(100) is None
+    assert validation_executor_for(101) is pool
+
+
+def test_import_does_not_create_application():
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    code = "import sys, app.app; sys.exit(app.app._application is not None)"
+
+    assert subprocess.run([sys.executable, '-c', code], cwd=root).returncode == 0
@@ -0,0 +1,39 @@
+import logging
+
+import pytest
+from flask import g
+
+from app import application
+from app.request_logging import RouteSampler, parse_sampling
+
+
+def record(level: int) -> logging.LogRecord:
+    return logging.LogRecord('app.app', level, __file__, 1, "Fetching price", None, None)
+
+
+def test_parse_sampling():
+    assert parse_sampling('') == {}
+    assert parse_sampling('/prices=0.01, /rates/<lot_id>=1') == {'/prices': 0.01, '/rates/<lot_id>': 1.0}
+    with pytest.raises(ValueError):
+        parse_sampling('/prices=2')
+    with pytest.raises(ValueError):
+        parse_sampling('/prices')
+
+
+def test_route_sampler():
+    # Prepare
+    sampler = RouteSampler({'/prices': 0})
+
+    # Run
+    with application.test_request_context('/prices'):
+        g.log_sampled = sampler.sample('/prices')
+        info = record(logging.INFO)
+        error = record(logging.ERROR)
+
+        # Expect
+        assert not sampler.filter(info)
+        assert sampler.filter(error)
+        assert error.method == 'GET'
+
+    assert sampler.sample('/rates')
+    assert sampler.filter(record(logging.INFO))
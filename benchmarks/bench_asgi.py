@@ -0,0 +1,119 @@
+"""
+Compares the throughput of the ASGI entry point with the threaded Flask server under
+many concurrent connections.
+
+Each server runs in its own process. The Flask development server closes the connection
+after every response, so its clients reconnect, as they would against it in practice.
+Every connection sends GET /prices requests one after the other; --delay makes clients
+send each request in two halves, that long apart, to mimic slow mobile networks.
+
+Usage:
+    python -m benchmarks.bench_asgi [--connections N] [--duration S] [--delay S]
+"""
+import argparse
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+
+PRICES_REQUEST = (b'GET /prices?start=2015-07-01T07:00:00-05:00&end=2015-07-01T12:00:00-05:00 HTTP/1.1\r\n'
+                  b'Host: localhost\r\n\r\n')
+
+SERVERS = {
+    'flask': "from app import application; application.run(port={port}, threaded=True)",
+    'asgi': "from app.asgi import main; main(['--port', '{port}'])",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(name: str, port: int, timeout: float = 30) -> subprocess.Popen:
+    process = subprocess.Popen([sys.executable, '-c', SERVERS[name].format(port=port)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"The {name} server did not start")
+
+
+async def client(port: int, deadline: float, delay: float) -> tuple[int, int]:
+    """
+    Sends requests over one connection until the deadline, reconnecting whenever the
+    server closes it. Returns the number of successful and failed requests.
+    """
+    completed = failed = 0
+    half = len(PRICES_REQUEST) // 2
+    while time.monotonic() < deadline:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            keep_alive = True
+            while keep_alive and time.monotonic() < deadline:
+                if delay:
+                    writer.write(PRICES_REQUEST[:half])
+                    await writer.drain()
+                    await asyncio.sleep(delay)
+                    writer.write(PRICES_REQUEST[half:])
+                else:
+                    writer.write(PRICES_REQUEST)
+                await writer.drain()
+
+                head = (await reader.readuntil(b'\r\n\r\n')).lower()
+                length = int(head.split(b'content-length:')[1].split(b'\r\n')[0])
+                await reader.readexactly(length)
+                keep_alive = b'connection: close' not in head
+                if head.startswith(b'http/1.1 200'):
+                    completed += 1
+                else:
+                    failed += 1
+        finally:
+            writer.close()
+    return completed, failed
+
+
+async def load(port: int, connections: int, duration: float, delay: float) -> tuple[int, int]:
+    deadline = time.monotonic() + duration
+    results = await asyncio.gather(*(client(port, deadline, delay) for _ in range(connections)),
+                                   return_exceptions=True)
+    completed = sum(result[0] for result in results if isinstance(result, tuple))
+    failed = sum(result[1] if isinstance(result, tuple) else 1 for result in results)
+    return completed, failed
+
+
+def bench(name: str, connections: int, duration: float, delay: float) -> tuple[float, int]:
+    """
+    Returns the requests per second served by a server, and the number of failed requests or connections.
+    """
+    port = free_port()
+    process = start_server(name, port)
+    try:
+        completed, failed = asyncio.run(load(port, connections, duration, delay))
+    finally:
+        process.terminate()
+        process.wait()
+    return completed / duration, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--connections', type=int, default=100, help='Concurrent keep-alive connections')
+    parser.add_argument('--duration', type=float, default=5, help='Seconds of load per server')
+    parser.add_argument('--delay', type=float, default=0.05, help='Seconds between the halves of each request')
+    args = parser.parse_args()
+
+    for name in SERVERS:
+        throughput, failed = bench(name, args.connections, args.duration, args.delay)
+        print(f"{name:6} {throughput:10.1f} requests/s  {failed} failed")
+
+
+if __name__ == '__main__':
+    main()
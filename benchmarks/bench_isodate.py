@@ -0,0 +1,46 @@
+"""
+Compares isodate_to_datetime with the strptime format it replaces.
+
+Usage:
+    python -m benchmarks.bench_isodate [--number N]
+"""
+import argparse
+import timeit
+from datetime import datetime
+
+from libs.utils.datetime_helper import isodate_to_datetime
+
+INPUTS = [
+    '2024-02-12T09:05:00-05:00',
+    '2024-02-12T12:00:00-0500',
+    '2024-07-01T23:59:59+05:30',
+    '2024-02-12T09:05:00Z',
+]
+
+
+def strptime_parse(isodate: str) -> datetime:
+    return datetime.strptime(isodate, '%Y-%m-%dT%H:%M:%S%z')
+
+
+def bench(parse, number: int) -> float:
+    """
+    Returns the mean time in microseconds of one parse over the inputs.
+    """
+    elapsed = min(timeit.repeat(lambda: [parse(isodate) for isodate in INPUTS], number=number, repeat=5))
+    return elapsed / (number * len(INPUTS)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=20000, help='Iterations over the inputs per repeat')
+    args = parser.parse_args()
+
+    baseline = bench(strptime_parse, args.number)
+    fast = bench(isodate_to_datetime, args.number)
+    print(f"strptime:            {baseline:.2f} us/parse")
+    print(f"isodate_to_datetime: {fast:.2f} us/parse")
+    print(f"speedup:             {baseline / fast:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""
+Microbenchmarks of the pricing hot path, on seeded synthetic rate sets.
+
+Times RatesRepository.find_rate, PriceService.get_price, Rate.to_model,
+RateOutput.from_model, isodate_to_datetime and the Flask endpoints through the test
+client, for each rate set size. The results are written as JSON and compared with a
+baseline produced by --save-baseline on the same machine: the run fails when a
+benchmark is slower than the baseline by more than the tolerance, and when there is no
+baseline or it was produced with another seed.
+
+Rates tile the days of a set of timezones with distinct offsets, so every query
+matches a single rate up to about 240 000 rates. Larger sets overlap, and their prices
+are mostly unavailable.
+
+Usage:
+    python -m benchmarks.bench_pricing [--sizes 10,1000,100000,1000000] [--seed N]
+                                       [--output FILE] [--baseline FILE] [--save-baseline]
+                                       [--tolerance RATIO] [--filter TEXT]
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+import pytz
+
+from app.model import RateOutput
+from libs.rates import PriceService, RatesRepository
+from libs.rates.dto import Rate
+from libs.utils.datetime_helper import get_timezone_offset_from_datetime, isodate_to_datetime
+from libs.utils.errors import MultipleRatesError
+
+DEFAULT_SIZES = (10, 1000, 100000, 1000000)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+DAYS = ('mon', 'tues', 'wed', 'thurs', 'fri', 'sat', 'sun')
+# Timezones with distinct UTC offsets in January, the month of the queries
+TIMEZONES = ('Pacific/Honolulu', 'America/Anchorage', 'America/Los_Angeles', 'America/Denver', 'America/Chicago',
+             'America/New_York', 'America/Halifax', 'America/Sao_Paulo', 'Atlantic/South_Georgia', 'Atlantic/Azores',
+             'UTC', 'Europe/Paris', 'Europe/Athens', 'Europe/Moscow', 'Asia/Dubai', 'Asia/Karachi', 'Asia/Kolkata',
+             'Asia/Dhaka', 'Asia/Bangkok', 'Asia/Shanghai', 'Asia/Tokyo', 'Australia/Brisbane', 'Pacific/Noumea',
+             'Pacific/Auckland')
+# A Monday, so that day number d of the rates falls on MONDAY + d days
+MONDAY = datetime(2024, 1, 1)
+# Last minute of a day, so that every generated rate ends on the day it starts
+LAST_MINUTE = 24 * 60 - 1
+QUERIES = 1000
+MODEL_SAMPLE = 1000
+
+
+def generate_rates(count: int, seed: int) -> list[dict]:
+    """
+    Generates the JSON of a rate set, each rate covering one slot of one day of one timezone.
+
+    Parameters:
+        count (int): Number of rates.
+        seed (int): Seed of the prices and of the order of the rates.
+
+    Returns:
+        list[dict]: The rates, as sent to PUT /rates.
+    """
+    rng = random.Random(seed)
+    groups = len(TIMEZONES) * len(DAYS)
+    slots = math.ceil(count / groups)
+    width = max(1, LAST_MINUTE // slots)
+    rates = []
+    for position in range(count):
+        group, slot = position % groups, position // groups
+        timezone, day = TIMEZONES[group // len(DAYS)], DAYS[group % len(DAYS)]
+        start = slot * width % (LAST_MINUTE - width + 1)
+        rates.append({'days': day, 'times': f"{_hhmm(start)}-{_hhmm(start + width)}", 'tz': timezone,
+                      'price': rng.randint(100, 10000)})
+    rng.shuffle(rates)
+    return rates
+
+
+def generate_queries(rates: list[dict], count: int, seed: int) -> list[tuple[str, str]]:
+    """
+    Generates intervals within random rates of a set, as ISO-8601 start and end date times.
+    """
+    rng = random.Random(seed)
+    queries = []
+    for rate in rng.choices(rates, k=count):
+        start, end = (int(time[:2]) * 60 + int(time[2:]) for time in rate['times'].split('-'))
+        date = MONDAY + timedelta(days=DAYS.index(rate['days']))
+        local = pytz.timezone(rate['tz'])
+        begin = rng.randint(start, end - 1)
+        queries.append(tuple(local.localize(date + timedelta(minutes=minute)).isoformat()
+                             for minute in (begin, rng.randint(begin + 1, end))))
+    return queries
+
+
+def _hhmm(minutes: int) -> str:
+    return f"{minutes // 60:02d}{minutes % 60:02d}"
+
+
+def bench(function: Callable[[], object], operations: int, repeat: int = 5) -> float:
+    """
+    Returns the best time in microseconds of one operation, a call of the function running
+    the given number of operations.
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / (number * operations) * 1e6
+
+
+def price_all(service: PriceService, intervals: list[tuple[datetime, datetime]]) -> None:
+    for start, end in intervals:
+        try:
+            service.get_price(start, end)
+        except MultipleRatesError:
+            pass
+
+
+def run_library(size: int, seed: int, results: dict, selected: Callable[[str], bool]) -> None:
+    rates_json = generate_rates(size, seed)
+    queries = generate_queries(rates_json, QUERIES, seed)
+    intervals = [(isodate_to_datetime(start), isodate_to_datetime(end)) for start, end in queries]
+    sample = rates_json[:MODEL_SAMPLE]
+    models = [Rate.to_model(rate) for rate in sample]
+
+    repository = RatesRepository()
+    repository.update_rates([Rate.to_model(rate) for rate in rates_json])
+    service = PriceService(repository)
+    service.compile_rates()
+
+    lookups = [(start.weekday(), service._create_interval(start, end), get_timezone_offset_from_datetime(start), start)
+               for start, end in intervals]
+    benchmarks = {
+        'find_rate': (lambda: [repository.find_rate(*lookup) for lookup in lookups], len(lookups)),
+        'get_price': (lambda: price_all(service, intervals), len(intervals)),
+        'Rate.to_model': (lambda: [Rate.to_model(rate) for rate in sample], len(sample)),
+        'RateOutput.from_model': (lambda: [RateOutput.from_model(rate, rate_id) for rate_id, rate in enumerate(models)],
+                                  len(models)),
+        'isodate_to_datetime': (lambda: [isodate_to_datetime(start) for start, _ in queries], len(queries)),
+    }
+    run_all(benchmarks, size, results, selected)
+
+
+def run_endpoints(size: int, seed: int, results: dict, selected: Callable[[str], bool]) -> None:
+    # The application rates are replaced by the synthetic ones, so import it only once needed
+    from app.app import application, price_service, rate_service
+
+    rates_json = generate_rates(size, seed)
+    queries = generate_queries(rates_json, QUERIES, seed)
+    rate_service.update_rates([Rate.to_model(rate) for rate in rates_json])
+    price_service.compile_rates()
+    # Requests are timed without writing their log records to the console
+    application.logger.setLevel(logging.ERROR)
+    client = application.test_client()
+
+    def get_prices():
+        for start, end in queries[:100]:
+            client.get('/prices', query_string={'start': start, 'end': end})
+
+    etag = client.get('/rates').headers['ETag']
+    benchmarks = {
+        'GET /prices': (get_prices, 100),
+        'GET /rates': (lambda: client.get('/rates'), 1),
+        'GET /rates (304)': (lambda: client.get('/rates', headers={'If-None-Match': etag}), 1),
+    }
+    # Updating replaces the rates, so it runs last, and only for sets small enough to be sent at once
+    if size <= MODEL_SAMPLE:
+        benchmarks['PUT /rates'] = (lambda: client.put('/rates', json={'rates': rates_json}), 1)
+    run_all(benchmarks, size, results, selected)
+
+
+def run_all(benchmarks: dict, size: int, results: dict, selected: Callable[[str], bool]) -> None:
+    for name, (function, operations) in benchmarks.items():
+        key = f"{name}[{size}]"
+        if selected(key):
+            results[key] = bench(function, operations)
+            print(f"{key:40} {results[key]:12.2f} us/op", flush=True)
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Lists the benchmarks slower than their baseline by more than the tolerance.
+
+    Parameters:
+        results (dict): Microseconds per operation of each benchmark.
+        baseline (dict): Microseconds per operation of the baseline, by benchmark.
+        tolerance (float): Accepted slowdown, e.g. 0.25 for 25%.
+
+    Returns:
+        list[str]: One line per regression.
+    """
+    regressions = []
+    for key, value in results.items():
+        reference = baseline.get(key)
+        if reference and value > reference * (1 + tolerance):
+            regressions.append(f"{key}: {value:.2f} us/op, baseline {reference:.2f} us/op "
+                               f"(+{(value / reference - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help='Comma-separated rate set sizes')
+    parser.add_argument('--seed', type=int, default=42, help='Seed of the synthetic rates and queries')
+    parser.add_argument('--output', help='File the results are written to, as JSON')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline results to compare with')
+    parser.add_argument('--save-baseline', action='store_true', help='Write the results to the baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Accepted slowdown over the baseline')
+    parser.add_argument('--filter', default='', help='Only run the benchmarks whose name contains this text')
+    args = parser.parse_args(argv)
+
+    def selected(key: str) -> bool:
+        return args.filter in key
+
+    results = {}
+    for size in (int(size) for size in args.sizes.split(',')):
+        run_library(size, args.seed, results, selected)
+    for size in (int(size) for size in args.sizes.split(',')):
+        run_endpoints(size, args.seed, results, selected)
+
+    report = {'python': platform.python_version(), 'machine': platform.machine(), 'seed': args.seed,
+              'unit': 'us/op', 'results': results}
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    # Only --save-baseline skips the comparison, so a run that cannot compare fails rather than passes unchecked
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one", file=sys.stderr)
+        return 1
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    if baseline.get('seed') != args.seed:
+        print(f"The baseline was generated with seed {baseline.get('seed')}, not {args.seed}; "
+              f"run with --save-baseline to replace it", file=sys.stderr)
+        return 1
+
+    regressions = compare(results, baseline['results'], args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
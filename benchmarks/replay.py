@@ -0,0 +1,364 @@
+"""
+Replays a recorded log of /prices and /rates calls and reports the latency of the responses.
+
+The log holds one call per line, either as JSON with a method, a path, and optionally a
+query string and a body, or as an access log line such as the ones of the Flask server:
+    {"method": "GET", "path": "/prices", "query": "start=...&end=..."}
+    127.0.0.1 - - [12/Feb/2024 09:05:00] "GET /prices?start=...&end=... HTTP/1.1" 200 -
+Calls to other paths, and updates without their body, are skipped.
+
+Calls run in-process through the WSGI callable of the application, or against a server
+given by --url. With --rate, calls are sent on a fixed schedule whatever the latency of
+the previous ones, and latencies are measured from the time a call was due, so that a
+server falling behind shows in them. Otherwise --concurrency workers send calls one
+after the other.
+
+Each worker waits for its response before sending its next call, so a schedule can only
+be kept while concurrency / latency stays above the rate. With --rate, the concurrency
+defaults to one worker per call per second, at least 8, which keeps the schedule for
+responses taking up to a second.
+
+The report gives the throughput, latency percentiles, the share of errors (failed
+connections and 4xx or 5xx responses) and the share of prices that were "unavailable".
+
+Usage:
+    python -m benchmarks.replay LOG [--url URL | --app MODULE:NAME] [--rate N] [--concurrency N]
+                                    [--requests N] [--json]
+"""
+import argparse
+import http.client
+import importlib
+import itertools
+import json
+import math
+import re
+import sys
+import threading
+import time
+from typing import Callable, Iterable, Optional
+from urllib.parse import urlsplit
+
+from werkzeug.test import Client
+
+REPLAYED_PATHS = ('/prices', '/rates')
+BODY_METHODS = ('PUT', 'PATCH', 'POST')
+ACCESS_LOG_LINE = re.compile(r'"([A-Z]+) (\S+) HTTP/[\d.]+"')
+PERCENTILES = (50, 95, 99)
+DEFAULT_CONCURRENCY = 8
+
+
+class Call:
+    def __init__(self, method: str, path: str, body: Optional[bytes] = None):
+        """
+        Initialize a Call object.
+
+        Parameters:
+            method (str): HTTP method.
+            path (str): Path, with its query string if any.
+            body (bytes): JSON body, if any.
+        """
+        self.method = method
+        self.path = path
+        self.body = body
+
+    @property
+    def route(self) -> str:
+        return f"{self.method} {self.path.split('?', 1)[0]}"
+
+
+class Outcome:
+    def __init__(self, route: str, latency: float, status: int, unavailable: bool = False):
+        """
+        Initialize an Outcome object.
+
+        Parameters:
+            route (str): Method and path of the call, without query string.
+            latency (float): Seconds until the response was read.
+            status (int): HTTP status, or 0 if no response was received.
+            unavailable (bool): Whether the response priced the interval as "unavailable".
+        """
+        self.route = route
+        self.latency = latency
+        self.status = status
+        self.unavailable = unavailable
+
+    @property
+    def error(self) -> bool:
+        return self.status == 0 or self.status >= 400
+
+
+def load_calls(lines: Iterable[str]) -> tuple[list[Call], int]:
+    """
+    Parses a recorded log.
+
+    Parameters:
+        lines (Iterable[str]): Lines of the log.
+
+    Returns:
+        tuple[list[Call], int]: The calls to replay, and the number of lines skipped.
+    """
+    calls = []
+    skipped = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        call = _parse_line(line)
+        if call is None or not _is_replayed(call):
+            skipped += 1
+        else:
+            calls.append(call)
+    return calls, skipped
+
+
+def _parse_line(line: str) -> Optional[Call]:
+    if line.startswith('{'):
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            return None
+        method, path = entry.get('method'), entry.get('path')
+        if not isinstance(method, str) or not isinstance(path, str):
+            return None
+        if entry.get('query'):
+            path = f"{path}?{entry['query']}"
+        body = entry.get('body')
+        if body is not None and not isinstance(body, str):
+            body = json.dumps(body)
+        return Call(method.upper(), path, body.encode() if body is not None else None)
+
+    match = ACCESS_LOG_LINE.search(line)
+    return Call(match.group(1), match.group(2)) if match else None
+
+
+def _is_replayed(call: Call) -> bool:
+    path = call.path.split('?', 1)[0]
+    if not any(path == prefix or path.startswith(prefix + '/') for prefix in REPLAYED_PATHS):
+        return False
+    return call.body is not None or call.method not in BODY_METHODS
+
+
+def wsgi_session(application) -> Callable[[], Callable[[Call], tuple[int, bytes]]]:
+    """
+    Sends calls to a WSGI application in-process.
+
+    Parameters:
+        application (callable): The WSGI application.
+
+    Returns:
+        callable: Creates the function sending the calls of one worker.
+    """
+    def session():
+        client = Client(application)
+
+        def send(call: Call) -> tuple[int, bytes]:
+            response = client.open(call.path, method=call.method, data=call.body,
+                                   content_type='application/json' if call.body is not None else None)
+            return response.status_code, response.get_data()
+
+        return send
+
+    return session
+
+
+def http_session(url: str, timeout: float = 30) -> Callable[[], Callable[[Call], tuple[int, bytes]]]:
+    """
+    Sends calls to a server, over one keep-alive connection per worker.
+
+    Parameters:
+        url (str): Base URL of the server, e.g. http://127.0.0.1:5000.
+        timeout (float): Seconds to wait for a response.
+
+    Returns:
+        callable: Creates the function sending the calls of one worker.
+    """
+    parts = urlsplit(url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    prefix = parts.path.rstrip('/')
+
+    def session():
+        connection = None
+
+        def send(call: Call) -> tuple[int, bytes]:
+            nonlocal connection
+            if connection is None:
+                connection = connection_class(parts.hostname, parts.port, timeout=timeout)
+            headers = {'Content-Type': 'application/json'} if call.body is not None else {}
+            try:
+                connection.request(call.method, prefix + call.path, call.body, headers)
+                response = connection.getresponse()
+                body = response.read()
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = None
+                raise
+            if response.will_close:
+                connection.close()
+                connection = None
+            return response.status, body
+
+        return send
+
+    return session
+
+
+def replay(session: Callable[[], Callable[[Call], tuple[int, bytes]]], calls: list[Call], requests: int,
+           concurrency: int, rate: Optional[float] = None) -> tuple[list[Outcome], float]:
+    """
+    Replays calls in order, cycling through them until the number of requests is sent.
+
+    Parameters:
+        session (callable): Creates the function sending the calls of one worker.
+        calls (list[Call]): Calls to replay.
+        requests (int): Number of calls to send.
+        concurrency (int): Number of workers sending calls.
+        rate (float): Calls per second to send, or None to send them as fast as the workers can.
+
+    Returns:
+        tuple[list[Outcome], float]: The outcome of every call, and the seconds the replay took.
+    """
+    outcomes: list[Outcome] = []
+    counter = itertools.count()
+    lock = threading.Lock()
+    started = time.perf_counter()
+
+    def work():
+        send = session()
+        worker_outcomes = []
+        # next() on a shared count is atomic, so every call is sent once
+        for position in iter(counter.__next__, None):
+            if position >= requests:
+                break
+            call = calls[position % len(calls)]
+            due = started + position / rate if rate else None
+            if due is not None:
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            sent = time.perf_counter()
+            try:
+                status, body = send(call)
+            except Exception:
+                status, body = 0, b''
+            latency = time.perf_counter() - (due if due is not None else sent)
+            worker_outcomes.append(Outcome(call.route, latency, status, is_unavailable(call, status, body)))
+        with lock:
+            outcomes.extend(worker_outcomes)
+
+    workers = [threading.Thread(target=work, name=f'replay-{number}') for number in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return outcomes, time.perf_counter() - started
+
+
+def is_unavailable(call: Call, status: int, body: bytes) -> bool:
+    if status != 200 or not call.path.startswith('/prices') or b'unavailable' not in body:
+        return False
+    try:
+        output = json.loads(body)
+    except ValueError:
+        return False
+    prices = output.get('prices', [output]) if isinstance(output, dict) else []
+    return any(isinstance(price, dict) and price.get('price') == 'unavailable' for price in prices)
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    """
+    Nearest-rank percentile of sorted values.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(outcomes: list[Outcome], elapsed: float) -> dict:
+    """
+    Summarizes the outcomes of a replay, overall and per route.
+
+    Returns:
+        dict: Requests, throughput in requests per second, latencies in milliseconds, and error
+        and unavailable shares, under 'total' and under each route in 'routes'.
+    """
+    def summary(group: list[Outcome]) -> dict:
+        latencies = sorted(outcome.latency for outcome in group)
+        result = {'requests': len(group), 'throughput': len(group) / elapsed if elapsed else 0.0}
+        for percent in PERCENTILES:
+            result[f'p{percent}_ms'] = percentile(latencies, percent) * 1000
+        result['max_ms'] = (latencies[-1] if latencies else 0.0) * 1000
+        result['error_rate'] = sum(outcome.error for outcome in group) / len(group) if group else 0.0
+        result['unavailable_rate'] = sum(outcome.unavailable for outcome in group) / len(group) if group else 0.0
+        return result
+
+    routes: dict[str, list[Outcome]] = {}
+    for outcome in outcomes:
+        routes.setdefault(outcome.route, []).append(outcome)
+    return {'elapsed': elapsed, 'total': summary(outcomes),
+            'routes': {route: summary(group) for route, group in sorted(routes.items())}}
+
+
+def format_report(report: dict) -> str:
+    columns = ('requests', 'throughput', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'error_rate', 'unavailable_rate')
+    lines = [f"{'route':28}" + ''.join(f"{column:>17}" for column in columns)]
+    for route, summary in [*report['routes'].items(), ('total', report['total'])]:
+        cells = [f"{summary['requests']:>17}", f"{summary['throughput']:>15.1f}/s"]
+        cells += [f"{summary[column]:>17.2f}" for column in columns[2:6]]
+        cells += [f"{summary[column]:>16.2%} " for column in columns[6:]]
+        lines.append(f"{route:28}" + ''.join(cells))
+    return '\n'.join(lines)
+
+
+def worker_count(concurrency: Optional[int], rate: Optional[float]) -> int:
+    """
+    Number of workers to replay with.
+
+    Parameters:
+        concurrency (int): Workers requested, or None for the default.
+        rate (float): Calls per second to send, or None to send them as fast as the workers can.
+
+    Returns:
+        int: The concurrency if given, else 8, or one worker per call per second for higher rates.
+    """
+    if concurrency is not None:
+        return concurrency
+    return max(DEFAULT_CONCURRENCY, math.ceil(rate)) if rate else DEFAULT_CONCURRENCY
+
+
+def load_application(name: str):
+    module_name, _, attribute = name.partition(':')
+    return getattr(importlib.import_module(module_name), attribute or 'application')
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('log', help='Recorded log of calls, JSON lines or access log lines')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', help='Base URL of a server to replay against, e.g. http://127.0.0.1:5000')
+    target.add_argument('--app', default='app.app:application', help='WSGI callable to replay against in-process')
+    parser.add_argument('--rate', type=float, help='Calls per second, sent on a fixed schedule')
+    parser.add_argument('--concurrency', type=int,
+                        help='Workers sending calls. Defaults to 8, or to the rate for rates above 8')
+    parser.add_argument('--requests', type=int, help='Calls to send, cycling through the log. Defaults to its length')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args(argv)
+
+    with open(args.log) as file:
+        calls, skipped = load_calls(file)
+    if not calls:
+        print(f"No /prices or /rates calls to replay in {args.log}", file=sys.stderr)
+        return 1
+    if skipped:
+        print(f"Skipped {skipped} lines that are not replayable calls", file=sys.stderr)
+
+    session = http_session(args.url) if args.url else wsgi_session(load_application(args.app))
+    outcomes, elapsed = replay(session, calls, args.requests or len(calls),
+                             worker_count(args.concurrency, args.rate), args.rate)
+    report = summarize(outcomes, elapsed)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
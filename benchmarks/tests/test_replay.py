@@ -0,0 +1,89 @@
+import json
+
+from benchmarks.replay import Call, is_unavailable, load_calls, percentile, replay, summarize, worker_count
+
+
+def test_load_calls():
+    # Prepare
+    lines = [
+        json.dumps({'method': 'get', 'path': '/prices', 'query': 'start=a&end=b'}),
+        json.dumps({'method': 'PUT', 'path': '/rates', 'body': {'rates': []}}),
+        '127.0.0.1 - - [12/Feb/2024 09:05:00] "GET /prices?start=a&end=b HTTP/1.1" 200 -',
+        '',
+        '127.0.0.1 - - [12/Feb/2024 09:05:01] "PUT /rates HTTP/1.1" 200 -',
+        json.dumps({'method': 'GET', 'path': '/metrics'}),
+        '{"method": "GET", "path": ',
+        'not a call',
+    ]
+
+    # Run
+    calls, skipped = load_calls(lines)
+
+    # Expect
+    assert [(call.method, call.path, call.body) for call in calls] == [
+        ('GET', '/prices?start=a&end=b', None),
+        ('PUT', '/rates', b'{"rates": []}'),
+        ('GET', '/prices?start=a&end=b', None),
+    ]
+    assert calls[0].route == 'GET /prices'
+    assert skipped == 4
+
+
+def test_percentile_is_nearest_rank():
+    # Prepare
+    values = [float(value) for value in range(1, 11)]
+
+    # Run
+    results = [percentile(values, percent) for percent in (0, 10, 50, 95, 100)]
+
+    # Expect
+    assert results == [1.0, 1.0, 5.0, 10.0, 10.0]
+    assert percentile([], 50) == 0.0
+
+
+def test_is_unavailable():
+    # Prepare
+    batch = Call('POST', '/prices/batch', b'{}')
+    single = Call('GET', '/prices?start=a&end=b')
+
+    # Run
+    results = [
+        is_unavailable(batch, 200, b'{"prices": [{"price": 1500}, {"price": "unavailable"}]}'),
+        is_unavailable(batch, 200, b'{"prices": [{"price": 1500}]}'),
+        is_unavailable(single, 200, b'{"price": "unavailable"}'),
+        is_unavailable(single, 400, b'{"price": "unavailable"}'),
+        is_unavailable(Call('GET', '/rates'), 200, b'{"price": "unavailable"}'),
+    ]
+
+    # Expect
+    assert results == [True, False, True, False, False]
+
+
+def test_replay_counts_errors_and_unavailable_prices():
+    # Prepare
+    calls = [Call('POST', '/prices/batch', b'{}'), Call('GET', '/prices?start=a&end=b')]
+    responses = {
+        'POST /prices/batch': (200, b'{"prices": [{"price": "unavailable"}, {"price": 1500}]}'),
+        'GET /prices': (400, b'{"error": "Start and end date times are required"}'),
+    }
+
+    def session():
+        return lambda call: responses[call.route]
+
+    # Run
+    outcomes, elapsed = replay(session, calls, requests=10, concurrency=2)
+    report = summarize(outcomes, elapsed)
+
+    # Expect
+    assert report['total']['requests'] == 10
+    assert report['total']['error_rate'] == 0.5
+    assert report['total']['unavailable_rate'] == 0.5
+    assert report['routes']['POST /prices/batch']['unavailable_rate'] == 1.0
+    assert report['routes']['GET /prices']['error_rate'] == 1.0
+
+
+def test_worker_count():
+    assert worker_count(None, None) == 8
+    assert worker_count(None, 2.5) == 8
+    assert worker_count(None, 200) == 200
+    assert worker_count(4, 200) == 4
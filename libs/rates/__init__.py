@@ -2,5 +2,8 @@
 
 from .dto import *
 from .rates_repository import RatesRepository
+from .lot_rates_repository import LotRatesRepository
+from .sqlite_rates_repository import SqliteRatesRepository
+from .shared_rates_repository import SharedRatesRepository
 from .rates_service import RatesService
 from .price_service import PriceService
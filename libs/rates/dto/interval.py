@@ -1,4 +1,11 @@
 class Interval:
+    __slots__ = ('start', 'end')
+
     def __init__(self, start: int, end: int):
         self.start = start
         self.end = end
+
+    def __eq__(self, other):
+        if not isinstance(other, Interval):
+            return NotImplemented
+        return self.start == other.start and self.end == other.end
@@ -1,8 +1,13 @@
-import pytz
+import re
+from functools import lru_cache
+from typing import Optional
+
 from libs.rates.dto import Interval, days_to_number_mapping
 
 
 class Rate:
+    __slots__ = ('days_of_week', 'timezone', 'price', 'period')
+
     def __init__(self, days_of_week: list[int], period: Interval, timezone: str, price: int):
         """
         Initialize a Rate object.
@@ -21,6 +26,12 @@ class Rate:
         self.price = price
         self.period = period
 
+    def __eq__(self, other):
+        if not isinstance(other, Rate):
+            return NotImplemented
+        return set(self.days_of_week) == set(other.days_of_week) and self.period == other.period and \
+            self.timezone == other.timezone and self.price == other.price
+
     @classmethod
     def to_model(cls, rate) -> 'Rate':
         """
@@ -59,57 +70,74 @@ class Rate:
         Returns:
         None
         """
+        error = cls.validation_error(rate)
+        if error is not None:
+            raise ValueError(error)
+
+    @staticmethod
+    def validation_error(rate) -> Optional[str]:
+        """
+        Check a rate dictionary without raising.
+
+        Parameters:
+        - rate (dict): Dictionary containing rate information.
+
+        Returns:
+        str or None: Message describing the first problem of the rate, or None if it is valid.
+        """
+        if not isinstance(rate, dict):
+            return "Rate must be an object"
+
         # Check for required fields
-        required_fields = ['days', 'times', 'tz', 'price']
-        seen_properties = set()
-        for field in required_fields:
+        for field in _REQUIRED_FIELDS:
             if field not in rate:
-                raise ValueError(f"{field.capitalize()} is required")
-            if field in seen_properties:
-                raise ValueError(f"Duplicate property found: {field}")
-            seen_properties.add(field)
+                return f"{field.capitalize()} is required"
 
         # Check for unknown fields
-        unknown_properties = set(rate.keys()) - set(required_fields)
-        if unknown_properties:
-            raise ValueError(f"Unknown properties: {', '.join(unknown_properties)}")
+        if len(rate) != len(_REQUIRED_FIELDS):
+            unknown_properties = sorted(set(rate) - _REQUIRED_FIELD_SET)
+            return f"Unknown properties: {', '.join(unknown_properties)}"
 
         # Validate days
-        valid_days = ["mon", "tues", "wed", "thurs", "fri", "sat", "sun"]
-        days = rate.get("days")
-
+        days = rate["days"]
         if not days:
-            raise ValueError("Days of week are required")
-        if not isinstance(days, str):
-            raise ValueError("Invalid value for 'days'. Please use the short name of the day. E.g. 'mon,tues'")
-        days = days.replace(" ", "").split(",")
-        if not all(day.lower() in valid_days for day in days):
-            raise ValueError("Invalid value for 'days'. Please use the short name of the day. E.g. 'mon,tues'")
+            return "Days of week are required"
+        if not isinstance(days, str) or \
+                not all(day.lower() in days_to_number_mapping for day in days.replace(" ", "").split(",")):
+            return "Invalid value for 'days'. Please use the short name of the day. E.g. 'mon,tues'"
 
         # Validate price
-        price = rate.get("price")
+        price = rate["price"]
         if not isinstance(price, int):
-            raise Exception("Invalid value for 'price'. Must be an integer")
-
+            return "Invalid value for 'price'. Must be an integer"
         if price < 0:
-            raise ValueError("Invalid value for 'price'. Must be a positive integer")
+            return "Invalid value for 'price'. Must be a positive integer"
 
         # Validate times
-        times = rate.get("times")
-        if not times or not isinstance(times, str):
-            raise Exception("Invalid value for 'times'. Must be in format 'HHMM-HHMM'")
-        if len(times) != 9 or not times[4] == "-":
-            raise Exception("Invalid value for 'times'. Must be in format 'HHMM-HHMM'")
-        times = times.split("-")
-        if len(times) != 2 or not all(time.isdigit() and len(time) == 4 for time in times):
-            raise Exception("Invalid value for 'times'. Must be in format 'HHMM-HHMM'")
+        times = rate["times"]
+        if not isinstance(times, str) or not _TIMES.fullmatch(times):
+            return "Invalid value for 'times'. Must be in format 'HHMM-HHMM'"
 
         # Validate timezone
-        timezone = rate.get("tz")
-        if not timezone or not isinstance(timezone, str):
-            raise Exception("Invalid value for 'tz'. Must be a string and a valid timezone")
-
-        try:
-            pytz.timezone(timezone)
-        except pytz.UnknownTimeZoneError:
-            raise ValueError(f"Invalid value for 'tz'. Must be a string and a valid timezone")
+        timezone = rate["tz"]
+        if not timezone or not isinstance(timezone, str) or not _is_timezone(timezone):
+            return "Invalid value for 'tz'. Must be a string and a valid timezone"
+
+        return None
+
+
+_REQUIRED_FIELDS = ('days', 'times', 'tz', 'price')
+_REQUIRED_FIELD_SET = frozenset(_REQUIRED_FIELDS)
+_TIMES = re.compile(r'\d{4}-\d{4}')
+
+
+@lru_cache(maxsize=1024)
+def _is_timezone(timezone: str) -> bool:
+    # pytz is only needed when rates are validated, so it does not slow down startup
+    import pytz
+
+    try:
+        pytz.timezone(timezone)
+    except pytz.UnknownTimeZoneError:
+        return False
+    return True
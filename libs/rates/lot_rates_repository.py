@@ -0,0 +1,304 @@
+import hashlib
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from libs.rates.dto import Interval
+from libs.rates.price_metrics import PriceMetrics
+from libs.rates.price_service import PriceService
+from libs.rates.rate_index import RateIndex
+from libs.rates.rate_snapshot import RateSnapshot
+from libs.rates.rate_table import RateTable
+from libs.utils.timezone_offsets import DEFAULT_OFFSET_YEARS
+
+DEFAULT_IDLE_SECONDS = 300
+
+
+def table_key(table: RateTable) -> bytes:
+    """
+    Get a digest identifying the content of a rate table.
+
+    Parameters:
+    - table (RateTable): The rate table.
+
+    Returns:
+    - bytes: SHA-256 digest of the rates, equal for tables holding the same rates in the same order.
+    """
+    digest = hashlib.sha256()
+    for column in (table.day_masks, table.starts, table.ends, table.prices, table.timezone_ids):
+        digest.update(column.tobytes())
+        digest.update(b'\0')
+    digest.update('\0'.join(table.timezones).encode())
+    return digest.digest()
+
+
+class LotRates:
+    """
+    View of the rates of one lot, with the interface of RatesRepository.
+    """
+
+    def __init__(self, repository: 'LotRatesRepository', lot_id: str):
+        self.repository = repository
+        self.lot_id = lot_id
+
+    @property
+    def snapshot(self) -> RateSnapshot:
+        return self.repository.snapshot(self.lot_id)
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.version
+
+    @property
+    def table(self) -> RateTable:
+        return self.snapshot.table
+
+    @property
+    def index(self) -> RateIndex:
+        return self.snapshot.index
+
+    def update_rates(self, rates):
+        return self.repository.update_rates(self.lot_id, rates)
+
+    def update_table(self, table: RateTable) -> RateTable:
+        return self.repository.update_table(self.lot_id, table)
+
+    def get_rates(self):
+        return self.snapshot.table.to_rates()
+
+    def find_rate(self, day_of_week: int, interval: Interval, timezone: str, at: Optional[datetime] = None):
+        return self.snapshot.index.find(day_of_week, interval, timezone, at)
+
+
+class _TableRates:
+    """
+    Rates of the lots sharing one rate table, as priced by their price service.
+    """
+
+    def __init__(self, snapshot: RateSnapshot):
+        self.snapshot = snapshot
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.version
+
+    @property
+    def table(self) -> RateTable:
+        return self.snapshot.table
+
+    @property
+    def index(self) -> RateIndex:
+        return self.snapshot.index
+
+    def find_rate(self, day_of_week: int, interval: Interval, timezone: str, at: Optional[datetime] = None):
+        return self.snapshot.index.find(day_of_week, interval, timezone, at)
+
+
+class LotRatesRepository:
+    """
+    In-memory rate sets of many parking lots.
+
+    Lots holding identical rates share one rate table, and with it one snapshot and one
+    price service with the compiled rates, so memory grows with the number of distinct
+    rate sets rather than with the number of lots. Indexes and compiled rates are only
+    built when a lot is queried and are dropped once they have not been used for
+    `idle_seconds`, or once no lot holds their table anymore.
+    """
+
+    def __init__(self, offset_years: tuple[int, int] = DEFAULT_OFFSET_YEARS,
+                 idle_seconds: float = DEFAULT_IDLE_SECONDS):
+        """
+        Initialize a LotRatesRepository object.
+
+        Parameters:
+        - offset_years (tuple[int, int]): First and last year covered by the timezone offset tables.
+        - idle_seconds (float): Time after which an unused index is dropped.
+        """
+        self.offset_years = offset_years
+        self.idle_seconds = idle_seconds
+        self.version = 0
+        # Key of the table of each lot, and the version at which each table was stored
+        self._lots: dict[str, bytes] = {}
+        self._tables: dict[bytes, tuple[int, RateTable]] = {}
+        self._table_users: dict[bytes, int] = {}
+        self._snapshots: dict[bytes, RateSnapshot] = {}
+        self._services: dict[bytes, PriceService] = {}
+        self._last_used: dict[bytes, float] = {}
+        self._last_sweep = time.monotonic()
+        self._write_lock = threading.Lock()
+
+    def __contains__(self, lot_id: str) -> bool:
+        return lot_id in self._lots
+
+    def __len__(self) -> int:
+        return len(self._lots)
+
+    def lot(self, lot_id: str) -> LotRates:
+        """
+        Get the rates of a lot.
+
+        Parameters:
+        - lot_id (str): Id of the lot.
+
+        Returns:
+        - LotRates: View of the lot, usable wherever a RatesRepository is expected.
+        """
+        return LotRates(self, lot_id)
+
+    def update_rates(self, lot_id: str, rates):
+        """
+        Replace the rates of a lot, creating it if needed.
+
+        Parameters:
+        - lot_id (str): Id of the lot.
+        - rates (list[Rate]): The new rates.
+
+        Returns:
+        - list[Rate]: The stored rates.
+        """
+        return self.update_table(lot_id, RateTable(rates)).to_rates()
+
+    def update_table(self, lot_id: str, table: RateTable) -> RateTable:
+        """
+        Replace the rates of a lot with the ones of a table, creating the lot if needed.
+
+        Parameters:
+        - lot_id (str): Id of the lot.
+        - table (RateTable): The new rates. The table must not be modified afterwards.
+
+        Returns:
+        - RateTable: The stored rates, shared with the lots holding the same ones.
+        """
+        key = table_key(table)
+
+        with self._write_lock:
+            self.version += 1
+            _, table = self._tables.setdefault(key, (self.version, table))
+            self._table_users[key] = self._table_users.get(key, 0) + 1
+
+            previous = self._lots.get(lot_id)
+            self._lots[lot_id] = key
+            if previous is not None:
+                self._release(previous)
+
+        return table
+
+    def delete_lot(self, lot_id: str) -> None:
+        """
+        Remove a lot and its rates.
+
+        Parameters:
+        - lot_id (str): Id of the lot.
+
+        Raises:
+        - KeyError: If the lot does not exist.
+        """
+        with self._write_lock:
+            self._release(self._lots.pop(lot_id))
+
+    def snapshot(self, lot_id: str) -> RateSnapshot:
+        """
+        Get the current rates of a lot, building their index if needed.
+
+        Parameters:
+        - lot_id (str): Id of the lot.
+
+        Returns:
+        - RateSnapshot: Snapshot of the rates of the lot, shared with the lots holding the same
+          rates, the same one until they change or their index is dropped.
+
+        Raises:
+        - KeyError: If the lot does not exist.
+        """
+        return self._lookup(lot_id)[1]
+
+    def price_service(self, lot_id: str, metrics: Optional[PriceMetrics] = None) -> PriceService:
+        """
+        Get the price service of the current rates of a lot, with the rates compiled.
+
+        Parameters:
+        - lot_id (str): Id of the lot.
+        - metrics (PriceMetrics): Metrics of the service, if it is created.
+
+        Returns:
+        - PriceService: The service, shared with the lots holding the same rates. Its repository
+          holds the snapshot it prices against.
+
+        Raises:
+        - KeyError: If the lot does not exist.
+        """
+        key, snapshot = self._lookup(lot_id)
+        service = self._services.get(key)
+        if service is not None and service.rate_repository.snapshot is snapshot:
+            return service
+
+        # Compiled outside of the lock, so other lots are not blocked meanwhile
+        service = PriceService(_TableRates(snapshot), metrics=metrics)
+        service.compile_rates()
+        with self._write_lock:
+            if self._snapshots.get(key) is snapshot:
+                service = self._services.setdefault(key, service)
+        return service
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """
+        Drop the indexes that have not been used for `idle_seconds`, with their snapshots and
+        price services.
+
+        Parameters:
+        - now (float): Current monotonic time. Defaults to time.monotonic().
+
+        Returns:
+        - int: Number of indexes dropped.
+        """
+        with self._write_lock:
+            now = time.monotonic() if now is None else now
+            self._last_sweep = now
+            idle = [key for key, last_used in list(self._last_used.items()) if now - last_used > self.idle_seconds]
+            for key in idle:
+                self._drop(key)
+            return len(idle)
+
+    def shared_tables(self) -> int:
+        """
+        Get the number of distinct rate tables held.
+
+        Returns:
+        - int: Number of distinct rate tables across all lots.
+        """
+        return len(self._tables)
+
+    def _lookup(self, lot_id: str) -> tuple[bytes, RateSnapshot]:
+        """
+        Get the table key and the snapshot of the current rates of a lot, building the snapshot if needed.
+        """
+        key = self._lots[lot_id]
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            with self._write_lock:
+                key = self._lots[lot_id]
+                snapshot = self._snapshots.get(key)
+                if snapshot is None:
+                    version, table = self._tables[key]
+                    snapshot = RateSnapshot(version, table, RateIndex(table, self.offset_years))
+                    self._snapshots[key] = snapshot
+
+        now = time.monotonic()
+        self._last_used[key] = now
+        if now - self._last_sweep > self.idle_seconds:
+            self.evict_idle(now)
+
+        return key, snapshot
+
+    def _drop(self, key: bytes) -> None:
+        self._snapshots.pop(key, None)
+        self._services.pop(key, None)
+        self._last_used.pop(key, None)
+
+    def _release(self, key: bytes) -> None:
+        self._table_users[key] -= 1
+        if not self._table_users[key]:
+            del self._table_users[key]
+            del self._tables[key]
+            self._drop(key)
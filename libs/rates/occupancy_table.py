@@ -0,0 +1,264 @@
+import copy
+from array import array
+from datetime import datetime
+from itertools import chain
+from typing import Optional
+
+from libs.rates.rate_conflicts import RateConflicts
+from libs.rates.rate_table import RateTable, mask_to_days
+from libs.utils.errors import MultipleRatesError
+from libs.utils.timezone_offsets import TimezoneOffsetTable
+
+MINUTES_PER_DAY = 1440
+NO_RATE = -1
+
+
+def hhmm_to_minute(hhmm: int) -> Optional[int]:
+    """
+    Convert an HHMM integer into minutes since midnight.
+
+    Parameters:
+    - hhmm (int): Time of day as HHMM (e.g., 930 for 09:30). 2400 is accepted as the end of the day.
+
+    Returns:
+    - int or None: Minutes since midnight, or None if the value is not a valid time of day.
+    """
+    hours, minutes = divmod(hhmm, 100)
+    if hhmm < 0 or minutes >= 60 or hhmm > 2400:
+        return None
+    return hours * 60 + minutes
+
+
+class OccupancyTable:
+    """
+    Minute-resolution map of the rates covering each day of the week.
+
+    Cell `day * 1440 + minute` holds the id of the rate covering that minute, `runs` holds
+    the prefix count of rate runs and `next_rate` the first rate at or after each minute of
+    the day, so the number of distinct rates over a range of minutes is two array reads.
+    Only rate sets where every minute is covered by at most one rate and every period is a
+    valid time range can be compiled.
+    """
+
+    def __init__(self, table: RateTable, positions: Optional[list[int]] = None):
+        """
+        Compile the occupancy table for rates of a rate table.
+
+        Parameters:
+        - table (RateTable): Table holding the rates.
+        - positions (list[int]): Positions of the rates to compile. Defaults to every rate.
+          A rate id is its index in this list.
+
+        Raises:
+        - ValueError: If the rates cannot be represented in the table.
+        """
+        positions = list(range(len(table))) if positions is None else positions
+        self.rate_table = table
+        self.positions = array('i', positions)
+        typecode = 'h' if len(positions) < 2 ** 15 else 'i'
+        cells = array(typecode, [NO_RATE]) * (7 * MINUTES_PER_DAY)
+
+        for rate_id, position in enumerate(positions):
+            start, end = hhmm_to_minute(table.starts[position]), hhmm_to_minute(table.ends[position])
+            if start is None or end is None or start >= end:
+                raise ValueError("Rate period cannot be compiled into an occupancy table")
+            for day in mask_to_days(table.day_masks[position]):
+                base = day * MINUTES_PER_DAY
+                if any(cell != NO_RATE for cell in cells[base + start:base + end]):
+                    raise ValueError("Overlapping rates cannot be compiled into an occupancy table")
+                cells[base + start:base + end] = array(typecode, [rate_id]) * (end - start)
+
+        runs = array('h', bytes(2 * len(cells)))
+        next_rate = array(typecode, [NO_RATE]) * len(cells)
+        count = 0
+        for index, cell in enumerate(cells):
+            if cell != NO_RATE and (index == 0 or cells[index - 1] != cell):
+                count += 1
+            runs[index] = count
+        for day in range(7):
+            following = NO_RATE
+            for index in range((day + 1) * MINUTES_PER_DAY - 1, day * MINUTES_PER_DAY - 1, -1):
+                if cells[index] != NO_RATE:
+                    following = cells[index]
+                next_rate[index] = following
+
+        self.cells = cells
+        self.runs = runs
+        self.next_rate = next_rate
+
+    def rebased(self, table: RateTable) -> 'OccupancyTable':
+        """
+        Get the occupancy table of the same rates in a modified copy of the rate table.
+
+        Parameters:
+        - table (RateTable): The modified table, where the compiled rates did not change.
+
+        Returns:
+        - OccupancyTable: A table sharing the compiled arrays of this one.
+        """
+        occupancy = copy.copy(self)
+        occupancy.rate_table = table
+        return occupancy
+
+    def find(self, day_of_week: int, start_minute: int, end_minute: int) -> Optional[int]:
+        """
+        Find the single rate matching an interval, with the same semantics as RatesRepository.find_rate.
+
+        Parameters:
+        - day_of_week (int): Day of the week (0 for Monday, 1 for Tuesday, ..., 6 for Sunday).
+        - start_minute (int): Start of the interval in minutes since midnight.
+        - end_minute (int): End of the interval in minutes since midnight.
+
+        Returns:
+        - int or None: Position of the matching rate in the rate table, or None if no rate matches.
+
+        Raises:
+        - MultipleRatesError: If more than one rate matches the interval.
+        """
+        cells = self.cells
+        first = day_of_week * MINUTES_PER_DAY + start_minute
+        last = day_of_week * MINUTES_PER_DAY + end_minute
+
+        count = self.runs[last] - self.runs[first] + (cells[first] != NO_RATE)
+
+        # A rate ending exactly at the end of the interval does not match unless it also covers the start
+        if last > first and cells[last - 1] not in (NO_RATE, cells[last], cells[first]):
+            count -= 1
+
+        if count == 0:
+            return None
+        if count > 1:
+            raise MultipleRatesError("Multiple rates found for the given interval")
+
+        for rate_id in (cells[first], cells[last], self.next_rate[first]):
+            if rate_id != NO_RATE:
+                return self.positions[rate_id]
+
+
+class OccupancyTables:
+    """
+    Occupancy tables for a rate set, one per group of timezones sharing an offset.
+
+    Which rate timezones match a requested offset depends on the instant being priced,
+    so tables are keyed by the group of matching timezones. Tables for single timezones
+    are compiled up front and other groups on first use. Groups holding rates known to
+    overlap are not compiled at all.
+
+    Offsets only change at timezone transitions, so the group matching an offset is
+    resolved once per span between transitions, and a lookup is then a bisect over the
+    transitions and two dict reads. After a patch of the rates, only the groups of the
+    timezones holding a changed rate are compiled again.
+    """
+
+    def __init__(self, table: RateTable, offsets: TimezoneOffsetTable, conflicts: Optional[RateConflicts] = None):
+        """
+        Compile the tables for the given rates.
+
+        Parameters:
+        - table (RateTable): Rates to compile.
+        - offsets (TimezoneOffsetTable): Offset table covering the timezones of the rates.
+        - conflicts (RateConflicts): Overlapping rates of the table, if known.
+        """
+        self.table = table
+        self.offsets = offsets
+        self.conflicts = conflicts
+        self.timezones = sorted(table.timezones)
+        self._positions: dict[int, list[int]] = {}
+        for position, mask in enumerate(table.day_masks):
+            if mask:
+                self._positions.setdefault(table.timezone_ids[position], []).append(position)
+        self._groups: dict[tuple[str, int], tuple[str, ...]] = {}
+        self._tables: dict[tuple[str, ...], Optional[OccupancyTable]] = {}
+        for timezone in self.timezones:
+            self._compile((timezone,))
+
+    def patched(self, table: RateTable, offsets: TimezoneOffsetTable, conflicts: Optional[RateConflicts],
+                buckets: dict[tuple[int, int], list[int]]) -> 'OccupancyTables':
+        """
+        Compile the tables of a modified copy of the compiled rate table, reusing the
+        tables of the groups whose timezones hold no changed rate.
+
+        Parameters:
+        - table (RateTable): The modified table. Unchanged rates must keep their positions.
+        - offsets (TimezoneOffsetTable): Offset table covering the timezones of the rates.
+        - conflicts (RateConflicts): Overlapping rates of the modified table, if known.
+        - buckets (dict[tuple[int, int], list[int]]): Rates of the changed weekday and timezone
+          buckets, as returned by RateIndex.changed_buckets.
+
+        Returns:
+        - OccupancyTables: The tables of the modified table. This object is left untouched.
+        """
+        occupancy = OccupancyTables.__new__(OccupancyTables)
+        occupancy.table = table
+        occupancy.offsets = offsets
+        occupancy.conflicts = conflicts
+        occupancy.timezones = sorted(table.timezones)
+
+        changed_ids = {timezone_id for _, timezone_id in buckets}
+        positions = dict(self._positions)
+        for timezone_id in changed_ids:
+            kept = {position for position in positions.pop(timezone_id, ())
+                    if table.day_masks[position] and table.timezone_ids[position] == timezone_id}
+            kept.update(position for (_, bucket_timezone_id), bucket in buckets.items()
+                        if bucket_timezone_id == timezone_id for position in bucket)
+            if kept:
+                positions[timezone_id] = sorted(kept)
+        occupancy._positions = positions
+
+        # Groups are resolved over the timezones of the table, which may have grown
+        same_timezones = offsets is self.offsets and len(table.timezones) == len(self.table.timezones)
+        occupancy._groups = dict(self._groups) if same_timezones else {}
+        changed = {table.timezones[timezone_id] for timezone_id in changed_ids}
+        occupancy._tables = {group: compiled.rebased(table) if compiled is not None else None
+                             for group, compiled in dict(self._tables).items() if changed.isdisjoint(group)}
+        for timezone in occupancy.timezones:
+            if (timezone,) not in occupancy._tables:
+                occupancy._compile((timezone,))
+        return occupancy
+
+    def table_for(self, timezone: str, at: datetime) -> Optional[OccupancyTable]:
+        """
+        Get the table for the rates matching a timezone offset at an instant.
+
+        Parameters:
+        - timezone (str): Timezone offset (e.g., '-0500').
+        - at (datetime): Instant being priced.
+
+        Returns:
+        - OccupancyTable or None: The table, or None if the matching rates cannot be compiled.
+        """
+        return self.table_for_timestamp(timezone, at.timestamp())
+
+    def table_for_timestamp(self, timezone: str, timestamp: float) -> Optional[OccupancyTable]:
+        """
+        Get the table for the rates matching a timezone offset at an epoch timestamp.
+
+        Parameters:
+        - timezone (str): Timezone offset (e.g., '-0500').
+        - timestamp (float): Seconds since the epoch of the instant being priced.
+
+        Returns:
+        - OccupancyTable or None: The table, or None if the matching rates cannot be compiled.
+        """
+        key = (timezone, self.offsets.transition_epoch(timestamp))
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = tuple(name for name in self.timezones
+                                              if self.offsets.offset_at_timestamp(name, timestamp) == timezone)
+        if group in self._tables:
+            return self._tables[group]
+        return self._compile(group)
+
+    def _compile(self, group: tuple[str, ...]) -> Optional[OccupancyTable]:
+        timezone_ids = [self.table.timezone_id(name) for name in group]
+        if self.conflicts is not None and not self.conflicts.timezone_ids.isdisjoint(timezone_ids):
+            table = None
+        else:
+            positions = sorted(chain.from_iterable(self._positions.get(timezone_id, ())
+                                                   for timezone_id in timezone_ids))
+            try:
+                table = OccupancyTable(self.table, positions)
+            except ValueError:
+                table = None
+        self._tables[group] = table
+        return table
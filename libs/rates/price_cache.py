@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable
+
+MISSING = object()
+
+
+class PriceCache:
+    """
+    Bounded, thread-safe LRU cache of price results for one rate version at a time.
+
+    Entries are tagged with the version of the rates that produced them. The first
+    lookup for a newer version drops every entry, so results never outlive the rate
+    set they were computed from. Lookups for an older version always miss.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        """
+        Initialize a PriceCache object.
+
+        Parameters:
+        - maxsize (int): Maximum number of entries kept.
+        """
+        if maxsize <= 0:
+            raise ValueError("Cache size must be a positive integer")
+        self.maxsize = maxsize
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version: int, key: Hashable):
+        """
+        Get the cached result for a key.
+
+        Parameters:
+        - version (int): Version of the rates the result is needed for.
+        - key (Hashable): Inputs determining the result.
+
+        Returns:
+        - The cached result, or MISSING if there is none.
+        """
+        with self._lock:
+            self._install(version)
+            if version == self.version and key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return MISSING
+
+    def put(self, version: int, key: Hashable, value) -> None:
+        """
+        Store the result for a key, evicting the least recently used entry if full.
+
+        Parameters:
+        - version (int): Version of the rates the result was computed from.
+        - key (Hashable): Inputs determining the result.
+        - value: The result.
+        """
+        with self._lock:
+            self._install(version)
+            if version != self.version:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Drop every entry.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Get the cache counters.
+
+        Returns:
+        - dict: Hits, misses, evictions, current size and rate version of the cache.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "version": self.version,
+            }
+
+    def _install(self, version: int) -> None:
+        if self.version is None or version > self.version:
+            self._entries.clear()
+            self.version = version
@@ -0,0 +1,44 @@
+from libs.utils.metrics import Registry
+
+STAGE_BUCKETS = (0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1)
+CANDIDATE_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class PriceMetrics:
+    """
+    Latency of each stage of pricing an interval, and number of candidate rates found for it.
+
+    Stages recorded by PriceService are 'validate', 'cache' and 'lookup'. Callers may
+    record their own stages, such as parsing the request, through `stage`.
+    """
+
+    def __init__(self, registry: Registry):
+        """
+        Register the metrics.
+
+        Parameters:
+        - registry (Registry): Registry the metrics are rendered from.
+        """
+        self.stages = registry.histogram('rates_price_stage_seconds', "Time spent in each stage of pricing an interval",
+                                         ['stage'], STAGE_BUCKETS)
+        self.candidates = registry.histogram(
+            'rates_price_candidate_rates',
+            "Rates matching a priced interval, any of them making the price unavailable if there are several",
+            buckets=CANDIDATE_BUCKETS
+        )
+        self.validate = self.stage('validate')
+        self.cache = self.stage('cache')
+        self.lookup = self.stage('lookup')
+
+    def stage(self, name: str):
+        """
+        Get the latency histogram of a stage.
+
+        Parameters:
+        - name (str): Name of the stage.
+
+        Returns:
+        - Histogram: The histogram, in seconds.
+        """
+        return self.stages.labels(name)
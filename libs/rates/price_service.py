@@ -1,40 +1,223 @@
+import threading
 from datetime import datetime
+from time import perf_counter
 from typing import Optional
 
 from libs.rates import RatesRepository
 from libs.rates.dto import Interval
+from libs.rates.occupancy_table import OccupancyTables
+from libs.rates.price_cache import MISSING, PriceCache
+from libs.rates.price_metrics import PriceMetrics
+from libs.rates.rate_snapshot import RateSnapshot
 from libs.utils.datetime_helper import get_timezone_offset_from_datetime
 from libs.utils.errors import MultipleDaysInputError, MultipleRatesError
 
 
 class PriceService:
-    def __init__(self, rates_repository: RatesRepository):
+    def __init__(self, rates_repository: RatesRepository, cache_size: int = 0, metrics: Optional[PriceMetrics] = None):
+        """
+        Initialize a PriceService object.
+
+        Parameters:
+        - rates_repository (RatesRepository): Repository holding the rates.
+        - cache_size (int): Number of price results memoized per rate version. 0 disables the cache.
+        - metrics (PriceMetrics): Metrics recording the latency of each stage of get_price. None disables them.
+        """
         self.rate_repository = rates_repository
+        self.cache: Optional[PriceCache] = PriceCache(cache_size) if cache_size else None
+        self.metrics = metrics
+        self._occupancy: Optional[OccupancyTables] = None
+        self._compiled_version = 0
+        self._compile_lock = threading.Lock()
+
+    def compile_rates(self) -> None:
+        """
+        Compile the current rate set into occupancy tables used by get_price.
+
+        Should be called whenever the rates are updated. Until then, or for rate sets that
+        cannot be compiled, get_price falls back to searching the repository. When the rates
+        were patched from the compiled ones, only the timezones holding a changed rate are
+        compiled again.
+
+        Once compiled, newer versions of the rates, e.g. published by another process sharing
+        the repository, are compiled by the first get_price call pricing against them.
+        """
+        self._compile(self.rate_repository.snapshot)
+
+    def _compile(self, snapshot: RateSnapshot, blocking: bool = True) -> Optional[OccupancyTables]:
+        """
+        Compile a snapshot, unless it is already compiled.
+
+        Parameters:
+        - snapshot (RateSnapshot): Rates to compile.
+        - blocking (bool): Whether to wait for another thread compiling meanwhile, rather
+          than return None.
+
+        Returns:
+        - OccupancyTables or None: The tables compiled for the snapshot.
+        """
+        if not self._compile_lock.acquire(blocking=blocking):
+            return None
+        try:
+            occupancy = self._occupancy
+            if occupancy is not None and occupancy.table is snapshot.table:
+                return occupancy
+            if occupancy is not None and snapshot.patch is not None and snapshot.patch.applies_to(occupancy.table):
+                occupancy = occupancy.patched(snapshot.table, snapshot.index.offsets, snapshot.conflicts,
+                                              snapshot.patch.buckets)
+            else:
+                occupancy = OccupancyTables(snapshot.table, snapshot.index.offsets, snapshot.conflicts)
+            self._occupancy = occupancy
+            self._compiled_version = snapshot.version
+            return occupancy
+        finally:
+            self._compile_lock.release()
 
-    def get_price(self, start: datetime, end: datetime) -> Optional[float or str]:
+    def get_price(self, start: datetime, end: datetime,
+                  snapshot: Optional[RateSnapshot] = None) -> Optional[float or str]:
         """
         Calculate the price for the specified time interval.
 
         Parameters:
         - start (datetime): Start datetime of the interval.
         - end (datetime): End datetime of the interval.
+        - snapshot (RateSnapshot): Rate snapshot to price against. Defaults to the current rates
+          of the repository; pass one to know which version produced the price.
 
         Returns:
         - float or None: Price for the interval, or None if no matching rate is found.
         """
+        if snapshot is None and self.cache is None:
+            occupancy = self._compiled_for(self.rate_repository)
+            return self._get_price(start, end, self.rate_repository.find_rate, occupancy)
+        return self._get_snapshot_price(start, end, snapshot or self.rate_repository.snapshot)
+
+    def get_price_batch(self, intervals: list[tuple[datetime, datetime]],
+                        snapshot: Optional[RateSnapshot] = None) -> list:
+        """
+        Calculate the prices for a list of time intervals against a single rate snapshot.
+
+        Every interval of the batch is priced by the same rates even if they are updated
+        while the batch runs.
+
+        Parameters:
+        - intervals (list[tuple[datetime, datetime]]): Start and end datetimes of each interval.
+        - snapshot (RateSnapshot): Rate snapshot to price against. Defaults to the current one.
+
+        Returns:
+        - list: One result per interval, in order. Each result is the price as returned by
+          get_price, or the ValueError raised while validating the interval.
+        """
+        snapshot = snapshot or self.rate_repository.snapshot
+
+        results = []
+        for start, end in intervals:
+            try:
+                results.append(self._get_snapshot_price(start, end, snapshot))
+            except ValueError as e:
+                results.append(e)
+        return results
+
+    def get_prices(self, starts, ends, utc_offsets):
+        """
+        Calculate the prices for arrays of time intervals with vectorized operations.
+
+        Intended for pricing large volumes of intervals at once, e.g. historical sessions.
+        All intervals are priced against a single rate set, with the same rules as get_price.
+
+        Parameters:
+        - starts (array-like): Start of each interval, in seconds since the epoch.
+        - ends (array-like): End of each interval, in seconds since the epoch.
+        - utc_offsets (array-like): UTC offset of each interval, in minutes east of UTC.
+
+        Returns:
+        - numpy.ndarray: Price of each interval, or price_vectors.PRICE_UNAVAILABLE where the
+          price is unavailable and price_vectors.PRICE_NOT_FOUND where no rate matches.
+        """
+        # NumPy is only needed for vectorized pricing, so it is not imported with the service
+        from libs.rates.price_vectors import price_vectors
+
+        snapshot = self.rate_repository.snapshot
+        occupancy = self._compiled_for(snapshot) or \
+            OccupancyTables(snapshot.table, snapshot.index.offsets, snapshot.conflicts)
+
+        return price_vectors(starts, ends, utc_offsets, occupancy,
+                             lambda start, end: self._get_price(start, end, snapshot.index.find, None))
+
+    def _get_snapshot_price(self, start: datetime, end: datetime, snapshot: RateSnapshot):
+        """
+        Calculate the price for the specified time interval against a snapshot, memoizing the
+        result if the cache is enabled.
+
+        Parameters:
+        - start (datetime): Start datetime of the interval.
+        - end (datetime): End datetime of the interval.
+        - snapshot (RateSnapshot): Rate snapshot to price against.
+
+        Returns:
+        - float or None: Price for the interval, or None if no matching rate is found.
+        """
+        occupancy = self._compiled_for(snapshot)
+        if self.cache is None:
+            return self._get_price(start, end, snapshot.index.find, occupancy)
+
+        metrics = self.metrics
+        began = perf_counter() if metrics is not None else 0.0
         try:
             self._validate_interval(start, end)
+        except MultipleDaysInputError:
+            return "unavailable"
 
-            day_of_week = start.weekday()
-            interval = self._create_interval(start, end)
-            timezone = get_timezone_offset_from_datetime(start)
+        # The price only depends on the weekday and times of the interval, its offset and the
+        # span between timezone transitions it falls in, which fixes the offsets of the rates
+        key = (
+            start.weekday(),
+            start.hour * 100 + start.minute,
+            end.hour * 100 + end.minute,
+            get_timezone_offset_from_datetime(start),
+            snapshot.index.offsets.transition_epoch(start.timestamp())
+        )
+        price = self.cache.get(snapshot.version, key)
+        if metrics is not None:
+            metrics.cache.observe(perf_counter() - began)
+        if price is MISSING:
+            price = self._get_price(start, end, snapshot.index.find, occupancy)
+            self.cache.put(snapshot.version, key, price)
+        return price
 
-            rates = self.rate_repository.find_rate(day_of_week, interval, timezone)
+    def _compiled_for(self, source) -> Optional[OccupancyTables]:
+        """
+        Get the occupancy tables if they were compiled for the rate table of the source,
+        a repository or a snapshot.
+        """
+        occupancy = self._occupancy
+        if occupancy is None or occupancy.table is source.table:
+            return occupancy
+        snapshot = source if isinstance(source, RateSnapshot) else source.snapshot
+        if snapshot.table is source.table and snapshot.version > self._compiled_version:
+            # Newer rates were published without compile_rates, e.g. by another process; a
+            # request compiling them meanwhile leaves the others searching the index
+            return self._compile(snapshot, blocking=False)
+        return None
 
-            if len(rates) > 1:
-                raise MultipleRatesError("Multiple rates found for the given interval")
+    def _get_price(self, start: datetime, end: datetime, find_rate, occupancy: Optional[OccupancyTables]):
+        """
+        Calculate the price for the specified time interval.
 
-            return rates[0].get_price() if rates else None
+        Parameters:
+        - start (datetime): Start datetime of the interval.
+        - end (datetime): End datetime of the interval.
+        - find_rate (callable): Function searching the rates, with the signature of RatesRepository.find_rate.
+        - occupancy (OccupancyTables): Compiled tables for the rate set, if any.
+
+        Returns:
+        - float or None: Price for the interval, or None if no matching rate is found.
+        """
+        try:
+            if self.metrics is not None:
+                return self._measure_price(start, end, find_rate, occupancy)
+            self._validate_interval(start, end)
+            return self._find_price(start, end, find_rate, occupancy)
 
         except MultipleDaysInputError:
             return "unavailable"
@@ -43,6 +226,58 @@ class PriceService:
         except Exception as e:
             raise e
 
+    def _measure_price(self, start: datetime, end: datetime, find_rate, occupancy: Optional[OccupancyTables]):
+        """
+        Validate the interval and find its price, recording the latency of each stage.
+        """
+        metrics = self.metrics
+        began = perf_counter()
+        self._validate_interval(start, end)
+        validated = perf_counter()
+        metrics.validate.observe(validated - began)
+        try:
+            return self._find_price(start, end, find_rate, occupancy, metrics)
+        finally:
+            metrics.lookup.observe(perf_counter() - validated)
+
+    def _find_price(self, start: datetime, end: datetime, find_rate, occupancy: Optional[OccupancyTables],
+                    metrics: Optional[PriceMetrics] = None):
+        """
+        Find the price of a valid interval.
+
+        Returns:
+        - float or None: Price for the interval, or None if no matching rate is found.
+
+        Raises:
+        - MultipleRatesError: If more than one rate matches the interval.
+        """
+        day_of_week = start.weekday()
+        timezone = get_timezone_offset_from_datetime(start)
+
+        if occupancy is not None:
+            table = occupancy.table_for(timezone, start)
+            if table is not None:
+                try:
+                    position = table.find(day_of_week, start.hour * 60 + start.minute, end.hour * 60 + end.minute)
+                except MultipleRatesError:
+                    # The tables only tell that several rates match, which is all the price depends on
+                    if metrics is not None:
+                        metrics.candidates.observe(2)
+                    raise
+                if metrics is not None:
+                    metrics.candidates.observe(position is not None)
+                return occupancy.table.prices[position] if position is not None else None
+
+        interval = self._create_interval(start, end)
+        rates = find_rate(day_of_week, interval, timezone, start)
+        if metrics is not None:
+            metrics.candidates.observe(len(rates))
+
+        if len(rates) > 1:
+            raise MultipleRatesError("Multiple rates found for the given interval")
+
+        return rates[0].get_price() if rates else None
+
     def _validate_interval(self, start: datetime, end: datetime) -> None:
         """
         Validate the time interval.
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+import numpy as np
+
+from libs.rates.occupancy_table import MINUTES_PER_DAY, NO_RATE, OccupancyTable, OccupancyTables
+from libs.utils.datetime_helper import format_utc_offset
+
+PRICE_UNAVAILABLE = -1
+PRICE_NOT_FOUND = -2
+
+CHUNK_SIZE = 1_000_000
+SECONDS_PER_DAY = 86400
+# 1970-01-01 was a Thursday
+EPOCH_WEEKDAY = 3
+# Offsets are at most ±18 hours, so an offset in minutes shifted by this fits in 12 bits
+OFFSET_SHIFT = 2048
+
+
+def price_vectors(starts, ends, utc_offsets, occupancy: OccupancyTables,
+                  get_price: Callable[[datetime, datetime], object]) -> np.ndarray:
+    """
+    Price arrays of intervals with the semantics of PriceService.get_price.
+
+    Parameters:
+    - starts (array-like): Start of each interval, in seconds since the epoch.
+    - ends (array-like): End of each interval, in seconds since the epoch.
+    - utc_offsets (array-like): UTC offset of each interval, in minutes east of UTC.
+    - occupancy (OccupancyTables): Compiled tables for the rate set.
+    - get_price (callable): Prices a single interval, used for rates that cannot be compiled.
+
+    Returns:
+    - np.ndarray: Price of each interval, PRICE_UNAVAILABLE where the interval spans days or
+      rates, and PRICE_NOT_FOUND where no rate matches.
+
+    Raises:
+    - ValueError: If any interval does not start before it ends.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    utc_offsets = np.asarray(utc_offsets, dtype=np.int64)
+    if not starts.shape == ends.shape == utc_offsets.shape or starts.ndim != 1:
+        raise ValueError("Starts, ends and offsets must be one-dimensional arrays of the same length")
+
+    invalid = np.flatnonzero(starts >= ends)
+    if invalid.size:
+        raise ValueError(f"Start date time must be before end date time (row {invalid[0]})")
+
+    transitions = np.unique(np.array(
+        [transition for name in occupancy.timezones for transition in occupancy.offsets.transitions(name)],
+        dtype=np.float64
+    ))
+
+    prices = np.empty(starts.shape, dtype=np.int64)
+    for chunk in range(0, len(starts), CHUNK_SIZE):
+        window = slice(chunk, chunk + CHUNK_SIZE)
+        prices[window] = _price_chunk(starts[window], ends[window], utc_offsets[window],
+                                      transitions, occupancy, get_price)
+    return prices
+
+
+def _price_chunk(starts, ends, utc_offsets, transitions, occupancy: OccupancyTables, get_price) -> np.ndarray:
+    local_starts = starts + utc_offsets * 60
+    local_ends = ends + utc_offsets * 60
+    days = local_starts // SECONDS_PER_DAY
+    same_day = days == local_ends // SECONDS_PER_DAY
+    weekdays = (days + EPOCH_WEEKDAY) % 7
+    start_minutes = (local_starts % SECONDS_PER_DAY) // 60
+    end_minutes = (local_ends % SECONDS_PER_DAY) // 60
+
+    prices = np.full(starts.shape, PRICE_UNAVAILABLE, dtype=np.int64)
+
+    # Rate timezone offsets only change at transitions, so every row between two transitions
+    # with the same requested offset is priced by the same table
+    epochs = np.searchsorted(transitions, starts, side='right')
+    keys, first_rows, groups = np.unique(epochs * (2 * OFFSET_SHIFT) + utc_offsets + OFFSET_SHIFT,
+                                         return_index=True, return_inverse=True)
+
+    tables: list[OccupancyTable] = []
+    positions: dict[int, int] = {}
+    table_ids = np.empty(len(keys), dtype=np.int64)
+    for key, row in enumerate(first_rows):
+        offset = format_utc_offset(timedelta(minutes=int(utc_offsets[row])))
+        table = occupancy.table_for_timestamp(offset, float(starts[row]))
+        if id(table) not in positions:
+            positions[id(table)] = len(tables)
+            tables.append(table)
+        table_ids[key] = positions[id(table)]
+    row_tables = table_ids[groups.reshape(-1)]
+
+    for table_id, table in enumerate(tables):
+        rows = np.flatnonzero((row_tables == table_id) & same_day)
+        if not rows.size:
+            continue
+        if table is None:
+            prices[rows] = [_price_row(starts[row], ends[row], utc_offsets[row], get_price) for row in rows]
+        else:
+            prices[rows] = _find_prices(table, weekdays[rows], start_minutes[rows], end_minutes[rows])
+
+    return prices
+
+
+def _find_prices(table: OccupancyTable, weekdays, start_minutes, end_minutes) -> np.ndarray:
+    """
+    Vectorized OccupancyTable.find returning prices.
+    """
+    cells = np.frombuffer(table.cells, dtype=table.cells.typecode)
+    runs = np.frombuffer(table.runs, dtype=table.runs.typecode)
+    next_rate = np.frombuffer(table.next_rate, dtype=table.next_rate.typecode)
+    positions = np.frombuffer(table.positions, dtype=table.positions.typecode)
+    rate_prices = np.append(np.frombuffer(table.rate_table.prices, dtype=np.int64)[positions], PRICE_NOT_FOUND)
+
+    first = weekdays * MINUTES_PER_DAY + start_minutes
+    last = weekdays * MINUTES_PER_DAY + end_minutes
+    first_cells = cells[first]
+    last_cells = cells[last]
+    before_last = cells[np.maximum(last - 1, first)]
+
+    counts = runs[last].astype(np.int64) - runs[first] + (first_cells != NO_RATE)
+    counts -= (last > first) & (before_last != NO_RATE) & (before_last != last_cells) & (before_last != first_cells)
+
+    rate_ids = np.where(first_cells != NO_RATE, first_cells,
+                        np.where(last_cells != NO_RATE, last_cells, next_rate[first]))
+    prices = rate_prices[np.where(rate_ids == NO_RATE, len(positions), rate_ids)]
+    prices[counts == 0] = PRICE_NOT_FOUND
+    prices[counts > 1] = PRICE_UNAVAILABLE
+    return prices
+
+
+def _price_row(start: int, end: int, utc_offset: int, get_price) -> int:
+    tz = timezone(timedelta(minutes=int(utc_offset)))
+    price = get_price(datetime.fromtimestamp(int(start), tz), datetime.fromtimestamp(int(end), tz))
+    if price is None:
+        return PRICE_NOT_FOUND
+    if price == "unavailable":
+        return PRICE_UNAVAILABLE
+    return price
@@ -0,0 +1,149 @@
+from typing import Iterable, Optional
+
+from libs.rates.dto import Rate
+from libs.rates.rate_table import RateTable, days_to_mask, mask_to_days
+
+
+MAX_REPORTED_PAIRS = 100
+
+
+class RateConflicts:
+    """
+    Rates overlapping another rate on a weekday in the same timezone.
+
+    Such rates make every price request they both match "unavailable". Periods ending
+    before they start cannot be ordered and are left out, which is why strict rate
+    services reject them.
+
+    Conflicts are kept per weekday and timezone bucket, as the set of overlapping rates and
+    a sample of at most MAX_REPORTED_PAIRS overlapping pairs, so they take linear space and
+    time however densely the rates overlap.
+    """
+
+    def __init__(self, buckets: Optional[dict[tuple[int, int], tuple[frozenset, list[tuple[int, int]]]]] = None):
+        """
+        Initialize a RateConflicts object.
+
+        Parameters:
+        - buckets (dict): Overlapping rates and sample of overlapping pairs, first one lowest,
+          by weekday and timezone id.
+        """
+        self._buckets = {key: bucket for key, bucket in (buckets or {}).items() if bucket[0]}
+        self.positions: frozenset[int] = frozenset().union(*(positions for positions, _ in self._buckets.values()))
+        self.timezone_ids = frozenset(timezone_id for _, timezone_id in self._buckets)
+        self.pairs = sorted({pair for _, pairs in self._buckets.values() for pair in pairs})[:MAX_REPORTED_PAIRS]
+
+    def __bool__(self) -> bool:
+        return bool(self.positions)
+
+    def __contains__(self, position: int) -> bool:
+        return position in self.positions
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def patched(self, table: RateTable, buckets: dict[tuple[int, int], list[int]]) -> 'RateConflicts':
+        """
+        Find the conflicts of a modified copy of the table, sweeping only the buckets that changed.
+
+        Parameters:
+        - table (RateTable): The modified table. Unchanged rates must keep their positions.
+        - buckets (dict[tuple[int, int], list[int]]): Positions of the rates of every changed
+          bucket, by weekday and timezone id. Empty for buckets left without rates.
+
+        Returns:
+        - RateConflicts: The overlapping rates of the modified table.
+        """
+        patched = dict(self._buckets)
+        for key, positions in buckets.items():
+            patched[key] = sweep(table, positions)
+        return RateConflicts(patched)
+
+
+def find_conflicts(table: RateTable) -> RateConflicts:
+    """
+    Find the overlapping rates of a table with a sweep line per weekday and timezone.
+
+    Parameters:
+    - table (RateTable): Rates to check.
+
+    Returns:
+    - RateConflicts: The overlapping rates.
+    """
+    groups: dict[tuple[int, int], list[int]] = {}
+    for position, mask in enumerate(table.day_masks):
+        for day in mask_to_days(mask):
+            groups.setdefault((day, table.timezone_ids[position]), []).append(position)
+
+    return RateConflicts({key: sweep(table, positions) for key, positions in groups.items()})
+
+
+def sweep(table: RateTable, positions: list[int]) -> tuple[frozenset, list[tuple[int, int]]]:
+    """
+    Find the overlapping rates among rates sharing a weekday and a timezone.
+
+    Parameters:
+    - table (RateTable): Table holding the rates.
+    - positions (list[int]): Positions of the rates.
+
+    Returns:
+    - tuple[frozenset, list[tuple[int, int]]]: Positions of the rates overlapping another one,
+      and at most MAX_REPORTED_PAIRS overlapping pairs.
+    """
+    starts, ends = table.starts, table.ends
+    regular = sorted((position for position in positions if starts[position] < ends[position]),
+                     key=lambda position: starts[position])
+
+    overlapping = set()
+    pairs = []
+    # Rate with the latest end among the ones starting before the current one
+    latest = None
+    for rank, position in enumerate(regular):
+        if latest is not None and starts[position] < ends[latest]:
+            overlapping.add(position)
+            if len(pairs) < MAX_REPORTED_PAIRS:
+                pairs.append((min(latest, position), max(latest, position)))
+        # The next rate starts first among the following ones, so it tells if any overlaps this one
+        if rank + 1 < len(regular) and starts[regular[rank + 1]] < ends[position]:
+            overlapping.add(position)
+        if latest is None or ends[position] > ends[latest]:
+            latest = position
+
+    return frozenset(overlapping), pairs
+
+
+def rate_key(rate: Rate) -> tuple[int, int, int, str, int]:
+    """
+    Get a hashable key equal for rates with the same weekdays, period, timezone and price.
+
+    Parameters:
+    - rate (Rate): Rate to get the key of.
+
+    Returns:
+    - tuple[int, int, int, str, int]: Weekday mask, start, end, timezone and price of the rate.
+    """
+    return days_to_mask(rate.days_of_week), rate.period.start, rate.period.end, rate.timezone, rate.price
+
+
+def normalize_rates(rates: Iterable[Rate]) -> tuple[list[Rate], list[int]]:
+    """
+    Drop exact duplicates from rates. The rates themselves are left untouched.
+
+    Parameters:
+    - rates (Iterable[Rate]): Rates to normalize.
+
+    Returns:
+    - tuple[list[Rate], list[int]]: The distinct rates, in order of first appearance, and
+      the index of each of them in the given rates.
+    """
+    normalized = []
+    indexes = []
+    seen = set()
+    for index, rate in enumerate(rates):
+        key = rate_key(rate)
+        if key in seen:
+            continue
+        seen.add(key)
+        normalized.append(rate)
+        indexes.append(index)
+    return normalized, indexes
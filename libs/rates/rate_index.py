@@ -0,0 +1,239 @@
+import time
+from bisect import bisect_right
+from datetime import datetime
+from typing import Iterable, Optional
+
+from libs.rates.dto import Interval, Rate
+from libs.rates.rate_table import RateTable, mask_to_days
+from libs.utils.timezone_offsets import DEFAULT_OFFSET_YEARS, TimezoneOffsetTable
+
+
+def overlaps(start: int, end: int, interval: Interval) -> bool:
+    """
+    Check whether a requested interval overlaps a rate period.
+
+    Parameters:
+    - start (int): Start of the rate period (HHMM).
+    - end (int): End of the rate period (HHMM).
+    - interval (Interval): Requested time interval.
+
+    Returns:
+    - bool: True if the interval overlaps the rate period.
+    """
+    return (start <= interval.start < end) or \
+        (start <= interval.end < end) or \
+        (interval.start < start and interval.end > end)
+
+
+class _IntervalBucket:
+    """
+    Rates sharing a weekday and a timezone, arranged for overlap queries.
+
+    Well-formed periods (start < end) are sorted by start and the day is split into
+    elementary segments between period boundaries, each holding the periods covering it.
+    An overlap query is then a stabbing lookup for the low end of the interval plus a
+    contiguous range of starts up to the high end, both found with bisect.
+    """
+
+    def __init__(self, table: RateTable, positions: list[int]):
+        starts, ends = table.starts, table.ends
+        regular = sorted((position for position in positions if starts[position] < ends[position]),
+                         key=lambda position: starts[position])
+        self._positions = regular
+        self._periods = [(starts[position], ends[position]) for position in regular]
+        self._starts = [start for start, _ in self._periods]
+        self._boundaries = sorted({bound for period in self._periods for bound in period})
+
+        self._segments: list[list[int]] = [[] for _ in self._boundaries]
+        for entry, (start, end) in enumerate(self._periods):
+            first = bisect_right(self._boundaries, start) - 1
+            last = bisect_right(self._boundaries, end) - 1
+            for segment in range(first, last):
+                self._segments[segment].append(entry)
+
+        # Periods ending before they start cannot be ordered; they are checked one by one
+        self._irregular = [(position, starts[position], ends[position])
+                           for position in positions if starts[position] >= ends[position]]
+
+    def positions(self) -> list[int]:
+        """
+        Get the rates of this bucket.
+
+        Returns:
+        - list[int]: Positions of the rates in the rate table.
+        """
+        return self._positions + [position for position, _, _ in self._irregular]
+
+    def overlapping(self, interval: Interval) -> list[int]:
+        """
+        Find the rates in this bucket overlapping the interval.
+
+        Parameters:
+        - interval (Interval): Time interval to search for rates.
+
+        Returns:
+        - list[int]: Positions of the matching rates in the rate table.
+        """
+        low, high = min(interval.start, interval.end), max(interval.start, interval.end)
+
+        # Periods covering the low end of the interval
+        candidates = []
+        segment = bisect_right(self._boundaries, low) - 1
+        if segment >= 0:
+            candidates.extend(self._segments[segment])
+
+        # Periods starting inside the interval
+        candidates.extend(range(bisect_right(self._starts, low), bisect_right(self._starts, high)))
+
+        matches = [self._positions[entry] for entry in candidates if overlaps(*self._periods[entry], interval)]
+        matches.extend(position for position, start, end in self._irregular if overlaps(start, end, interval))
+        return matches
+
+
+class RateIndex:
+    """
+    Lookup structure over a rate table, keyed by weekday and timezone.
+
+    The index is built once per rate set and returns the same rates, in the same order,
+    as a linear scan over the set would. Timezone offsets of the rates are resolved
+    from a precomputed transition table for the instant being queried.
+    """
+
+    def __init__(self, table: RateTable, offset_years: tuple[int, int] = DEFAULT_OFFSET_YEARS):
+        """
+        Build the index for the given rates.
+
+        Parameters:
+        - table (RateTable): Rates to index.
+        - offset_years (tuple[int, int]): First and last year covered by the timezone offset table.
+        """
+        self.table = table
+
+        grouped: dict[tuple[int, int], list[int]] = {}
+        for position, mask in enumerate(table.day_masks):
+            for day in mask_to_days(mask):
+                grouped.setdefault((day, table.timezone_ids[position]), []).append(position)
+
+        self._buckets = {key: _IntervalBucket(table, positions) for key, positions in grouped.items()}
+        self._timezones_by_day = self._group_timezones(self._buckets)
+        self.offsets = TimezoneOffsetTable(table.timezones, offset_years)
+
+    def changed_buckets(self, table: RateTable,
+                        changes: Iterable[tuple[int, int, int]]) -> dict[tuple[int, int], list[int]]:
+        """
+        Get the rates of the weekday and timezone buckets holding a changed rate, before or
+        after the change, in a modified copy of the indexed table.
+
+        Parameters:
+        - table (RateTable): The modified table. Unchanged rates must keep their positions.
+        - changes (Iterable[tuple[int, int, int]]): Position, previous weekday mask and previous
+          timezone id of every changed rate. New rates have a previous mask of 0.
+
+        Returns:
+        - dict[tuple[int, int], list[int]]: Positions of the rates of every changed bucket, by
+          weekday and timezone id. Empty for buckets left without rates.
+        """
+        changed = set()
+        affected = set()
+        for position, previous_mask, previous_timezone_id in changes:
+            changed.add(position)
+            affected.update((day, previous_timezone_id) for day in mask_to_days(previous_mask))
+            if table.contains(position):
+                timezone_id = table.timezone_ids[position]
+                affected.update((day, timezone_id) for day in mask_to_days(table.day_masks[position]))
+
+        buckets = {}
+        for day, timezone_id in affected:
+            positions = [position for position in self.bucket_positions(day, timezone_id) if position not in changed]
+            positions.extend(position for position in changed
+                             if table.contains(position) and table.timezone_ids[position] == timezone_id
+                             and table.day_masks[position] & (1 << day))
+            buckets[(day, timezone_id)] = positions
+        return buckets
+
+    def patched(self, table: RateTable, buckets: dict[tuple[int, int], list[int]]) -> 'RateIndex':
+        """
+        Build the index of a modified copy of the indexed table, reusing what did not change.
+
+        Only the changed buckets are rebuilt; the others are shared with this index, which
+        is left untouched.
+
+        Parameters:
+        - table (RateTable): The modified table. Unchanged rates must keep their positions.
+        - buckets (dict[tuple[int, int], list[int]]): Rates of the changed buckets, as
+          returned by changed_buckets.
+
+        Returns:
+        - RateIndex: Index for the modified table.
+        """
+        patched = dict(self._buckets)
+        for key, positions in buckets.items():
+            patched.pop(key, None)
+            if positions:
+                patched[key] = _IntervalBucket(table, positions)
+
+        index = RateIndex.__new__(RateIndex)
+        index.table = table
+        index._buckets = patched
+        index._timezones_by_day = self._group_timezones(patched)
+        if all(timezone in self.offsets for timezone in table.timezones):
+            index.offsets = self.offsets
+        else:
+            index.offsets = TimezoneOffsetTable(table.timezones, self.offsets.years)
+        return index
+
+    def bucket_positions(self, day: int, timezone_id: int) -> list[int]:
+        """
+        Get the rates of a weekday and timezone.
+
+        Parameters:
+        - day (int): Day of the week (0 for Monday, ..., 6 for Sunday).
+        - timezone_id (int): Id of the timezone in the indexed table.
+
+        Returns:
+        - list[int]: Positions of the rates in the rate table.
+        """
+        bucket = self._buckets.get((day, timezone_id))
+        return bucket.positions() if bucket is not None else []
+
+    @staticmethod
+    def _group_timezones(buckets: dict[tuple[int, int], _IntervalBucket]) -> dict[int, list[int]]:
+        timezones_by_day: dict[int, list[int]] = {}
+        for day, timezone_id in buckets:
+            timezones_by_day.setdefault(day, []).append(timezone_id)
+        return timezones_by_day
+
+    def find(self, day_of_week: int, interval: Interval, timezone: str, at: Optional[datetime] = None) -> list[Rate]:
+        """
+        Find rates overlapping the interval on the given day and timezone offset.
+
+        Parameters:
+        - day_of_week (int): Day of the week (0 for Monday, 1 for Tuesday, ..., 6 for Sunday).
+        - interval (Interval): Time interval to search for rates.
+        - timezone (str): Timezone offset (e.g., '-0500').
+        - at (datetime): Instant the offset of each rate timezone is resolved for. Defaults to now.
+
+        Returns:
+        - list[Rate]: Matching rates, in rate set order.
+        """
+        return [self.table.rate(position) for position in self.find_positions(day_of_week, interval, timezone, at)]
+
+    def find_positions(self, day_of_week: int, interval: Interval, timezone: str,
+                       at: Optional[datetime] = None) -> list[int]:
+        """
+        Find the positions of the rates overlapping the interval, without materializing them.
+
+        Parameters are the same as for find.
+
+        Returns:
+        - list[int]: Positions of the matching rates in the rate table, in ascending order.
+        """
+        timestamp = at.timestamp() if at is not None else time.time()
+
+        positions = []
+        for timezone_id in self._timezones_by_day.get(day_of_week, []):
+            if self.offsets.offset_at_timestamp(self.table.timezones[timezone_id], timestamp) == timezone:
+                positions.extend(self._buckets[(day_of_week, timezone_id)].overlapping(interval))
+
+        positions.sort()
+        return positions
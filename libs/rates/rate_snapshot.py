@@ -0,0 +1,150 @@
+import weakref
+from functools import cached_property
+from itertools import chain
+from typing import Iterable, Optional
+
+from libs.rates.dto import Rate
+from libs.rates.rate_conflicts import RateConflicts, find_conflicts
+from libs.rates.rate_index import RateIndex
+from libs.rates.rate_table import RateTable, days_to_mask
+
+
+class SnapshotPatch:
+    """
+    Changes of a snapshot built by RateSnapshot.patched, relative to the table it was patched from.
+
+    The base table is only weakly referenced, so snapshots do not keep the previous rate
+    sets alive. Structures compiled for the base table can be patched while it exists.
+    """
+
+    def __init__(self, base: RateTable, buckets: dict[tuple[int, int], list[int]]):
+        """
+        Initialize a SnapshotPatch object.
+
+        Parameters:
+        - base (RateTable): Table the snapshot was patched from.
+        - buckets (dict[tuple[int, int], list[int]]): Rates of the changed weekday and timezone
+          buckets, by weekday and timezone id, as returned by RateIndex.changed_buckets.
+        """
+        self._base = weakref.ref(base)
+        self.buckets = buckets
+
+    def applies_to(self, table: RateTable) -> bool:
+        """
+        Check whether the snapshot was patched from a table.
+
+        Parameters:
+        - table (RateTable): Table to check.
+
+        Returns:
+        - bool: True if the table is the base of the patch.
+        """
+        return self._base() is table
+
+
+class RateSnapshot:
+    """
+    Immutable, versioned view of a rate set and its lookup structures.
+
+    Snapshots are fully built before being published by the repository, so a reader
+    holding one always sees a complete rate set with the index built for it.
+    """
+
+    def __init__(self, version: int, table: RateTable, index: RateIndex, patch: Optional[SnapshotPatch] = None):
+        """
+        Initialize a RateSnapshot object.
+
+        Parameters:
+        - version (int): Version of the rate set, increasing with every update.
+        - table (RateTable): Rates of the snapshot.
+        - index (RateIndex): Index built for the table.
+        - patch (SnapshotPatch): Changes from the snapshot it was patched from, if any.
+        """
+        self.version = version
+        self.table = table
+        self.index = index
+        self.patch = patch
+
+    @cached_property
+    def conflicts(self) -> RateConflicts:
+        """
+        Overlapping rates of the snapshot, found on first use.
+        """
+        return find_conflicts(self.table)
+
+    def patched(self, version: int, upserts: list[tuple[Optional[int], Rate]],
+                deletes: Iterable[int] = ()) -> tuple['RateSnapshot', list[int]]:
+        """
+        Build a new snapshot with rates inserted, replaced and removed by id.
+
+        The rate table is copied column by column, and only the index buckets holding a
+        changed rate are rebuilt, as are the conflicts if they are known. The changed buckets
+        are kept in the `patch` of the new snapshot. This snapshot is left untouched.
+
+        Exact duplicates are stored once, as by a full update: an inserted rate equal to a
+        stored one is not added, and a rate replaced by a copy of another stored rate is
+        removed. The id of the stored rate is returned for both.
+
+        Parameters:
+        - version (int): Version of the new snapshot.
+        - upserts (list[tuple[Optional[int], Rate]]): Rates to store, with the id of the rate
+          they replace, or None to insert them.
+        - deletes (Iterable[int]): Ids of the rates to remove.
+
+        Returns:
+        - tuple[RateSnapshot, list[int]]: The new snapshot, and the ids of the upserted rates, in order.
+
+        Raises:
+        - KeyError: If an id does not match any rate.
+        """
+        table = self.table.copy()
+        changes = []
+
+        for rate_id in deletes:
+            if not table.contains(rate_id):
+                raise KeyError(rate_id)
+            changes.append((rate_id, table.day_masks[rate_id], table.timezone_ids[rate_id]))
+            table.remove(rate_id)
+
+        ids = []
+        stored = []
+        for rate_id, rate in upserts:
+            if rate_id is not None and not table.contains(rate_id):
+                raise KeyError(rate_id)
+            duplicate = self._find_duplicate(table, rate, stored)
+            if rate_id is None and duplicate is None:
+                rate_id = len(table)
+                changes.append((rate_id, 0, 0))
+                table.append(rate)
+                stored.append(rate_id)
+            elif rate_id is not None and duplicate in (None, rate_id):
+                changes.append((rate_id, table.day_masks[rate_id], table.timezone_ids[rate_id]))
+                table.replace(rate_id, rate)
+                stored.append(rate_id)
+            else:
+                if rate_id is not None:
+                    changes.append((rate_id, table.day_masks[rate_id], table.timezone_ids[rate_id]))
+                    table.remove(rate_id)
+                rate_id = duplicate
+            ids.append(rate_id)
+
+        buckets = self.index.changed_buckets(table, changes)
+        snapshot = RateSnapshot(version, table, self.index.patched(table, buckets), SnapshotPatch(self.table, buckets))
+        if 'conflicts' in self.__dict__:
+            # Only the changed buckets are swept again when the conflicts of this snapshot are known
+            snapshot.__dict__['conflicts'] = self.conflicts.patched(table, buckets)
+        return snapshot, ids
+
+    def _find_duplicate(self, table: RateTable, rate: Rate, stored: list[int]) -> Optional[int]:
+        # Duplicates share every weekday, so the index bucket of one of them holds them
+        mask = days_to_mask(rate.days_of_week)
+        timezone_id = table.timezone_id(rate.timezone)
+        if not mask or timezone_id is None:
+            return None
+        day = (mask & -mask).bit_length() - 1
+        for position in chain(self.index.bucket_positions(day, timezone_id), stored):
+            if table.day_masks[position] == mask and table.timezone_ids[position] == timezone_id \
+                    and table.starts[position] == rate.period.start and table.ends[position] == rate.period.end \
+                    and table.prices[position] == rate.price:
+                return position
+        return None
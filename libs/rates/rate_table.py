@@ -0,0 +1,196 @@
+from array import array
+from typing import Iterable, Optional
+
+from libs.rates.dto import Interval, Rate
+
+
+def days_to_mask(days_of_week: Iterable[int]) -> int:
+    """
+    Pack days of the week into a 7-bit mask.
+
+    Parameters:
+    - days_of_week (Iterable[int]): Days of the week (0 for Monday, ..., 6 for Sunday).
+
+    Returns:
+    - int: Mask with bit `day` set for every day.
+    """
+    mask = 0
+    for day in days_of_week:
+        if 0 <= day < 7:
+            mask |= 1 << day
+    return mask
+
+
+def mask_to_days(mask: int) -> list[int]:
+    """
+    Unpack a 7-bit mask into days of the week.
+
+    Parameters:
+    - mask (int): Mask with bit `day` set for every day.
+
+    Returns:
+    - list[int]: Days of the week, in ascending order.
+    """
+    return [day for day in range(7) if mask & (1 << day)]
+
+
+class RateTable:
+    """
+    Columnar storage for a rate set.
+
+    Each rate is a row across typed arrays: a weekday mask, period start and end (HHMM),
+    price and the id of its timezone in a list of interned names. Rate objects are only
+    materialized on demand.
+
+    The position of a row is the id of its rate. Removed rates leave a row without any
+    weekday, so the ids of the other rates never change.
+    """
+
+    def __init__(self, rates: Iterable[Rate] = ()):
+        """
+        Build the table from Rate objects.
+
+        Parameters:
+        - rates (Iterable[Rate]): Rates to store, in order.
+        """
+        self.day_masks = array('B')
+        self.starts = array('H')
+        self.ends = array('H')
+        self.prices = array('q')
+        self.timezone_ids = array('H')
+        self.timezones: list[str] = []
+        self._timezone_ids: dict[str, int] = {}
+
+        for rate in rates:
+            self.append(rate)
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def append(self, rate: Rate) -> None:
+        """
+        Append a rate to the table.
+
+        Parameters:
+        - rate (Rate): Rate to store.
+        """
+        self.day_masks.append(days_to_mask(rate.days_of_week))
+        self.starts.append(rate.period.start)
+        self.ends.append(rate.period.end)
+        self.prices.append(rate.price)
+        self.timezone_ids.append(self._intern(rate.timezone))
+
+    def replace(self, position: int, rate: Rate) -> None:
+        """
+        Replace the rate stored at a position.
+
+        Parameters:
+        - position (int): Position of the rate in the table.
+        - rate (Rate): Rate to store.
+        """
+        self.day_masks[position] = days_to_mask(rate.days_of_week)
+        self.starts[position] = rate.period.start
+        self.ends[position] = rate.period.end
+        self.prices[position] = rate.price
+        self.timezone_ids[position] = self._intern(rate.timezone)
+
+    def remove(self, position: int) -> None:
+        """
+        Remove the rate stored at a position, keeping the positions of the other rates.
+
+        Parameters:
+        - position (int): Position of the rate in the table.
+        """
+        self.day_masks[position] = 0
+
+    def contains(self, position: int) -> bool:
+        """
+        Check whether a rate is stored at a position.
+
+        Parameters:
+        - position (int): Position of the rate in the table.
+
+        Returns:
+        - bool: True if the position holds a rate that was not removed.
+        """
+        return 0 <= position < len(self) and self.day_masks[position] != 0
+
+    def copy(self) -> 'RateTable':
+        """
+        Copy the table, column by column.
+
+        Returns:
+        - RateTable: A table holding the same rows, which can be modified independently.
+        """
+        table = RateTable()
+        for name in ('day_masks', 'starts', 'ends', 'prices', 'timezone_ids'):
+            getattr(table, name).frombytes(memoryview(getattr(self, name)).cast('B'))
+        for timezone in self.timezones:
+            table._intern(timezone)
+        return table
+
+    def timezone_id(self, timezone: str) -> Optional[int]:
+        """
+        Get the interned id of a timezone name.
+
+        Parameters:
+        - timezone (str): Name of the timezone.
+
+        Returns:
+        - int or None: Id of the timezone in `timezones`, or None if no rate uses it.
+        """
+        return self._timezone_ids.get(timezone)
+
+    def _intern(self, timezone: str) -> int:
+        timezone_id = self._timezone_ids.get(timezone)
+        if timezone_id is None:
+            timezone_id = self._timezone_ids[timezone] = len(self.timezones)
+            self.timezones.append(timezone)
+        return timezone_id
+
+    def timezone(self, position: int) -> str:
+        """
+        Get the timezone name of a rate.
+
+        Parameters:
+        - position (int): Position of the rate in the table.
+
+        Returns:
+        - str: Name of the timezone.
+        """
+        return self.timezones[self.timezone_ids[position]]
+
+    def rate(self, position: int) -> Rate:
+        """
+        Materialize the rate stored at a position.
+
+        Parameters:
+        - position (int): Position of the rate in the table.
+
+        Returns:
+        - Rate: The rate.
+        """
+        return Rate(
+            mask_to_days(self.day_masks[position]),
+            Interval(self.starts[position], self.ends[position]),
+            self.timezone(position),
+            self.prices[position]
+        )
+
+    def ids(self) -> list[int]:
+        """
+        Get the ids of the rates of the table, skipping removed ones.
+
+        Returns:
+        - list[int]: Positions of the rates, in order.
+        """
+        return [position for position, mask in enumerate(self.day_masks) if mask]
+
+    def to_rates(self) -> list[Rate]:
+        """
+        Materialize every rate of the table.
+
+        Returns:
+        - list[Rate]: The rates, in order, skipping removed ones.
+        """
+        return [self.rate(position) for position in self.ids()]
@@ -0,0 +1,105 @@
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import get_context
+from typing import Iterable, Iterator, Optional
+
+from libs.rates.dto import Rate
+from libs.utils.errors import RatesValidationError
+
+CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+
+
+def parse_rates(rates_json: list[dict], first_index: int = 0) -> tuple[list[Rate], list[tuple[int, str]]]:
+    """
+    Validate and convert rates in their JSON form, collecting every error instead of stopping at the first.
+
+    Parameters:
+    - rates_json (list[dict]): The rates, in their JSON form.
+    - first_index (int): Index of the first rate in the whole payload, used to report errors.
+
+    Returns:
+    - tuple[list[Rate], list[tuple[int, str]]]: The valid rates, and the index and error of the invalid ones.
+    """
+    rates = []
+    errors = []
+    for index, rate in enumerate(rates_json, first_index):
+        try:
+            rates.append(Rate.to_model(rate))
+        except ValueError as e:
+            errors.append((index, str(e)))
+    return rates, errors
+
+
+def validate_rates(rates_json: Iterable[dict], executor: Optional[Executor] = None) -> Iterator[Rate]:
+    """
+    Validate and convert rates in their JSON form, chunk by chunk.
+
+    With an executor, chunks are validated in parallel, with a bounded number of them in
+    flight so memory stays flat when the rates are streamed. Rates are produced in order.
+
+    Parameters:
+    - rates_json (Iterable[dict]): The rates, in their JSON form.
+    - executor (Executor): Executor validating the chunks, typically a process pool. Defaults to validating inline.
+
+    Returns:
+    - Iterator[Rate]: The rates. Rates following an invalid one are still validated but no longer produced.
+
+    Raises:
+    - RatesValidationError: Once every rate is validated, if any is invalid. At most
+      MAX_REPORTED_ERRORS errors are reported.
+    """
+    errors: list[tuple[int, str]] = []
+    invalid = 0
+    rates_json = iter(rates_json)
+    chunks = iter(lambda: list(islice(rates_json, CHUNK_SIZE)), [])
+
+    if executor is None:
+        results = (parse_rates(chunk, number * CHUNK_SIZE) for number, chunk in enumerate(chunks))
+    else:
+        results = _parallel(chunks, executor)
+
+    for rates, chunk_errors in results:
+        if not invalid and not chunk_errors:
+            yield from rates
+        invalid += len(chunk_errors)
+        errors.extend(chunk_errors[:MAX_REPORTED_ERRORS - len(errors)])
+
+    if invalid > 1:
+        raise RatesValidationError(errors, f"{invalid} rates are invalid")
+    if invalid:
+        raise RatesValidationError(errors)
+
+
+def _parallel(chunks: Iterator[list[dict]], executor: Executor) -> Iterator[tuple[list[Rate], list[tuple[int, str]]]]:
+    in_flight = []
+    max_in_flight = 2 * (os.cpu_count() or 1)
+    for number, chunk in enumerate(chunks):
+        in_flight.append(executor.submit(parse_rates, chunk, number * CHUNK_SIZE))
+        if len(in_flight) >= max_in_flight:
+            yield in_flight.pop(0).result()
+    for future in in_flight:
+        yield future.result()
+
+
+def validation_executor() -> Optional[Executor]:
+    """
+    Get the process pool shared by parallel validations, starting it on first use.
+
+    Workers are spawned rather than forked, since the pool is started from a threaded server.
+
+    Returns:
+    - Executor or None: The process pool, or None on single-CPU hosts where validating inline is faster.
+    """
+    global _executor
+    if (os.cpu_count() or 1) < 2:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(mp_context=get_context('spawn'))
+        return _executor
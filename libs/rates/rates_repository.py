@@ -1,19 +1,115 @@
-from libs.rates.dto import Interval
-from libs.utils.datetime_helper import get_timezone_offset_from_name
+import threading
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+
+from libs.rates.dto import Interval, Rate
+from libs.rates.rate_index import RateIndex
+from libs.rates.rate_snapshot import RateSnapshot
+from libs.rates.rate_table import RateTable
+from libs.utils.timezone_offsets import DEFAULT_OFFSET_YEARS
 
 
 class RatesRepository:
-    def __init__(self):
-        self.database = []
+    """
+    In-memory rate store publishing copy-on-write snapshots.
+
+    Updates build a new snapshot off to the side and swap it in with a single reference
+    assignment, so readers never take a lock and never see a partially built rate set.
+    """
+
+    def __init__(self, offset_years: tuple[int, int] = DEFAULT_OFFSET_YEARS):
+        self.offset_years = offset_years
+        table = RateTable()
+        self._snapshot = RateSnapshot(0, table, RateIndex(table, self.offset_years))
+        self._write_lock = threading.Lock()
+
+    @property
+    def snapshot(self) -> RateSnapshot:
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    @property
+    def table(self) -> RateTable:
+        return self._snapshot.table
+
+    @property
+    def index(self) -> RateIndex:
+        return self._snapshot.index
+
+    @property
+    def database(self):
+        return self._snapshot.table.to_rates()
 
     def update_rates(self, rates):
-        self.database = rates
-        return self.database
+        return self.update_table(RateTable(rates)).to_rates()
+
+    def update_table(self, table: RateTable) -> RateTable:
+        """
+        Replace the rates with the ones of a table, without materializing them.
+
+        Parameters:
+        - table (RateTable): The new rates. The table must not be modified afterwards.
+
+        Returns:
+        - RateTable: The stored rates.
+        """
+        return self._publish(table).table
+
+    def patch_rates(self, upserts: list[tuple[Optional[int], Rate]], deletes: Iterable[int] = (),
+                    check: Optional[Callable[[RateSnapshot], None]] = None) -> list[int]:
+        """
+        Insert, replace and remove rates by id, publishing the result as a single new version.
+
+        Parameters:
+        - upserts (list[tuple[Optional[int], Rate]]): Rates to store, with the id of the rate
+          they replace, or None to insert them.
+        - deletes (Iterable[int]): Ids of the rates to remove.
+        - check (Callable[[RateSnapshot], None]): Called with the patched rates before they are
+          stored, raising to reject them.
+
+        Returns:
+        - list[int]: Ids of the upserted rates, in order.
+
+        Raises:
+        - KeyError: If an id does not match any rate. Nothing is changed then.
+        """
+        with self._write_lock:
+            snapshot, ids = self._snapshot.patched(self._snapshot.version + 1, upserts, deletes)
+            if check is not None:
+                check(snapshot)
+            self._snapshot = snapshot
+
+        return ids
+
+    def load_snapshot_file(self, path: str) -> None:
+        """
+        Replace the rates with the ones of a snapshot file, mapped in place without parsing.
+
+        Parameters:
+        - path (str): Path of the snapshot file, as written by libs.rates.snapshot_file.
+        """
+        # Imported here so the converter can run as a module of the package
+        from libs.rates.snapshot_file import map_snapshot
+
+        self._publish(map_snapshot(path))
 
     def get_rates(self):
-        return self.database
+        return self._snapshot.table.to_rates()
+
+    def _publish(self, table: RateTable) -> RateSnapshot:
+        index = RateIndex(table, self.offset_years)
+
+        # Only writers are serialized, to keep versions increasing
+        with self._write_lock:
+            snapshot = RateSnapshot(self._snapshot.version + 1, table, index)
+            self._snapshot = snapshot
 
-    def find_rate(self, day_of_week: int, interval: Interval, timezone: str):
+        return snapshot
+
+    def find_rate(self, day_of_week: int, interval: Interval, timezone: str, at: Optional[datetime] = None):
         """
         Find rates based on the specified criteria.
 
@@ -21,22 +117,10 @@ class RatesRepository:
         - day_of_week (int): Day of the week (0 for Monday, 1 for Tuesday, ..., 6 for Sunday).
         - interval (Interval): Time interval to search for rates.
         - timezone (str): Timezone offset (e.g., 'UTC-05:00').
+        - at (datetime): Instant the rate timezones are resolved for, usually the start of the interval.
+          Defaults to now.
 
         Returns:
         - List[Rate]: List of rates that match the criteria.
         """
-
-        # Initialize list to store matching rates
-        rates = []
-
-        # Iterate through database and find matching rates
-        for rate in self.database:
-            # Matching weekday and timezone
-            if day_of_week in rate.days_of_week and get_timezone_offset_from_name(rate.timezone) == timezone:
-                # Check if interval overlaps with rate period
-                if (rate.period.start <= interval.start < rate.period.end) or \
-                        (rate.period.start <= interval.end < rate.period.end) or \
-                        (interval.start < rate.period.start and interval.end > rate.period.end):
-                    rates.append(rate)
-
-        return rates
+        return self._snapshot.index.find(day_of_week, interval, timezone, at)
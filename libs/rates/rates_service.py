@@ -1,40 +1,178 @@
+from concurrent.futures import Executor
+from typing import Iterable, Optional
+
 from libs.rates.dto import Rate
 from libs.rates import RatesRepository
+from libs.rates.rate_conflicts import RateConflicts, find_conflicts, normalize_rates, rate_key
+from libs.rates.rate_snapshot import RateSnapshot
+from libs.rates.rate_table import RateTable
+from libs.rates.rate_validator import validate_rates
+from libs.utils.errors import RateConflictError, RatesValidationError
 
 
 class RatesService:
 
-    def __init__(self, rates_repository: RatesRepository):
+    def __init__(self, rates_repository: RatesRepository, strict: bool = False):
+        """
+        Args:
+            rates_repository (RatesRepository): Repository holding the rates.
+            strict (bool): Whether to reject rate sets where rates overlap, or where periods end
+                before they start and so cannot be checked for overlaps, instead of storing them.
+        """
         self.rates_repository = rates_repository
+        self.strict = strict
 
     def update_rates(self, rates) -> list[Rate]:
         """
         Updates the rates with the provided data.
 
         Retrieves the list of rates from the rates repository, updates them
-        with the provided data, and returns the modified rates.
+        with the provided data, and returns the modified rates. Exact duplicates
+        are stored once.
 
         Args:
             rates (list[Rate]): The list of Rate objects containing updated data.
 
         Returns:
             list[Rate]: The modified rates after updating.
+
+        Raises:
+            RatesValidationError: In strict mode, if periods end before they start, with the index of each.
+            RateConflictError: In strict mode, if rates overlap, with the indexes of overlapping pairs.
         """
 
         if not rates or any(not isinstance(rate, Rate) for rate in rates):
             raise Exception("Invalid rates provided. Please provide a list of Rate objects.")
 
+        rates, indexes = normalize_rates(rates)
+        if self.strict:
+            table = RateTable(rates)
+            self._check_periods(table, indexes)
+            self._check_conflicts(table, indexes)
+
         modified_rates: list[Rate] = self.rates_repository.update_rates(rates)
         return modified_rates
 
-    def get_rates(self) -> list[Rate]:
+    def ingest_rates(self, rates_json: Iterable[dict], executor: Optional[Executor] = None) -> RateTable:
+        """
+        Validates and stores rates read incrementally, e.g. from a streaming JSON parser.
+
+        Each rate is validated and appended to a compact rate table as it is read, so no
+        list of Rate objects is built. The rates are only stored once all of them are valid,
+        and replace the current ones in a single update. Exact duplicates are stored once.
+
+        Args:
+            rates_json (Iterable[dict]): The rates, in their JSON form.
+            executor (Executor): Executor validating chunks of rates in parallel. Defaults to validating inline.
+
+        Returns:
+            RateTable: The stored rates.
+
+        Raises:
+            RatesValidationError: If any rate is invalid, with the index and error of each invalid rate.
+                In strict mode, also if periods end before they start.
+            RateConflictError: In strict mode, if rates overlap, with the indexes of overlapping pairs.
+        """
+        table = RateTable()
+        indexes = []
+        seen = set()
+        for index, rate in enumerate(validate_rates(rates_json, executor)):
+            key = rate_key(rate)
+            if key not in seen:
+                seen.add(key)
+                table.append(rate)
+                indexes.append(index)
+
+        if not len(table):
+            raise Exception("Invalid rates provided. Please provide a list of Rate objects.")
+        if self.strict:
+            self._check_periods(table, indexes)
+            self._check_conflicts(table, indexes)
+
+        return self.rates_repository.update_table(table)
+
+    def patch_rates(self, upserts: list[tuple[Optional[int], Rate]], deletes: list[int]) -> list[int]:
+        """
+        Inserts, replaces and removes rates by id, as a single update.
+
+        Args:
+            upserts (list[tuple[Optional[int], Rate]]): Rates to store, with the id of the rate
+                they replace, or None to insert them.
+            deletes (list[int]): Ids of the rates to remove.
+
+        Exact duplicates of a stored rate are not stored again, and the id of the stored
+        rate is returned for them.
+
+        Returns:
+            list[int]: Ids of the upserted rates, in order.
+
+        Raises:
+            KeyError: If an id does not match any rate. Nothing is changed then.
+            RatesValidationError: In strict mode, if upserted periods end before they start, with
+                the index of each upsert.
+            RateConflictError: In strict mode, if the patched rates overlap, with the ids of
+                overlapping pairs. Nothing is changed then.
+        """
+        if not upserts and not deletes:
+            raise ValueError("No rates to upsert or delete")
+        if any(not isinstance(rate, Rate) for _, rate in upserts):
+            raise Exception("Invalid rates provided. Please provide a list of Rate objects.")
+
+        if self.strict:
+            self._check_periods(RateTable([rate for _, rate in upserts]), list(range(len(upserts))))
+        check = self._check_snapshot if self.strict else None
+        return self.rates_repository.patch_rates(upserts, deletes, check=check)
+
+    def get_conflicts(self, snapshot: Optional[RateSnapshot] = None) -> RateConflicts:
+        """
+        Retrieves the overlapping rates, by rate id.
+
+        Args:
+            snapshot (RateSnapshot): Snapshot to read the rates from. Defaults to the current rates.
+
+        Returns:
+            RateConflicts: The overlapping rates.
+        """
+        if snapshot is None:
+            snapshot = self.rates_repository.snapshot
+        return snapshot.conflicts
+
+    @staticmethod
+    def _check_periods(table: RateTable, indexes: list[int]) -> None:
+        # Such periods are left out of the conflict checks, so their overlaps would go unnoticed
+        errors = [(indexes[position], "Rate period must end after it starts")
+                  for position in range(len(table)) if table.starts[position] >= table.ends[position]]
+        if errors:
+            raise RatesValidationError(errors)
+
+    @staticmethod
+    def _check_conflicts(table: RateTable, indexes: list[int]) -> None:
+        # Report the rates by their index in the input rather than in the deduplicated table
+        conflicts = find_conflicts(table)
+        if conflicts:
+            raise RateConflictError([(indexes[first], indexes[second]) for first, second in conflicts.pairs],
+                                    f"{len(conflicts)} rates overlap" if len(conflicts) > 2 else None)
+
+    @staticmethod
+    def _check_snapshot(snapshot: RateSnapshot) -> None:
+        conflicts = snapshot.conflicts
+        if conflicts:
+            raise RateConflictError(conflicts.pairs, f"{len(conflicts)} rates overlap" if len(conflicts) > 2 else None)
+
+    def get_rates(self, snapshot: Optional[RateSnapshot] = None) -> list[Rate]:
         """
         Retrieves the list of rates.
 
-        Fetches the list of rates from the rates repository and returns it.
+        Fetches the list of rates from the rates repository, or from the given
+        snapshot of it, and returns it.
+
+        Args:
+            snapshot (RateSnapshot): Snapshot to read the rates from. Defaults to the current rates.
 
         Returns:
             list[Rate]: The list of rates.
         """
+        if snapshot is not None:
+            return snapshot.table.to_rates()
         rates = self.rates_repository.get_rates()
         return rates
@@ -0,0 +1,297 @@
+import fcntl
+import os
+import struct
+import sys
+import tempfile
+import threading
+from datetime import datetime
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, Iterable, Optional
+
+from libs.rates.dto import Interval, Rate
+from libs.rates.rate_index import RateIndex
+from libs.rates.rate_snapshot import RateSnapshot
+from libs.rates.rate_table import RateTable
+from libs.utils.timezone_offsets import DEFAULT_OFFSET_YEARS
+
+_VERSION = struct.Struct('<Q')
+
+
+class SharedRatesRepository:
+    """
+    Rate store shared by the processes of a host through shared memory, with the interface
+    of RatesRepository.
+
+    Every version of the rates is published as its own shared memory segment, in the
+    snapshot file format, and a small control segment holds the current version. Each
+    process reads the version on every access and maps a new segment when it changed,
+    so updates made by any process are visible to all of them on their next request,
+    without any message between them. The rate table is held once per host, while each
+    process builds its own index over it.
+    """
+
+    def __init__(self, name: str = 'rates', offset_years: tuple[int, int] = DEFAULT_OFFSET_YEARS):
+        """
+        Initialize a SharedRatesRepository object, attaching to the rates published under
+        a name or creating them empty.
+
+        Parameters:
+        - name (str): Name of the shared rates, the same in every process sharing them.
+        - offset_years (tuple[int, int]): First and last year covered by the timezone offset table.
+        """
+        self.name = name
+        self.offset_years = offset_years
+        self._snapshot: Optional[RateSnapshot] = None
+        self._write_lock = threading.Lock()
+        # Segments mapped by this process, the current one last
+        self._segments: list[shared_memory.SharedMemory] = []
+        self._segments_lock = threading.Lock()
+        self._lock_path = os.path.join(tempfile.gettempdir(), f"{name}.lock")
+        with self._host_lock():
+            try:
+                self._control = _attach(name)
+            except FileNotFoundError:
+                self._control = _attach(name, create=True, size=_VERSION.size)
+                _VERSION.pack_into(self._control.buf, 0, 0)
+
+    @property
+    def snapshot(self) -> RateSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != self.version:
+            snapshot = self._snapshot = self._load()
+            self._close_retired()
+        return snapshot
+
+    @property
+    def version(self) -> int:
+        return _VERSION.unpack_from(self._control.buf)[0]
+
+    @property
+    def table(self) -> RateTable:
+        return self.snapshot.table
+
+    @property
+    def index(self) -> RateIndex:
+        return self.snapshot.index
+
+    @property
+    def database(self):
+        return self.snapshot.table.to_rates()
+
+    def update_rates(self, rates):
+        return self.update_table(RateTable(rates)).to_rates()
+
+    def update_table(self, table: RateTable) -> RateTable:
+        """
+        Replace the rates of every process with the ones of a table.
+
+        Parameters:
+        - table (RateTable): The new rates.
+
+        Returns:
+        - RateTable: The stored rates, as shared by every process.
+        """
+        with self._host_lock():
+            self._publish(table, self.version + 1)
+        return self.table
+
+    def patch_rates(self, upserts: list[tuple[Optional[int], Rate]], deletes: Iterable[int] = (),
+                    check: Optional[Callable[[RateSnapshot], None]] = None) -> list[int]:
+        """
+        Insert, replace and remove rates by id, publishing the result as a single new version.
+
+        Parameters:
+        - upserts (list[tuple[Optional[int], Rate]]): Rates to store, with the id of the rate
+          they replace, or None to insert them.
+        - deletes (Iterable[int]): Ids of the rates to remove.
+        - check (Callable[[RateSnapshot], None]): Called with the patched rates before they are
+          stored, raising to reject them.
+
+        Returns:
+        - list[int]: Ids of the upserted rates, in order.
+
+        Raises:
+        - KeyError: If an id does not match any rate. Nothing is changed then.
+        """
+        with self._host_lock():
+            snapshot = self.snapshot
+            patched, ids = snapshot.patched(snapshot.version + 1, upserts, deletes)
+            if check is not None:
+                check(patched)
+            self._publish(patched.table, patched.version)
+        return ids
+
+    def load_snapshot_file(self, path: str) -> None:
+        """
+        Replace the rates of every process with the ones of a snapshot file.
+
+        Parameters:
+        - path (str): Path of the snapshot file, as written by libs.rates.snapshot_file.
+        """
+        # Imported here so the converter can run as a module of the package
+        from libs.rates.snapshot_file import map_snapshot
+
+        self.update_table(map_snapshot(path))
+
+    def get_rates(self):
+        return self.snapshot.table.to_rates()
+
+    def find_rate(self, day_of_week: int, interval: Interval, timezone: str, at: Optional[datetime] = None):
+        """
+        Find rates based on the specified criteria.
+
+        Parameters:
+        - day_of_week (int): Day of the week (0 for Monday, 1 for Tuesday, ..., 6 for Sunday).
+        - interval (Interval): Time interval to search for rates.
+        - timezone (str): Timezone offset (e.g., '-0500').
+        - at (datetime): Instant the rate timezones are resolved for. Defaults to now.
+
+        Returns:
+        - List[Rate]: List of rates that match the criteria.
+        """
+        return self.snapshot.index.find(day_of_week, interval, timezone, at)
+
+    def unlink(self) -> None:
+        """
+        Remove the shared rates from the host, once no process uses them anymore.
+
+        Processes having mapped them keep their current version until they exit.
+        """
+        with self._host_lock():
+            version = self.version
+            if version:
+                _unlink(self._segment_name(version))
+            _unlink(self.name)
+            try:
+                os.remove(self._lock_path)
+            except FileNotFoundError:
+                pass
+
+    def _segment_name(self, version: int) -> str:
+        return f"{self.name}_{version}"
+
+    def _host_lock(self):
+        return _HostLock(self._write_lock, self._lock_path)
+
+    def _publish(self, table: RateTable, version: int) -> None:
+        """
+        Write a table to a new segment and make it the current version. Runs under the host lock.
+        """
+        from libs.rates.snapshot_file import encode_snapshot
+
+        header, parts = encode_snapshot(table, version)
+        segment = _attach(self._segment_name(version), create=True,
+                          size=len(header) + sum(len(part) for part in parts))
+        try:
+            offset = 0
+            for part in [header] + parts:
+                segment.buf[offset:offset + len(part)] = part
+                offset += len(part)
+        finally:
+            segment.close()
+
+        previous = self.version
+        _VERSION.pack_into(self._control.buf, 0, version)
+        # Processes having mapped the previous version keep it until they move to this one
+        if previous:
+            _unlink(self._segment_name(previous))
+
+    def _load(self) -> RateSnapshot:
+        from libs.rates.snapshot_file import BufferRateTable
+
+        while True:
+            version = self.version
+            if not version:
+                table = RateTable()
+                break
+            try:
+                segment = _attach(self._segment_name(version))
+            except FileNotFoundError:
+                # Replaced by a newer version between reading the version and attaching
+                continue
+            table = BufferRateTable(segment.buf, segment.name)
+            self._retain(segment)
+            break
+        return RateSnapshot(version, table, RateIndex(table, self.offset_years))
+
+    def _retain(self, segment: shared_memory.SharedMemory) -> None:
+        """
+        Keep a newly mapped segment open, as the current one.
+        """
+        with self._segments_lock:
+            self._segments.append(segment)
+
+    def _close_retired(self) -> None:
+        """
+        Close the segments replaced by the current one that no table views anymore.
+
+        Segments still used by snapshots held elsewhere, e.g. by requests in flight, are
+        retried once the next version is mapped.
+        """
+        with self._segments_lock:
+            retired, self._segments = self._segments[:-1], self._segments[-1:]
+            for segment in retired:
+                try:
+                    segment.close()
+                except BufferError:
+                    self._segments.insert(-1, segment)
+
+
+class _HostLock:
+    """
+    Lock serializing writers across the threads of a process and the processes of a host.
+    """
+
+    def __init__(self, thread_lock: threading.Lock, path: str):
+        self.thread_lock = thread_lock
+        self.path = path
+        self._file = None
+
+    def __enter__(self) -> None:
+        self.thread_lock.acquire()
+        try:
+            self._file = open(self.path, 'a')
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        except BaseException:
+            self.__exit__()
+            raise
+
+    def __exit__(self, *exc_info) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.thread_lock.release()
+
+
+class _Segment(shared_memory.SharedMemory):
+    """
+    Shared memory segment that may be dropped while tables still view it, e.g. along with its
+    repository, the mapping then being released with the last view.
+    """
+
+    def __del__(self):
+        try:
+            self.close()
+        except BufferError:
+            pass
+
+
+def _attach(name: str, create: bool = False, size: int = 0) -> shared_memory.SharedMemory:
+    # Segments outlive the processes using them, so they must not be removed when one exits
+    if sys.version_info >= (3, 13):
+        return _Segment(name, create=create, size=size, track=False)
+    segment = _Segment(name, create=create, size=size)
+    resource_tracker.unregister(segment._name, 'shared_memory')
+    return segment
+
+
+def _unlink(name: str) -> None:
+    try:
+        # Attached with the default tracking, which unlink() undoes, so the resource tracker stays balanced
+        segment = shared_memory.SharedMemory(name)
+    except FileNotFoundError:
+        return
+    try:
+        segment.unlink()
+    finally:
+        segment.close()
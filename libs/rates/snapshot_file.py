@@ -0,0 +1,219 @@
+"""
+Binary rate snapshot files.
+
+A snapshot file holds the columns of a RateTable so it can be memory-mapped and queried
+in place: workers mapping the same file share its pages through the page cache instead
+of each parsing and validating the JSON rates.
+
+Layout, little-endian:
+    header      magic, format version, rate count, size of the timezone names, rates version
+    prices      int64 per rate
+    starts      uint16 per rate (HHMM)
+    ends        uint16 per rate (HHMM)
+    timezones   uint16 per rate, index in the timezone names
+    days        uint8 per rate, weekday mask
+    names       timezone names, UTF-8, separated by newlines
+
+Usage:
+    python -m libs.rates.snapshot_file rates.json rates.snapshot
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Optional
+
+from libs.rates.dto import Rate
+from libs.rates.rate_table import RateTable
+from libs.rates.rate_validator import validate_rates
+
+MAGIC = b'RATESNAP'
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<8sHxxIIQ4x')
+
+
+class BufferRateTable(RateTable):
+    """
+    Read-only rate table whose columns are views over a buffer in the snapshot format.
+    """
+
+    def __init__(self, buffer, source: str = 'buffer', exact: bool = False):
+        """
+        Read the columns of a snapshot held in a buffer, without copying them.
+
+        Parameters:
+        - buffer: Object supporting the buffer protocol, holding a snapshot.
+        - source (str): Name of the buffer, used in error messages.
+        - exact (bool): Whether the buffer must end with the snapshot, rather than possibly be padded.
+
+        Raises:
+        - ValueError: If the buffer is not a snapshot of a supported format version.
+        """
+        _check_byteorder()
+        view = memoryview(buffer)
+
+        if len(view) < _HEADER.size:
+            raise ValueError(f"Not a rate snapshot: {source}")
+        magic, format_version, count, names_size, version = _HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f"Not a rate snapshot: {source}")
+        if format_version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported rate snapshot format version: {format_version}")
+        size = snapshot_size(count, names_size)
+        if len(view) < size or (exact and len(view) != size):
+            raise ValueError(f"Truncated rate snapshot: {source}")
+
+        self.version = version
+        offset = _HEADER.size
+
+        def column(typecode: str, itemsize: int):
+            nonlocal offset
+            start, offset = offset, offset + itemsize * count
+            return view[start:offset].cast(typecode)
+
+        self.prices = column('q', 8)
+        self.starts = column('H', 2)
+        self.ends = column('H', 2)
+        self.timezone_ids = column('H', 2)
+        self.day_masks = column('B', 1)
+
+        names = bytes(view[offset:offset + names_size]).decode()
+        self.timezones = names.split('\n') if names else []
+        self._timezone_ids = {name: timezone_id for timezone_id, name in enumerate(self.timezones)}
+
+    def append(self, rate: Rate) -> None:
+        raise TypeError("Snapshot rate tables are read-only")
+
+
+class MappedRateTable(BufferRateTable):
+    """
+    Read-only rate table whose columns are views over a memory-mapped snapshot file.
+    """
+
+    def __init__(self, path: str):
+        """
+        Map a snapshot file.
+
+        Parameters:
+        - path (str): Path of the snapshot file.
+
+        Raises:
+        - ValueError: If the file is not a snapshot of a supported format version.
+        """
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        super().__init__(self._map, path, exact=True)
+
+
+def snapshot_size(count: int, names_size: int) -> int:
+    """
+    Get the size of a snapshot.
+
+    Parameters:
+    - count (int): Number of rates.
+    - names_size (int): Size of the timezone names, in bytes.
+
+    Returns:
+    - int: Size of the snapshot, in bytes.
+    """
+    return _HEADER.size + 15 * count + names_size
+
+
+def encode_snapshot(table: RateTable, version: int = 0) -> tuple[bytes, list[bytes]]:
+    """
+    Encode a rate table in the snapshot format.
+
+    Parameters:
+    - table (RateTable): Rates to encode.
+    - version (int): Version of the rate set.
+
+    Returns:
+    - tuple[bytes, list[bytes]]: The header, and the columns and names following it.
+    """
+    _check_byteorder()
+    names = '\n'.join(table.timezones).encode()
+    columns = (table.prices, table.starts, table.ends, table.timezone_ids, table.day_masks)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(table), len(names), version)
+    return header, [column.tobytes() for column in columns] + [names]
+
+
+def write_snapshot(path: str, table: RateTable, version: int = 0) -> None:
+    """
+    Write a rate table to a snapshot file.
+
+    The file is written next to its destination and renamed over it, so workers mapping
+    the previous snapshot keep a consistent view.
+
+    Parameters:
+    - path (str): Path of the snapshot file.
+    - table (RateTable): Rates to write.
+    - version (int): Version of the rate set.
+    """
+    header, parts = encode_snapshot(table, version)
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'wb') as file:
+        file.write(header)
+        for part in parts:
+            file.write(part)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+
+def map_snapshot(path: str) -> MappedRateTable:
+    """
+    Map a snapshot file as a rate table.
+
+    Parameters:
+    - path (str): Path of the snapshot file.
+
+    Returns:
+    - MappedRateTable: Read-only table backed by the file.
+    """
+    return MappedRateTable(path)
+
+
+def convert(json_path: str, snapshot_path: str) -> int:
+    """
+    Convert a JSON rates file to a snapshot file, validating every rate.
+
+    Parameters:
+    - json_path (str): Path of the JSON rates file.
+    - snapshot_path (str): Path of the snapshot file to write.
+
+    Returns:
+    - int: Number of rates written.
+
+    Raises:
+    - RatesValidationError: If any rate is invalid, with the index and error of each invalid rate.
+    """
+    with open(json_path, 'r') as file:
+        rates_json = json.load(file)
+
+    table = RateTable(validate_rates(rates_json.get('rates', [])))
+    write_snapshot(snapshot_path, table)
+    return len(table)
+
+
+def _check_byteorder() -> None:
+    # Columns are written and mapped in native order, which the format fixes to little-endian
+    if sys.byteorder != 'little':
+        raise ValueError("Rate snapshot files are only supported on little-endian hosts")
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Convert a JSON rates file to a binary rate snapshot.")
+    parser.add_argument('source', help="JSON rates file")
+    parser.add_argument('destination', help="snapshot file to write")
+    args = parser.parse_args(argv)
+
+    count = convert(args.source, args.destination)
+    print(f"Wrote {count} rates to {args.destination}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+
+from libs.rates.dto import Interval, Rate
+from libs.rates.rate_index import RateIndex
+from libs.rates.rate_snapshot import RateSnapshot
+from libs.rates.rate_table import RateTable, mask_to_days
+from libs.utils.timezone_offsets import DEFAULT_OFFSET_YEARS, TimezoneOffsetTable
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rates_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rates (
+    position INTEGER PRIMARY KEY,
+    day_mask INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    timezone TEXT NOT NULL,
+    price INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rate_days (
+    day INTEGER NOT NULL,
+    timezone TEXT NOT NULL,
+    regular INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    position INTEGER NOT NULL REFERENCES rates (position)
+);
+CREATE INDEX IF NOT EXISTS rate_days_lookup ON rate_days (day, timezone, regular, start);
+INSERT OR IGNORE INTO rates_meta (key, value) VALUES ('version', 0);
+"""
+
+# Same overlap rule as RatesRepository.find_rate
+_OVERLAPS = "((start <= :start AND :start < end) OR (start <= :end AND :end < end) " \
+            "OR (:start < start AND :end > end))"
+
+_FIND_RATES = f"""
+SELECT rates.position, rates.day_mask, rates.start, rates.end, rates.timezone, rates.price
+FROM rates
+WHERE rates.position IN (
+    SELECT position FROM rate_days
+    WHERE day = :day AND timezone IN ({{timezones}}) AND regular = 1
+      AND start <= :high AND end > :low AND {_OVERLAPS}
+    UNION ALL
+    SELECT position FROM rate_days
+    WHERE day = :day AND timezone IN ({{timezones}}) AND regular = 0 AND {_OVERLAPS}
+)
+ORDER BY rates.position
+"""
+
+
+class SqliteRatesRepository:
+    """
+    Rate store persisted in a SQLite database, with the interface of RatesRepository.
+
+    Every weekday of a rate is stored as an indexed row, so find_rate is a single range
+    query. Each thread keeps its own connection. Updates replace the whole rate set in
+    one transaction and increase the version stored in the database, which is also used
+    to refresh the in-memory snapshot served to PriceService. Each connection only reads
+    the version again once the database changed.
+    """
+
+    def __init__(self, path: str, offset_years: tuple[int, int] = DEFAULT_OFFSET_YEARS):
+        """
+        Initialize a SqliteRatesRepository object, creating the schema if needed.
+
+        Parameters:
+        - path (str): Path of the SQLite database file.
+        - offset_years (tuple[int, int]): First and last year covered by the timezone offset table.
+        """
+        self.path = path
+        self.offset_years = offset_years
+        self._local = threading.local()
+        self._snapshot: Optional[RateSnapshot] = None
+        self._offsets: tuple[int, list[str], Optional[TimezoneOffsetTable]] = (-1, [], None)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def close(self) -> None:
+        """
+        Close the connection of the current thread.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+            self._local.version = None
+
+    @property
+    def version(self) -> int:
+        connection = self._connection()
+        # Changes whenever another connection commits, so the version is only read again after an update
+        data_version = connection.execute("PRAGMA data_version").fetchone()[0]
+        cached = getattr(self._local, 'version', None)
+        if cached is None or cached[0] != data_version:
+            version = connection.execute("SELECT value FROM rates_meta WHERE key = 'version'").fetchone()[0]
+            cached = self._local.version = (data_version, version)
+        return cached[1]
+
+    @property
+    def snapshot(self) -> RateSnapshot:
+        version = self.version
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != version:
+            table = RateTable(self._load_rates(removed=True))
+            snapshot = RateSnapshot(version, table, RateIndex(table, self.offset_years))
+            self._snapshot = snapshot
+        return snapshot
+
+    @property
+    def table(self) -> RateTable:
+        return self.snapshot.table
+
+    @property
+    def index(self) -> RateIndex:
+        return self.snapshot.index
+
+    @property
+    def database(self):
+        return self.get_rates()
+
+    def update_rates(self, rates):
+        self.update_table(RateTable(rates))
+        return self.get_rates()
+
+    def update_table(self, table: RateTable) -> RateTable:
+        """
+        Replace the rates with the ones of a table, in one transaction.
+
+        Parameters:
+        - table (RateTable): The new rates.
+
+        Returns:
+        - RateTable: The stored rates.
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM rate_days")
+            connection.execute("DELETE FROM rates")
+            self._insert(connection, table, range(len(table)))
+            connection.execute("UPDATE rates_meta SET value = value + 1 WHERE key = 'version'")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        finally:
+            # The data version of a connection does not change with its own commits
+            self._local.version = None
+        return table
+
+    def patch_rates(self, upserts: list[tuple[Optional[int], Rate]], deletes: Iterable[int] = (),
+                    check: Optional[Callable[[RateSnapshot], None]] = None) -> list[int]:
+        """
+        Insert, replace and remove rates by id in one transaction.
+
+        Removed rates keep their row without any weekday, so ids match the positions of
+        the in-memory snapshot. The snapshot is patched first, and only the rows of the
+        changed rates are written from it.
+
+        Parameters:
+        - upserts (list[tuple[Optional[int], Rate]]): Rates to store, with the id of the rate
+          they replace, or None to insert them.
+        - deletes (Iterable[int]): Ids of the rates to remove.
+        - check (Callable[[RateSnapshot], None]): Called with the patched rates before they are
+          stored, raising to reject them.
+
+        Returns:
+        - list[int]: Ids of the upserted rates, in order.
+
+        Raises:
+        - KeyError: If an id does not match any rate. Nothing is changed then.
+        """
+        deletes = list(deletes)
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # No other process can update the rates until the transaction ends
+            snapshot = self.snapshot
+            patched, ids = snapshot.patched(snapshot.version + 1, upserts, deletes)
+            if check is not None:
+                check(patched)
+
+            changed = sorted({*deletes, *(rate_id for rate_id, _ in upserts if rate_id is not None), *ids})
+            for rate_id in changed:
+                connection.execute("DELETE FROM rate_days WHERE position = ?", (rate_id,))
+                connection.execute("DELETE FROM rates WHERE position = ?", (rate_id,))
+            self._insert(connection, patched.table, changed)
+
+            connection.execute("UPDATE rates_meta SET value = value + 1 WHERE key = 'version'")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        finally:
+            # The data version of a connection does not change with its own commits
+            self._local.version = None
+
+        self._snapshot = patched
+        return ids
+
+    @staticmethod
+    def _insert(connection: sqlite3.Connection, table: RateTable, positions: Iterable[int]) -> None:
+        positions = list(positions)
+        connection.executemany(
+            "INSERT INTO rates (position, day_mask, start, end, timezone, price) VALUES (?, ?, ?, ?, ?, ?)",
+            ((position, table.day_masks[position], table.starts[position], table.ends[position],
+              table.timezone(position), table.prices[position]) for position in positions)
+        )
+        connection.executemany(
+            "INSERT INTO rate_days (day, timezone, regular, start, end, position) VALUES (?, ?, ?, ?, ?, ?)",
+            ((day, table.timezone(position), int(table.starts[position] < table.ends[position]),
+              table.starts[position], table.ends[position], position)
+             for position in positions for day in mask_to_days(table.day_masks[position]))
+        )
+
+    def load_snapshot_file(self, path: str) -> None:
+        """
+        Replace the rates with the ones of a snapshot file.
+
+        Parameters:
+        - path (str): Path of the snapshot file, as written by libs.rates.snapshot_file.
+        """
+        # Imported here so the converter can run as a module of the package
+        from libs.rates.snapshot_file import map_snapshot
+
+        self.update_table(map_snapshot(path))
+
+    def get_rates(self):
+        return self._load_rates()
+
+    def find_rate(self, day_of_week: int, interval: Interval, timezone: str, at: Optional[datetime] = None):
+        """
+        Find rates based on the specified criteria.
+
+        Parameters:
+        - day_of_week (int): Day of the week (0 for Monday, 1 for Tuesday, ..., 6 for Sunday).
+        - interval (Interval): Time interval to search for rates.
+        - timezone (str): Timezone offset (e.g., '-0500').
+        - at (datetime): Instant the rate timezones are resolved for. Defaults to now.
+
+        Returns:
+        - List[Rate]: List of rates that match the criteria.
+        """
+        names, offsets = self._timezone_offsets()
+        timestamp = at.timestamp() if at is not None else time.time()
+        timezones = [name for name in names if offsets.offset_at_timestamp(name, timestamp) == timezone]
+        if not timezones:
+            return []
+
+        parameters = {
+            "day": day_of_week,
+            "start": interval.start,
+            "end": interval.end,
+            "low": min(interval.start, interval.end),
+            "high": max(interval.start, interval.end),
+        }
+        parameters.update((f"tz{number}", name) for number, name in enumerate(timezones))
+        placeholders = ", ".join(f":tz{number}" for number in range(len(timezones)))
+
+        rows = self._connection().execute(_FIND_RATES.format(timezones=placeholders), parameters)
+        return [self._to_rate(row[1:]) for row in rows]
+
+    def _timezone_offsets(self) -> tuple[list[str], TimezoneOffsetTable]:
+        version = self.version
+        cached_version, names, offsets = self._offsets
+        if offsets is None or cached_version != version:
+            names = [row[0] for row in self._connection().execute("SELECT DISTINCT timezone FROM rates")]
+            offsets = TimezoneOffsetTable(names, self.offset_years)
+            self._offsets = (version, names, offsets)
+        return names, offsets
+
+    def _load_rates(self, removed: bool = False) -> list[Rate]:
+        # Removed rates are kept as rates without any weekday, to keep the positions of the others
+        rows = self._connection().execute(
+            "SELECT day_mask, start, end, timezone, price FROM rates "
+            f"{'' if removed else 'WHERE day_mask != 0 '}ORDER BY position"
+        )
+        return [self._to_rate(row) for row in rows]
+
+    @staticmethod
+    def _to_rate(row) -> Rate:
+        day_mask, start, end, timezone, price = row
+        return Rate(mask_to_days(day_mask), Interval(start, end), timezone, price)
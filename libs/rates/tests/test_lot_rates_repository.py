@@ -0,0 +1,136 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from libs.rates import LotRatesRepository, RatesService
+from libs.rates.dto.interval import Interval
+from libs.rates.tests.rate_factory import RateFactory
+from libs.utils.datetime_helper import get_timezone_offset_from_name
+
+rate_factory = RateFactory()
+
+
+@pytest.fixture
+def lot_rates_repository():
+    return LotRatesRepository(idle_seconds=60)
+
+
+def test_update_and_get_lot_rates(lot_rates_repository):
+    # Prepare
+    rates_a = rate_factory.create_list(2)
+    rates_b = rate_factory.create_list(3)
+
+    # Run
+    lot_rates_repository.update_rates('a', rates_a)
+    lot_rates_repository.update_rates('b', rates_b)
+
+    # Expect
+    assert 'a' in lot_rates_repository
+    assert 'c' not in lot_rates_repository
+    assert lot_rates_repository.lot('a').get_rates() == rates_a
+    assert lot_rates_repository.lot('b').get_rates() == rates_b
+    assert lot_rates_repository.lot('b').version > lot_rates_repository.lot('a').version
+
+
+def test_identical_lots_share_rate_table(lot_rates_repository):
+    # Prepare
+    rates = rate_factory.create_list(3)
+
+    # Run
+    for lot_id in range(100):
+        lot_rates_repository.update_rates(str(lot_id), list(rates))
+
+    # Expect
+    assert len(lot_rates_repository) == 100
+    assert lot_rates_repository.shared_tables() == 1
+    assert lot_rates_repository.snapshot('1').table is lot_rates_repository.snapshot('2').table
+    assert lot_rates_repository.snapshot('1').index is lot_rates_repository.snapshot('2').index
+
+    lot_rates_repository.update_rates('1', rate_factory.create_list(1))
+    assert lot_rates_repository.shared_tables() == 2
+
+    for lot_id in range(100):
+        lot_rates_repository.delete_lot(str(lot_id))
+    assert lot_rates_repository.shared_tables() == 0
+
+
+def test_find_rate_in_lot(lot_rates_repository):
+    # Prepare
+    timezone = "America/New_York"
+    rate_1 = rate_factory.create(days_of_week=[1], period=Interval(900, 1600), timezone=timezone)
+    rate_2 = rate_factory.create(days_of_week=[1], period=Interval(900, 1600), timezone=timezone)
+    RatesService(lot_rates_repository.lot('a')).update_rates([rate_1])
+    RatesService(lot_rates_repository.lot('b')).update_rates([rate_2])
+
+    # Run
+    found_rates = lot_rates_repository.lot('b').find_rate(1, Interval(1000, 1100),
+                                                          get_timezone_offset_from_name(timezone))
+
+    # Expect
+    assert found_rates == [rate_2]
+
+
+def test_idle_indexes_are_evicted(lot_rates_repository):
+    # Prepare
+    lot_rates_repository.update_rates('a', rate_factory.create_list(2))
+    index = lot_rates_repository.snapshot('a').index
+
+    # Run
+    evicted = lot_rates_repository.evict_idle(now=time.monotonic() + 61)
+
+    # Expect
+    assert evicted == 1
+    assert lot_rates_repository.snapshot('a').index is not index
+
+
+def test_lot_snapshot_and_price_service_are_kept(lot_rates_repository):
+    # Prepare
+    lot_rates_repository.update_rates('a', [
+        rate_factory.create(days_of_week=[0], period=Interval(900, 1200), timezone="UTC", price=1500),
+    ])
+    snapshot = lot_rates_repository.snapshot('a')
+    service = lot_rates_repository.price_service('a')
+    start = datetime(2024, 1, 1, 10, tzinfo=timezone.utc)
+
+    # Run / Expect
+    assert lot_rates_repository.snapshot('a') is snapshot
+    assert lot_rates_repository.price_service('a') is service
+    assert service.get_price(start, start + timedelta(hours=1), snapshot) == 1500
+
+    lot_rates_repository.update_rates('a', [
+        rate_factory.create(days_of_week=[0], period=Interval(900, 1200), timezone="UTC", price=1750),
+    ])
+    assert lot_rates_repository.snapshot('a') is not snapshot
+    updated_service = lot_rates_repository.price_service('a')
+    assert updated_service is not service
+    assert updated_service.get_price(start, start + timedelta(hours=1), lot_rates_repository.snapshot('a')) == 1750
+
+    lot_rates_repository.evict_idle(now=time.monotonic() + 61)
+    assert lot_rates_repository.price_service('a') is not updated_service
+
+
+def test_identical_lots_share_price_service(lot_rates_repository):
+    # Prepare
+    rates = [rate_factory.create(days_of_week=[0], period=Interval(900, 1200), timezone="UTC", price=1500)]
+    for lot_id in range(100):
+        lot_rates_repository.update_rates(str(lot_id), list(rates))
+    lot_rates_repository.update_rates('other', rate_factory.create_list(2))
+
+    # Run
+    services = {id(lot_rates_repository.price_service(str(lot_id))) for lot_id in range(100)}
+    other = lot_rates_repository.price_service('other')
+
+    # Expect
+    assert len(services) == 1
+    assert id(other) not in services
+    assert len(lot_rates_repository._services) == 2
+
+    for lot_id in range(100):
+        lot_rates_repository.delete_lot(str(lot_id))
+    assert len(lot_rates_repository._services) == 1
+
+
+def test_unknown_lot(lot_rates_repository):
+    with pytest.raises(KeyError):
+        lot_rates_repository.snapshot('missing')
@@ -0,0 +1,181 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+from libs.rates import RatesRepository, PriceService
+from libs.rates.dto.interval import Interval
+from libs.rates.occupancy_table import OccupancyTable, OccupancyTables, hhmm_to_minute
+from libs.rates.rate_conflicts import find_conflicts
+from libs.rates.rate_table import RateTable
+from libs.rates.tests.rate_factory import RateFactory
+from libs.utils.errors import MultipleRatesError
+
+rate_factory = RateFactory()
+
+
+def create_rates(generator, timezones, count, overlapping):
+    rates = []
+    for _ in range(count):
+        start = generator.randint(0, 23) * 100 + generator.choice([0, 15, 30, 45])
+        end = min(start + generator.randint(1, 6) * 100, 2400)
+        rates.append(rate_factory.create(
+            days_of_week=generator.sample(range(7), generator.randint(1, 3)),
+            period=Interval(start, end),
+            timezone=generator.choice(timezones),
+            price=generator.randint(100, 10000)
+        ))
+    if overlapping:
+        return rates
+
+    # Drop the rates overlapping an earlier one
+    table = []
+    for rate in rates:
+        try:
+            OccupancyTable(RateTable(table + [rate]))
+            table.append(rate)
+        except ValueError:
+            pass
+    return table
+
+
+def test_hhmm_to_minute():
+    assert hhmm_to_minute(0) == 0
+    assert hhmm_to_minute(930) == 570
+    assert hhmm_to_minute(2400) == 1440
+    assert hhmm_to_minute(960) is None
+    assert hhmm_to_minute(2500) is None
+
+
+def test_find_single_rate():
+    rate = rate_factory.create(days_of_week=[0], period=Interval(900, 1600))
+    table = OccupancyTable(RateTable([rate]))
+
+    assert table.find(0, 360, 420) is None
+    assert table.find(0, 360, 540) == 0
+    assert table.find(0, 600, 660) == 0
+    assert table.find(0, 360, 600) == 0
+    assert table.find(0, 600, 960) == 0
+    assert table.find(0, 960, 1020) is None
+    assert table.find(1, 600, 660) is None
+
+
+def test_find_multiple_rates_raises():
+    rate_1 = rate_factory.create(days_of_week=[0], period=Interval(900, 1200))
+    rate_2 = rate_factory.create(days_of_week=[0], period=Interval(1200, 1500))
+    table = OccupancyTable(RateTable([rate_1, rate_2]))
+
+    with pytest.raises(MultipleRatesError):
+        table.find(0, 600, 780)
+    with pytest.raises(MultipleRatesError):
+        table.find(0, 600, 720)
+    # A rate ending exactly at the end of the interval is only matched if it covers the start
+    assert table.find(0, 480, 720) == 1
+
+
+def test_overlapping_rates_cannot_be_compiled():
+    rate_1 = rate_factory.create(days_of_week=[0, 1], period=Interval(900, 1200))
+    rate_2 = rate_factory.create(days_of_week=[1], period=Interval(1100, 1500))
+
+    with pytest.raises(ValueError):
+        OccupancyTable(RateTable([rate_1, rate_2]))
+
+
+def test_conflicting_timezones_are_not_compiled():
+    # Prepare
+    table = RateTable([
+        rate_factory.create(days_of_week=[0, 1], period=Interval(900, 1200), timezone="UTC"),
+        rate_factory.create(days_of_week=[1], period=Interval(1100, 1500), timezone="UTC"),
+        rate_factory.create(days_of_week=[1], period=Interval(1100, 1500), timezone="America/Chicago"),
+    ])
+    repository = RatesRepository()
+    repository.update_table(table)
+
+    # Run
+    tables = OccupancyTables(table, repository.index.offsets, find_conflicts(table))
+
+    # Expect
+    assert tables.table_for("+0000", datetime(2024, 1, 1, tzinfo=pytz.UTC)) is None
+    assert tables.table_for("-0600", datetime(2024, 1, 1, tzinfo=pytz.UTC)) is not None
+
+
+def test_timezone_groups_follow_offset_transitions():
+    # Prepare
+    table = RateTable([
+        rate_factory.create(days_of_week=[0], period=Interval(900, 1200), timezone="UTC"),
+        rate_factory.create(days_of_week=[0], period=Interval(1300, 1500), timezone="Europe/London"),
+    ])
+    repository = RatesRepository()
+    repository.update_table(table)
+    tables = OccupancyTables(table, repository.index.offsets)
+
+    # Run
+    winter = tables.table_for("+0000", datetime(2024, 1, 1, tzinfo=pytz.UTC))
+    later_winter = tables.table_for("+0000", datetime(2024, 2, 1, tzinfo=pytz.UTC))
+    summer = tables.table_for("+0000", datetime(2024, 7, 1, tzinfo=pytz.UTC))
+    summer_london = tables.table_for("+0100", datetime(2024, 7, 1, tzinfo=pytz.UTC))
+
+    # Expect
+    assert list(winter.positions) == [0, 1]
+    assert later_winter is winter
+    assert list(summer.positions) == [0]
+    assert list(summer_london.positions) == [1]
+
+
+@pytest.mark.parametrize("overlapping", [False, True])
+def test_compiled_prices_match_repository_search(overlapping):
+    # Prepare
+    generator = random.Random(11)
+    timezones = ["America/New_York", "America/Toronto", "America/Chicago", "Europe/London"]
+    rates = create_rates(generator, timezones, 60, overlapping)
+
+    repository = RatesRepository()
+    repository.update_rates(rates)
+    searching = PriceService(repository)
+    compiled = PriceService(repository)
+    compiled.compile_rates()
+
+    for _ in range(500):
+        tz = pytz.timezone(generator.choice(timezones))
+        day = datetime(2024, 1, 1) + timedelta(days=generator.randint(0, 365))
+        start_minute = generator.randint(0, 1438)
+        end_minute = generator.randint(start_minute + 1, 1439)
+        start = tz.localize(day + timedelta(minutes=start_minute))
+        end = tz.localize(day + timedelta(minutes=end_minute))
+
+        # Run / Expect
+        assert compiled.get_price(start, end) == searching.get_price(start, end)
+
+
+def test_patched_tables_match_compiled_ones():
+    # Prepare
+    generator = random.Random(17)
+    timezones = ["America/New_York", "America/Chicago", "Europe/London"]
+    repository = RatesRepository()
+    repository.update_rates(create_rates(generator, timezones, 60, False))
+    patched = PriceService(repository)
+    patched.compile_rates()
+    london = patched._occupancy.table_for("+0000", datetime(2024, 1, 1, tzinfo=pytz.UTC))
+
+    # Run
+    for _ in range(10):
+        replaced, deleted = generator.sample(repository.snapshot.table.ids(), 2)
+        if repository.snapshot.table.timezone(replaced) == "Europe/London" or \
+                repository.snapshot.table.timezone(deleted) == "Europe/London":
+            continue
+        repository.patch_rates([(replaced, create_rates(generator, timezones[:2], 1, True)[0])], [deleted])
+        patched.compile_rates()
+    compiled = PriceService(repository)
+    compiled.compile_rates()
+
+    # Expect
+    assert patched._occupancy.table is repository.snapshot.table
+    assert patched._occupancy.table_for("+0000", datetime(2024, 1, 1, tzinfo=pytz.UTC)).cells is london.cells
+    for _ in range(500):
+        tz = pytz.timezone(generator.choice(timezones))
+        day = datetime(2024, 1, 1) + timedelta(days=generator.randint(0, 365))
+        start_minute = generator.randint(0, 1438)
+        start = tz.localize(day + timedelta(minutes=start_minute))
+        end = tz.localize(day + timedelta(minutes=generator.randint(start_minute + 1, 1439)))
+        assert patched.get_price(start, end) == compiled.get_price(start, end)
@@ -0,0 +1,46 @@
+from libs.rates.price_cache import MISSING, PriceCache
+
+
+def test_get_and_put():
+    cache = PriceCache(2)
+
+    assert cache.get(1, 'a') is MISSING
+    cache.put(1, 'a', 1500)
+
+    assert cache.get(1, 'a') == 1500
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_cached_none_and_unavailable_results():
+    cache = PriceCache(2)
+    cache.put(1, 'a', None)
+    cache.put(1, 'b', 'unavailable')
+
+    assert cache.get(1, 'a') is None
+    assert cache.get(1, 'b') == 'unavailable'
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PriceCache(2)
+    cache.put(1, 'a', 1)
+    cache.put(1, 'b', 2)
+    cache.get(1, 'a')
+    cache.put(1, 'c', 3)
+
+    assert cache.get(1, 'b') is MISSING
+    assert cache.get(1, 'a') == 1
+    assert cache.get(1, 'c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_newer_version_invalidates_entries():
+    cache = PriceCache(2)
+    cache.put(1, 'a', 1)
+
+    assert cache.get(2, 'a') is MISSING
+    assert cache.stats()['size'] == 0
+
+    # Results computed from an older version are not stored
+    cache.put(1, 'a', 1)
+    assert cache.get(2, 'a') is MISSING
@@ -1,10 +1,12 @@
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import pytest
 from unittest.mock import MagicMock
 from libs.rates import RatesRepository, PriceService
 from libs.rates.dto.interval import Interval
+from libs.rates.price_metrics import PriceMetrics
 from libs.rates.tests.rate_factory import RateFactory
 from libs.utils.errors import MultipleDaysInputError, MultipleRatesError
+from libs.utils.metrics import Registry
 
 # Mock RatesRepository
 rates_repository = MagicMock(spec=RatesRepository)
@@ -113,3 +115,74 @@ def test_get_price_multiple_days_input_error(price_service):
     # Expect
     assert price == 'unavailable'
 
+
+
+def test_get_price_batch():
+    # Prepare
+    repository = RatesRepository()
+    rate = rate_factory.create(days_of_week=[0], period=Interval(900, 1600), timezone='UTC')
+    repository.update_rates([rate])
+    price_service = PriceService(repository)
+    utc = timezone.utc
+
+    # Run
+    prices = price_service.get_price_batch([
+        (datetime(2024, 2, 12, 10, 0, tzinfo=utc), datetime(2024, 2, 12, 12, 0, tzinfo=utc)),
+        (datetime(2024, 2, 12, 12, 0, tzinfo=utc), datetime(2024, 2, 12, 10, 0, tzinfo=utc)),
+        (datetime(2024, 2, 12, 10, 0, tzinfo=utc), datetime(2024, 2, 13, 12, 0, tzinfo=utc)),
+        (datetime(2024, 2, 13, 10, 0, tzinfo=utc), datetime(2024, 2, 13, 12, 0, tzinfo=utc)),
+    ])
+
+    # Expect
+    assert prices[0] == rate.get_price()
+    assert isinstance(prices[1], ValueError)
+    assert prices[2] == 'unavailable'
+    assert prices[3] is None
+
+
+def test_get_price_is_memoized_per_rates_version():
+    # Prepare
+    repository = RatesRepository()
+    repository.update_rates([rate_factory.create(days_of_week=[0], period=Interval(900, 1600), timezone='UTC')])
+    price_service = PriceService(repository, cache_size=16)
+    start = datetime(2024, 2, 12, 10, 0, tzinfo=timezone.utc)
+    end = datetime(2024, 2, 12, 12, 0, tzinfo=timezone.utc)
+
+    # Run
+    first_price = price_service.get_price(start, end)
+    second_price = price_service.get_price(start + timedelta(weeks=1), end + timedelta(weeks=1))
+    repository.update_rates([rate_factory.create(days_of_week=[0], period=Interval(900, 1600), timezone='UTC',
+                                                 price=first_price + 1)])
+    third_price = price_service.get_price(start, end)
+
+    # Expect
+    assert second_price == first_price
+    assert third_price == first_price + 1
+    assert price_service.cache.stats()['hits'] == 1
+    assert price_service.cache.stats()['misses'] == 2
+
+
+def test_get_price_records_metrics():
+    # Prepare
+    repository = RatesRepository()
+    repository.update_rates([
+        rate_factory.create(days_of_week=[0], period=Interval(900, 1600), timezone='UTC'),
+        rate_factory.create(days_of_week=[0], period=Interval(1500, 1800), timezone='UTC'),
+    ])
+    registry = Registry()
+    price_service = PriceService(repository, cache_size=16, metrics=PriceMetrics(registry))
+    utc = timezone.utc
+
+    # Run
+    price = price_service.get_price(datetime(2024, 2, 12, 10, 0, tzinfo=utc), datetime(2024, 2, 12, 12, 0, tzinfo=utc))
+    unavailable = price_service.get_price(datetime(2024, 2, 12, 15, 0, tzinfo=utc),
+                                          datetime(2024, 2, 12, 15, 30, tzinfo=utc))
+    metrics = registry.render()
+
+    # Expect
+    assert price is not None and unavailable == 'unavailable'
+    assert 'rates_price_stage_seconds_count{stage="cache"} 2' in metrics
+    assert 'rates_price_stage_seconds_count{stage="validate"} 2' in metrics
+    assert 'rates_price_stage_seconds_count{stage="lookup"} 2' in metrics
+    assert 'rates_price_candidate_rates_bucket{le="1"} 1' in metrics
+    assert 'rates_price_candidate_rates_count 2' in metrics
@@ -0,0 +1,52 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from libs.rates import RatesRepository, PriceService
+from libs.rates.price_vectors import PRICE_NOT_FOUND, PRICE_UNAVAILABLE
+from libs.rates.tests.test_occupancy_table import create_rates
+
+
+def expected_price(price):
+    if price is None:
+        return PRICE_NOT_FOUND
+    if price == "unavailable":
+        return PRICE_UNAVAILABLE
+    return price
+
+
+@pytest.mark.parametrize("overlapping", [False, True])
+def test_get_prices_matches_get_price(overlapping):
+    # Prepare
+    generator = random.Random(5)
+    timezones = ["America/New_York", "America/Toronto", "America/Chicago", "Asia/Kolkata"]
+    repository = RatesRepository()
+    repository.update_rates(create_rates(generator, timezones, 40, overlapping))
+    price_service = PriceService(repository)
+
+    offsets = [-300, -240, -360, -300, 330, 60]
+    first_day = int(datetime(2023, 1, 1, tzinfo=timezone.utc).timestamp())
+    starts, ends, utc_offsets = [], [], []
+    for _ in range(2000):
+        start = first_day + generator.randint(0, 2 * 365 * 86400) // 60 * 60
+        starts.append(start)
+        ends.append(start + generator.randint(1, 600) * 60)
+        utc_offsets.append(generator.choice(offsets))
+
+    # Run
+    prices = price_service.get_prices(starts, ends, utc_offsets)
+
+    # Expect
+    for start, end, offset, price in zip(starts, ends, utc_offsets, prices):
+        tz = timezone(timedelta(minutes=offset))
+        start_date = datetime.fromtimestamp(start, tz)
+        end_date = datetime.fromtimestamp(end, tz)
+        assert price == expected_price(price_service.get_price(start_date, end_date))
+
+
+def test_get_prices_with_end_before_start():
+    price_service = PriceService(RatesRepository())
+
+    with pytest.raises(ValueError):
+        price_service.get_prices([100, 200], [150, 150], [0, 0])
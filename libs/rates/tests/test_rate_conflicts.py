@@ -0,0 +1,121 @@
+import random
+
+from libs.rates.dto.interval import Interval
+from libs.rates.rate_conflicts import MAX_REPORTED_PAIRS, find_conflicts, normalize_rates
+from libs.rates.rate_table import RateTable
+from libs.rates.tests.rate_factory import RateFactory
+
+rate_factory = RateFactory()
+
+
+def test_find_conflicts():
+    # Prepare
+    table = RateTable([
+        rate_factory.create(days_of_week=[0, 1], period=Interval(900, 1200), timezone="UTC"),
+        rate_factory.create(days_of_week=[1], period=Interval(1100, 1300), timezone="UTC"),
+        rate_factory.create(days_of_week=[0], period=Interval(1200, 1400), timezone="UTC"),
+        rate_factory.create(days_of_week=[1], period=Interval(1100, 1300), timezone="America/Chicago"),
+        rate_factory.create(days_of_week=[1], period=Interval(2200, 200), timezone="UTC"),
+    ])
+
+    # Run
+    conflicts = find_conflicts(table)
+
+    # Expect
+    assert conflicts.pairs == [(0, 1)]
+    assert conflicts.positions == {0, 1}
+    assert 1 in conflicts and 2 not in conflicts
+
+
+def test_find_conflicts_matches_pairwise_comparison():
+    # Prepare
+    random.seed(18)
+    rates = [
+        rate_factory.create(period=Interval(start, start + random.choice([30, 100, 400])),
+                            timezone=random.choice(["UTC", "America/Chicago"]))
+        for start in (random.randrange(0, 1900, 10) for _ in range(200))
+    ]
+    expected = [
+        (first, second)
+        for first in range(len(rates)) for second in range(first + 1, len(rates))
+        if rates[first].timezone == rates[second].timezone
+        and set(rates[first].days_of_week) & set(rates[second].days_of_week)
+        and rates[first].period.start < rates[second].period.end
+        and rates[second].period.start < rates[first].period.end
+    ]
+
+    # Run
+    conflicts = find_conflicts(RateTable(rates))
+
+    # Expect
+    assert conflicts.pairs and set(conflicts.pairs) <= set(expected)
+    assert conflicts.positions == {position for pair in expected for position in pair}
+
+
+def test_find_conflicts_reports_few_pairs_of_dense_rates():
+    # Prepare
+    rates = [rate_factory.create(days_of_week=[0], period=Interval(900, 1200 + minute), timezone="UTC", price=100)
+             for minute in range(50)]
+    rates += [rate_factory.create(days_of_week=[0], period=Interval(900 + minute, 1300), timezone="UTC", price=200)
+              for minute in range(50)]
+
+    # Run
+    conflicts = find_conflicts(RateTable(rates))
+
+    # Expect
+    assert len(conflicts) == 100
+    assert 0 < len(conflicts.pairs) <= MAX_REPORTED_PAIRS
+
+
+def test_patched_conflicts():
+    # Prepare
+    table = RateTable([
+        rate_factory.create(days_of_week=[0], period=Interval(900, 1200), timezone="UTC"),
+        rate_factory.create(days_of_week=[1], period=Interval(900, 1200), timezone="UTC"),
+        rate_factory.create(days_of_week=[1], period=Interval(1000, 1100), timezone="UTC"),
+    ])
+    conflicts = find_conflicts(table)
+    patched = table.copy()
+    patched.remove(2)
+    patched.append(rate_factory.create(days_of_week=[0], period=Interval(1100, 1300), timezone="UTC"))
+
+    # Run
+    result = conflicts.patched(patched, {(0, 0): [0, 3], (1, 0): [1]})
+
+    # Expect
+    assert conflicts.positions == {1, 2}
+    assert result.positions == {0, 3}
+    assert result.pairs == [(0, 3)]
+
+
+def test_find_conflicts_ignores_removed_rates():
+    # Prepare
+    table = RateTable([
+        rate_factory.create(days_of_week=[0], period=Interval(900, 1200), timezone="UTC"),
+        rate_factory.create(days_of_week=[0], period=Interval(1000, 1100), timezone="UTC"),
+    ])
+    table.remove(1)
+
+    # Run
+    conflicts = find_conflicts(table)
+
+    # Expect
+    assert not conflicts
+
+
+def test_normalize_rates():
+    # Prepare
+    rates = [
+        rate_factory.create(days_of_week=[0, 1], period=Interval(900, 1200), timezone="UTC", price=1000),
+        rate_factory.create(days_of_week=[2], period=Interval(900, 1200), timezone="UTC", price=1000),
+        rate_factory.create(days_of_week=[1, 0], period=Interval(900, 1200), timezone="UTC", price=1000),
+    ]
+    periods = [rate.period for rate in rates]
+
+    # Run
+    normalized, indexes = normalize_rates(rates)
+
+    # Expect
+    assert normalized == rates[:2]
+    assert indexes == [0, 1]
+    assert all(rate.period is period for rate, period in zip(rates, periods))
@@ -0,0 +1,63 @@
+from libs.rates.dto.interval import Interval
+from libs.rates.rate_table import RateTable, days_to_mask, mask_to_days
+from libs.rates.tests.rate_factory import RateFactory
+
+rate_factory = RateFactory()
+
+
+def test_days_mask_round_trip():
+    assert days_to_mask([0, 2, 6]) == 0b1000101
+    assert mask_to_days(0b1000101) == [0, 2, 6]
+    assert mask_to_days(days_to_mask([3, 1, 1])) == [1, 3]
+
+
+def test_rates_round_trip():
+    # Prepare
+    rates = rate_factory.create_list(5)
+
+    # Run
+    table = RateTable(rates)
+
+    # Expect
+    assert len(table) == 5
+    assert table.to_rates() == rates
+    assert table.rate(2) == rates[2]
+
+
+def test_timezones_are_interned():
+    # Prepare
+    rates = [
+        rate_factory.create(period=Interval(900, 1000), timezone="America/Chicago"),
+        rate_factory.create(period=Interval(900, 1000), timezone="America/Toronto"),
+        rate_factory.create(period=Interval(900, 1000), timezone="America/Chicago"),
+    ]
+
+    # Run
+    table = RateTable(rates)
+
+    # Expect
+    assert table.timezones == ["America/Chicago", "America/Toronto"]
+    assert list(table.timezone_ids) == [0, 1, 0]
+    assert table.timezone_id("America/Toronto") == 1
+    assert table.timezone_id("Europe/London") is None
+
+
+def test_patch_copy():
+    # Prepare
+    rates = rate_factory.create_list(3)
+    table = RateTable(rates)
+    replacement = rate_factory.create(timezone="Europe/Paris")
+
+    # Run
+    patched = table.copy()
+    patched.replace(0, replacement)
+    patched.remove(1)
+
+    # Expect
+    assert table.to_rates() == rates
+    assert patched.to_rates() == [replacement, rates[2]]
+    assert patched.ids() == [0, 2]
+    assert len(patched) == 3
+    assert not patched.contains(1)
+    assert not patched.contains(3)
+    assert patched.contains(2)
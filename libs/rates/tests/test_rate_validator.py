@@ -0,0 +1,81 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+
+import pytest
+
+from libs.rates.dto import Rate
+from libs.rates.rate_validator import parse_rates, validate_rates
+from libs.utils.errors import RatesValidationError
+
+VALID_RATE = {'days': 'mon,tues', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': 1500}
+
+
+@pytest.mark.parametrize("rate, expected_error", [
+    ({'times': '0900-2100', 'tz': 'America/Chicago', 'price': 1500}, "Days is required"),
+    ({**VALID_RATE, 'extra': 1, 'other': 2}, "Unknown properties: extra, other"),
+    ({**VALID_RATE, 'days': ''}, "Days of week are required"),
+    ({**VALID_RATE, 'days': 'mon,funday'}, "Invalid value for 'days'. Please use the short name of the day. E.g. 'mon,tues'"),
+    ({**VALID_RATE, 'price': '1500'}, "Invalid value for 'price'. Must be an integer"),
+    ({**VALID_RATE, 'price': -1}, "Invalid value for 'price'. Must be a positive integer"),
+    ({**VALID_RATE, 'times': '0900-21000'}, "Invalid value for 'times'. Must be in format 'HHMM-HHMM'"),
+    ({**VALID_RATE, 'times': '0900-2100\n'}, "Invalid value for 'times'. Must be in format 'HHMM-HHMM'"),
+    ({**VALID_RATE, 'tz': 'Nowhere/Town'}, "Invalid value for 'tz'. Must be a string and a valid timezone"),
+    ('rate', "Rate must be an object"),
+    (VALID_RATE, None),
+])
+def test_validation_error(rate, expected_error):
+    assert Rate.validation_error(rate) == expected_error
+
+
+def test_parse_rates_reports_every_error():
+    # Prepare
+    rates_json = [VALID_RATE, {**VALID_RATE, 'price': -1}, VALID_RATE, {**VALID_RATE, 'tz': 'Nowhere/Town'}]
+
+    # Run
+    rates, errors = parse_rates(rates_json, first_index=10)
+
+    # Expect
+    assert rates == [Rate.to_model(VALID_RATE)] * 2
+    assert [index for index, _ in errors] == [11, 13]
+
+
+@pytest.mark.parametrize("executor", [None, ThreadPoolExecutor(2)])
+def test_validate_rates_in_chunks(executor, monkeypatch):
+    # Prepare
+    monkeypatch.setattr('libs.rates.rate_validator.CHUNK_SIZE', 3)
+    rates_json = [{**VALID_RATE, 'price': price} for price in range(20)]
+
+    # Run
+    rates = list(validate_rates(iter(rates_json), executor))
+
+    # Expect
+    assert [rate.price for rate in rates] == list(range(20))
+
+
+@pytest.mark.parametrize("executor", [None, ThreadPoolExecutor(2)])
+def test_validate_rates_reports_errors_with_indexes(executor, monkeypatch):
+    # Prepare
+    monkeypatch.setattr('libs.rates.rate_validator.CHUNK_SIZE', 3)
+    rates_json = [{**VALID_RATE, 'price': -price} for price in range(20)]
+
+    # Run
+    with pytest.raises(RatesValidationError) as error:
+        list(validate_rates(iter(rates_json), executor))
+
+    # Expect
+    assert str(error.value) == "19 rates are invalid"
+    assert [index for index, _ in error.value.errors] == list(range(1, 20))
+
+
+def test_validate_rates_in_process_pool():
+    # Prepare
+    executor = ProcessPoolExecutor(1, mp_context=get_context('spawn'))
+    rates_json = [{**VALID_RATE, 'price': price} for price in range(100)] + [{**VALID_RATE, 'days': 'x'}]
+
+    # Run
+    with pytest.raises(RatesValidationError) as error:
+        list(validate_rates(rates_json, executor))
+    executor.shutdown()
+
+    # Expect
+    assert error.value.errors == [(100, "Invalid value for 'days'. Please use the short name of the day. E.g. 'mon,tues'")]
@@ -1,4 +1,8 @@
+import random
+from datetime import datetime
+
 import pytest
+import pytz
 from unittest.mock import MagicMock
 from libs.rates import RatesRepository, Rate
 from libs.rates.dto.interval import Interval
@@ -145,3 +149,187 @@ def test_find_rates_when_interval_spans_multiple_rates_with_end_beyond_rates(rat
 
     # Expect
     assert found_rates == [rate_1, rate_2, rate_3, rate_4]
+
+
+def test_find_rate_matches_linear_scan(rates_repository):
+    # Prepare
+    generator = random.Random(7)
+    timezones = ["America/New_York", "America/Chicago", "Europe/London"]
+    rates = []
+    for _ in range(300):
+        start = generator.randint(0, 2359)
+        end = generator.randint(0, 2400)
+        rates.append(rate_factory.create(
+            days_of_week=generator.sample(range(7), generator.randint(1, 3)),
+            period=Interval(start, end),
+            timezone=generator.choice(timezones)
+        ))
+    rates_repository.update_rates(rates)
+
+    for _ in range(300):
+        day_of_week = generator.randint(0, 6)
+        start = generator.randint(0, 2359)
+        interval = Interval(start, generator.randint(start, 2359))
+        timezone = get_timezone_offset_from_name(generator.choice(timezones))
+
+        # Run
+        found_rates = rates_repository.find_rate(day_of_week, interval, timezone)
+
+        # Expect
+        expected_rates = [
+            rate for rate in rates
+            if day_of_week in rate.days_of_week
+            and get_timezone_offset_from_name(rate.timezone) == timezone
+            and ((rate.period.start <= interval.start < rate.period.end)
+                 or (rate.period.start <= interval.end < rate.period.end)
+                 or (interval.start < rate.period.start and interval.end > rate.period.end))
+        ]
+        assert found_rates == expected_rates
+
+
+def test_find_rate_resolves_timezone_offset_for_queried_date(rates_repository):
+    # Prepare
+    day_of_week = 1
+    interval = Interval(900, 1600)
+    timezone = "America/New_York"
+
+    rate = rate_factory.create(days_of_week=[1], period=Interval(900, 1600), timezone=timezone)
+    rates_repository.update_rates([rate])
+
+    winter = pytz.timezone(timezone).localize(datetime(2024, 1, 9, 9, 0))
+    summer = pytz.timezone(timezone).localize(datetime(2024, 7, 9, 9, 0))
+
+    # Run / Expect
+    assert rates_repository.find_rate(day_of_week, interval, '-0500', winter) == [rate]
+    assert rates_repository.find_rate(day_of_week, interval, '-0400', winter) == []
+    assert rates_repository.find_rate(day_of_week, interval, '-0400', summer) == [rate]
+    assert rates_repository.find_rate(day_of_week, interval, '-0500', summer) == []
+
+
+def test_update_rates_publishes_new_snapshot(rates_repository):
+    # Prepare
+    previous = rates_repository.snapshot
+    rates = rate_factory.create_list(3)
+
+    # Run
+    rates_repository.update_rates(rates)
+
+    # Expect
+    assert rates_repository.version == previous.version + 1
+    assert rates_repository.snapshot is not previous
+    assert previous.table.to_rates() == []
+    assert rates_repository.snapshot.table.to_rates() == rates
+
+
+def test_patch_rates_matches_rebuilt_index(rates_repository):
+    # Prepare
+    generator = random.Random(17)
+    timezones = ["America/Chicago", "America/New_York", "Europe/Paris"]
+
+    def random_rate(timezone=None):
+        return rate_factory.create(days_of_week=generator.sample(range(7), generator.randint(1, 3)),
+                                   period=Interval(generator.choice(range(0, 2400, 100)),
+                                                   generator.choice(range(0, 2400, 100))),
+                                   timezone=timezone or generator.choice(timezones))
+
+    rates_repository.update_rates([random_rate() for _ in range(100)])
+    rates = dict(enumerate(rates_repository.get_rates()))
+    assert rates_repository.snapshot.conflicts
+
+    # Run
+    for _ in range(20):
+        deletes = generator.sample(sorted(rates), 3)
+        upserts = [(rate_id, random_rate()) for rate_id in generator.sample(sorted(set(rates) - set(deletes)), 3)]
+        upserts += [(None, random_rate("UTC" if generator.random() < 0.2 else None)) for _ in range(2)]
+        ids = rates_repository.patch_rates(upserts, deletes)
+        for rate_id in deletes:
+            del rates[rate_id]
+        for rate_id, (_, rate) in zip(ids, upserts):
+            rates[rate_id] = rate
+
+    # Expect
+    rebuilt = RatesRepository()
+    rebuilt.update_rates([rates[rate_id] for rate_id in sorted(rates)])
+    assert rates_repository.snapshot.table.ids() == sorted(rates)
+    assert rates_repository.get_rates() == rebuilt.get_rates()
+    ids = sorted(rates)
+    assert rates_repository.snapshot.conflicts.positions == \
+        {ids[position] for position in rebuilt.snapshot.conflicts.positions}
+    for _ in range(300):
+        at = pytz.timezone(generator.choice(timezones)).localize(datetime(2024, generator.randint(1, 12), 15))
+        day = generator.randint(0, 6)
+        interval = Interval(generator.choice(range(0, 2400, 50)), generator.choice(range(0, 2400, 50)))
+        offset = at.strftime('%z')
+        assert rates_repository.find_rate(day, interval, offset, at) == rebuilt.find_rate(day, interval, offset, at)
+
+
+def test_patch_rates_publishes_new_snapshot(rates_repository):
+    # Prepare
+    rates = [
+        rate_factory.create(days_of_week=[0], period=Interval(900, 1000), timezone="America/Chicago"),
+        rate_factory.create(days_of_week=[1], period=Interval(900, 1000), timezone="America/Chicago"),
+    ]
+    rates_repository.update_rates(rates)
+    previous = rates_repository.snapshot
+    replacement = rate_factory.create(days_of_week=[0], period=Interval(1000, 1100), timezone="America/Chicago")
+
+    # Run
+    ids = rates_repository.patch_rates([(0, replacement)])
+
+    # Expect
+    assert ids == [0]
+    assert rates_repository.version == previous.version + 1
+    assert previous.table.to_rates() == rates
+    assert rates_repository.get_rates() == [replacement, rates[1]]
+    timezone_id = previous.table.timezone_id("America/Chicago")
+    assert rates_repository.index._buckets[(1, timezone_id)] is previous.index._buckets[(1, timezone_id)]
+
+
+def test_patch_rates_with_unknown_id(rates_repository):
+    # Prepare
+    rates = rate_factory.create_list(2)
+    rates_repository.update_rates(rates)
+    rates_repository.patch_rates([], [1])
+
+    # Run / Expect
+    with pytest.raises(KeyError):
+        rates_repository.patch_rates([(None, rate_factory.create())], [1])
+    with pytest.raises(KeyError):
+        rates_repository.patch_rates([(2, rate_factory.create())])
+    assert rates_repository.version == 2
+    assert rates_repository.get_rates() == rates[:1]
+
+
+def test_patch_rates_merges_duplicates(rates_repository):
+    # Prepare
+    rates = [
+        rate_factory.create(days_of_week=[0, 2], period=Interval(900, 1000), timezone="UTC", price=1000),
+        rate_factory.create(days_of_week=[1], period=Interval(900, 1000), timezone="UTC", price=1000),
+    ]
+    rates_repository.update_rates(rates)
+    duplicate = rate_factory.create(days_of_week=[2, 0], period=Interval(900, 1000), timezone="UTC", price=1000)
+    inserted = rate_factory.create(days_of_week=[3], period=Interval(900, 1000), timezone="UTC", price=1000)
+
+    # Run
+    ids = rates_repository.patch_rates([(None, duplicate), (1, duplicate), (None, inserted), (None, inserted)])
+
+    # Expect
+    assert ids == [0, 0, 2, 2]
+    assert rates_repository.snapshot.table.ids() == [0, 2]
+    assert rates_repository.get_rates() == [rates[0], inserted]
+
+
+def test_patch_rates_check_rejects_patch(rates_repository):
+    # Prepare
+    rates = rate_factory.create_list(2)
+    rates_repository.update_rates(rates)
+
+    def check(snapshot):
+        assert snapshot.table.ids() == [1]
+        raise ValueError("Rejected")
+
+    # Run / Expect
+    with pytest.raises(ValueError):
+        rates_repository.patch_rates([], [0], check=check)
+    assert rates_repository.version == 1
+    assert rates_repository.get_rates() == rates
@@ -1,7 +1,11 @@
 import pytest
 from unittest.mock import MagicMock
 from libs.rates import RatesRepository, RatesService
+from libs.rates.dto.interval import Interval
+from libs.rates.rate_conflicts import find_conflicts
+from libs.rates.rate_table import RateTable
 from libs.rates.tests.rate_factory import RateFactory
+from libs.utils.errors import RateConflictError, RatesValidationError
 
 # Mock RatesRepository
 rates_repository = MagicMock(spec=RatesRepository)
@@ -39,6 +43,44 @@ def test_update_rates_with_invalid_list(rates_service):
         rates_service.update_rates([rate, 'a', 1, None, {}])
 
 
+def test_ingest_rates():
+    # Prepare
+    repository = RatesRepository()
+    rates_json = [
+        {'days': 'mon,tues', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': 1500},
+        {'days': 'sun', 'times': '0100-0700', 'tz': 'UTC', 'price': 925},
+    ]
+
+    # Run
+    table = RatesService(repository).ingest_rates(iter(rates_json))
+
+    # Expect
+    assert len(table) == 2
+    assert repository.table is table
+    assert repository.get_rates()[1].price == 925
+
+
+def test_ingest_rates_is_all_or_nothing():
+    # Prepare
+    repository = RatesRepository()
+    repository.update_rates(rate_factory.create_list(2))
+    rates = repository.get_rates()
+    rates_json = [
+        {'days': 'mon,tues', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': 1500},
+        {'days': 'sun', 'times': '0100-0700', 'tz': 'Nowhere/Town', 'price': 925},
+    ]
+
+    # Run
+    with pytest.raises(ValueError):
+        RatesService(repository).ingest_rates(iter(rates_json))
+    with pytest.raises(Exception):
+        RatesService(repository).ingest_rates(iter([]))
+
+    # Expect
+    assert repository.version == 1
+    assert repository.get_rates() == rates
+
+
 def test_get_rates(rates_service):
     # Prepare
     rates_from_repository = rate_factory.create_list(2)
@@ -60,4 +102,116 @@ def test_get_none_if_rates_doesnt_exist(rates_service):
     rates = rates_service.get_rates()
 
     # Expect
-    assert rates == []
\ No newline at end of file
+    assert rates == []
+
+def test_get_rates_from_snapshot(rates_service):
+    # Prepare
+    repository = RatesRepository()
+    rates = rate_factory.create_list(2)
+    repository.update_rates(rates)
+
+    # Run
+    snapshot_rates = rates_service.get_rates(repository.snapshot)
+
+    # Expect
+    assert snapshot_rates == rates
+
+
+def test_update_rates_merges_duplicates():
+    # Prepare
+    repository = RatesRepository()
+    rate = rate_factory.create(days_of_week=[0], period=Interval(900, 1000), timezone="UTC")
+    duplicate = rate_factory.create(days_of_week=[0], period=Interval(900, 1000), timezone="UTC", price=rate.price)
+
+    # Run
+    rates = RatesService(repository).update_rates([rate, duplicate])
+
+    # Expect
+    assert rates == [rate]
+
+
+def test_update_rates_strict():
+    # Prepare
+    repository = RatesRepository()
+    rates = [
+        rate_factory.create(days_of_week=[0], period=Interval(900, 1000), timezone="UTC", price=1000),
+        rate_factory.create(days_of_week=[0], period=Interval(900, 1000), timezone="UTC", price=1000),
+        rate_factory.create(days_of_week=[0], period=Interval(930, 1100), timezone="UTC", price=1200),
+    ]
+
+    # Run
+    with pytest.raises(RateConflictError) as error:
+        RatesService(repository, strict=True).update_rates(rates)
+    RatesService(repository).update_rates(rates)
+
+    # Expect
+    assert error.value.conflicts == [(0, 2)]
+    assert RatesService(repository).get_conflicts().pairs == [(0, 1)]
+
+
+def test_ingest_rates_strict():
+    # Prepare
+    repository = RatesRepository()
+    rates_json = [
+        {'days': 'mon,tues', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': 1500},
+        {'days': 'mon,tues', 'times': '0900-2100', 'tz': 'America/Chicago', 'price': 1500},
+        {'days': 'tues', 'times': '2000-2200', 'tz': 'America/Chicago', 'price': 925},
+    ]
+
+    # Run
+    with pytest.raises(RateConflictError) as error:
+        RatesService(repository, strict=True).ingest_rates(iter(rates_json))
+    table = RatesService(repository).ingest_rates(iter(rates_json))
+
+    # Expect
+    assert error.value.conflicts == [(0, 2)]
+    assert len(table) == 2
+
+
+def test_patch_rates_strict():
+    # Prepare
+    repository = RatesRepository()
+    RatesService(repository).update_rates([
+        rate_factory.create(days_of_week=[0], period=Interval(900, 1000), timezone="UTC", price=1000),
+    ])
+    overlapping = rate_factory.create(days_of_week=[0], period=Interval(930, 1100), timezone="UTC", price=1200)
+
+    # Run
+    with pytest.raises(RateConflictError) as error:
+        RatesService(repository, strict=True).patch_rates([(None, overlapping)], [])
+    ids = RatesService(repository).patch_rates([(None, overlapping)], [])
+
+    # Expect
+    assert error.value.conflicts == [(0, 1)]
+    assert ids == [1]
+    assert repository.version == 2
+def test_strict_rejects_periods_ending_before_they_start():
+    # Prepare
+    repository = RatesRepository()
+    rates = [
+        rate_factory.create(days_of_week=[0], period=Interval(900, 1000), timezone="UTC", price=1000),
+        rate_factory.create(days_of_week=[0], period=Interval(2200, 930), timezone="UTC", price=1200),
+    ]
+    rates_json = [
+        {'days': 'mon', 'times': '0900-1000', 'tz': 'UTC', 'price': 1000},
+        {'days': 'mon', 'times': '2200-0930', 'tz': 'UTC', 'price': 1200},
+    ]
+    service = RatesService(repository, strict=True)
+
+    # Run
+    errors = []
+    for update in (lambda: service.update_rates(rates), lambda: service.ingest_rates(iter(rates_json)),
+                   lambda: service.patch_rates([(None, rates[0]), (None, rates[1])], [])):
+        with pytest.raises(RatesValidationError) as error:
+            update()
+        errors.append(error.value.errors)
+
+    # Expect
+    assert errors == [[(1, "Rate period must end after it starts")]] * 3
+    assert repository.version == 0
+    # Left out of the conflict checks, though the index matches it along with the other rate
+    assert not find_conflicts(RateTable(rates))
+    RatesService(repository).update_rates(rates)
+    assert len(repository.find_rate(0, Interval(800, 2300), '+0000')) == 2
+
+
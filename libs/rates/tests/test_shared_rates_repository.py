@@ -0,0 +1,139 @@
+import gc
+import os
+import subprocess
+import sys
+import uuid
+from datetime import datetime
+
+import pytest
+import pytz
+
+from libs.rates import PriceService, RatesRepository, SharedRatesRepository
+from libs.rates.dto.interval import Interval
+from libs.rates.tests.rate_factory import RateFactory
+
+rate_factory = RateFactory()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+@pytest.fixture
+def shared_name():
+    name = f"rates_test_{uuid.uuid4().hex[:12]}"
+    yield name
+    SharedRatesRepository(name).unlink()
+
+
+def test_updates_are_visible_to_every_instance(shared_name):
+    # Prepare
+    rates = rate_factory.create_list(5)
+    writer = SharedRatesRepository(shared_name)
+    reader = SharedRatesRepository(shared_name)
+    assert reader.get_rates() == []
+
+    # Run
+    writer.update_rates(rates)
+
+    # Expect
+    assert reader.version == 1
+    assert reader.get_rates() == rates
+
+
+def test_snapshots_outlive_newer_versions(shared_name):
+    # Prepare
+    rates = rate_factory.create_list(3)
+    repository = SharedRatesRepository(shared_name)
+    repository.update_rates(rates)
+    snapshot = repository.snapshot
+
+    # Run
+    SharedRatesRepository(shared_name).update_rates(rates[:1])
+
+    # Expect
+    assert snapshot.table.to_rates() == rates
+    assert repository.get_rates() == rates[:1]
+    assert repository.version == 2
+
+
+def test_replaced_segments_are_closed_once_unused(shared_name):
+    # Prepare
+    rates = rate_factory.create_list(3)
+    repository = SharedRatesRepository(shared_name)
+    writer = SharedRatesRepository(shared_name)
+    writer.update_rates(rates)
+    snapshot = repository.snapshot
+
+    # Run
+    writer.update_rates(rates[:2])
+    repository.get_rates()
+    in_use = len(repository._segments)
+    del snapshot
+    gc.collect()
+    writer.update_rates(rates[:1])
+
+    # Expect
+    assert repository.get_rates() == rates[:1]
+    assert in_use == 2
+    assert len(repository._segments) == 1
+
+
+def test_price_service_compiles_rates_published_by_another_instance(shared_name):
+    # Prepare
+    writer = SharedRatesRepository(shared_name)
+    writer.update_rates([rate_factory.create(days_of_week=[0], period=Interval(900, 1600), timezone='UTC', price=10)])
+    price_service = PriceService(SharedRatesRepository(shared_name))
+    price_service.compile_rates()
+    start = datetime(2024, 2, 12, 10, 0, tzinfo=pytz.UTC)
+    end = datetime(2024, 2, 12, 12, 0, tzinfo=pytz.UTC)
+
+    # Run
+    writer.update_rates([rate_factory.create(days_of_week=[0], period=Interval(900, 1600), timezone='UTC', price=20)])
+    price = price_service.get_price(start, end)
+
+    # Expect
+    assert price == 20
+    assert price_service._compiled_for(price_service.rate_repository) is not None
+
+
+def test_updates_from_another_process(shared_name):
+    # Prepare
+    repository = SharedRatesRepository(shared_name)
+    repository.update_rates(rate_factory.create_list(2))
+    script = (
+        "from libs.rates import SharedRatesRepository\n"
+        "from libs.rates.tests.rate_factory import RateFactory\n"
+        f"SharedRatesRepository({shared_name!r}).update_rates(RateFactory().create_list(4))\n"
+    )
+
+    # Run
+    subprocess.run([sys.executable, '-c', script], check=True, cwd=ROOT, env={**os.environ, 'PYTHONPATH': ROOT})
+
+    # Expect
+    assert repository.version == 2
+    assert len(repository.table) == 4
+
+
+def test_find_rate_and_patch_match_in_memory_repository(shared_name):
+    # Prepare
+    rates = [
+        rate_factory.create(days_of_week=[0, 1], period=Interval(900, 1200), timezone="America/Chicago"),
+        rate_factory.create(days_of_week=[1], period=Interval(1300, 1500), timezone="UTC"),
+    ]
+    shared = SharedRatesRepository(shared_name)
+    memory = RatesRepository()
+    shared.update_rates(rates)
+    memory.update_rates(rates)
+    replacement = rate_factory.create(days_of_week=[1], period=Interval(1000, 1100), timezone="America/Chicago")
+    at = datetime(2024, 2, 13, tzinfo=pytz.UTC)
+
+    # Run
+    ids = shared.patch_rates([(0, replacement)], [1])
+    memory.patch_rates([(0, replacement)], [1])
+
+    # Expect
+    assert ids == [0]
+    assert shared.get_rates() == memory.get_rates()
+    for interval, timezone in [(Interval(1000, 1030), '-0600'), (Interval(1300, 1400), '+0000')]:
+        assert shared.find_rate(1, interval, timezone, at) == memory.find_rate(1, interval, timezone, at)
+    with pytest.raises(KeyError):
+        shared.patch_rates([], [1])
@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from libs.rates import RatesRepository
+from libs.rates.dto.interval import Interval
+from libs.rates.rate_table import RateTable
+from libs.rates.snapshot_file import MappedRateTable, convert, map_snapshot, write_snapshot
+from libs.rates.tests.rate_factory import RateFactory
+from libs.utils.datetime_helper import get_timezone_offset_from_name
+
+rate_factory = RateFactory()
+
+
+def test_write_and_map_snapshot(tmp_path):
+    # Prepare
+    rates = rate_factory.create_list(20)
+    path = str(tmp_path / 'rates.snapshot')
+
+    # Run
+    write_snapshot(path, RateTable(rates), version=7)
+    table = map_snapshot(path)
+
+    # Expect
+    assert isinstance(table, MappedRateTable)
+    assert table.version == 7
+    assert len(table) == 20
+    assert table.to_rates() == rates
+    with pytest.raises(TypeError):
+        table.append(rates[0])
+
+
+def test_map_empty_snapshot(tmp_path):
+    # Prepare
+    path = str(tmp_path / 'rates.snapshot')
+    write_snapshot(path, RateTable())
+
+    # Run
+    table = map_snapshot(path)
+
+    # Expect
+    assert len(table) == 0
+    assert table.timezones == []
+
+
+def test_map_invalid_snapshot(tmp_path):
+    # Prepare
+    path = tmp_path / 'rates.snapshot'
+    write_snapshot(str(path), RateTable(rate_factory.create_list(3)))
+    truncated = tmp_path / 'truncated.snapshot'
+    truncated.write_bytes(path.read_bytes()[:-1])
+    other = tmp_path / 'rates.json'
+    other.write_text('{"rates": []}' * 4)
+
+    # Run / Expect
+    with pytest.raises(ValueError):
+        map_snapshot(str(truncated))
+    with pytest.raises(ValueError):
+        map_snapshot(str(other))
+
+
+def test_repository_queries_mapped_snapshot(tmp_path):
+    # Prepare
+    timezone = "America/Chicago"
+    rate = rate_factory.create(days_of_week=[2], period=Interval(900, 1700), timezone=timezone, price=1500)
+    path = str(tmp_path / 'rates.snapshot')
+    write_snapshot(path, RateTable([rate_factory.create(days_of_week=[3]), rate]))
+    repository = RatesRepository()
+
+    # Run
+    repository.load_snapshot_file(path)
+    result = repository.find_rate(2, Interval(1000, 1200), get_timezone_offset_from_name(timezone))
+
+    # Expect
+    assert repository.version == 1
+    assert result == [rate]
+
+
+def test_convert_json(tmp_path):
+    # Prepare
+    source = tmp_path / 'rates.json'
+    source.write_text(json.dumps({"rates": [
+        {"days": "mon,tues", "times": "0900-2100", "tz": "America/Chicago", "price": 1500},
+        {"days": "sun", "times": "0100-0700", "tz": "UTC", "price": 925},
+    ]}))
+    destination = str(tmp_path / 'rates.snapshot')
+
+    # Run
+    count = convert(str(source), destination)
+
+    # Expect
+    assert count == 2
+    rates = map_snapshot(destination).to_rates()
+    assert rates[0].period == Interval(900, 2100)
+    assert set(rates[0].days_of_week) == {0, 1}
+    assert rates[1].timezone == "UTC"
+    assert rates[1].price == 925
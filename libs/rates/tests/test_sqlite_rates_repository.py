@@ -0,0 +1,168 @@
+import random
+import threading
+from datetime import datetime
+
+import pytest
+import pytz
+
+from libs.rates import RatesRepository, SqliteRatesRepository
+from libs.rates.dto.interval import Interval
+from libs.rates.dto.rate import Rate
+from libs.rates.tests.rate_factory import RateFactory
+
+rate_factory = RateFactory()
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    return str(tmp_path / 'rates.db')
+
+
+def test_rates_survive_restart(database_path):
+    # Prepare
+    rates = rate_factory.create_list(5)
+    repository = SqliteRatesRepository(database_path)
+
+    # Run
+    stored = repository.update_rates(rates)
+    repository.close()
+    reopened = SqliteRatesRepository(database_path)
+
+    # Expect
+    assert stored == rates
+    assert reopened.get_rates() == rates
+    assert reopened.version == 1
+
+
+def test_find_rate_matches_in_memory_repository(database_path):
+    # Prepare
+    timezones = ["America/Chicago", "America/New_York", "Europe/Paris", "UTC"]
+    rates = []
+    for _ in range(200):
+        start = random.choice(range(0, 2400, 100))
+        end = random.choice(range(0, 2400, 100))
+        days = random.sample(range(7), random.randint(1, 3))
+        rates.append(rate_factory.create(days_of_week=days, period=Interval(start, end),
+                                         timezone=random.choice(timezones)))
+    repository = SqliteRatesRepository(database_path)
+    repository.update_rates(rates)
+    in_memory = RatesRepository()
+    in_memory.update_rates(rates)
+
+    # Run / Expect
+    for _ in range(300):
+        at = pytz.timezone(random.choice(timezones)).localize(datetime(2024, random.randint(1, 12), 15))
+        offset = at.strftime('%z')
+        day = random.randint(0, 6)
+        interval = Interval(random.choice(range(0, 2400, 50)), random.choice(range(0, 2400, 50)))
+        assert repository.find_rate(day, interval, offset, at) == in_memory.find_rate(day, interval, offset, at)
+
+
+def test_update_rates_is_one_transaction(database_path):
+    # Prepare
+    rates = rate_factory.create_list(3)
+    repository = SqliteRatesRepository(database_path)
+    repository.update_rates(rates)
+
+    # Run
+    with pytest.raises(Exception):
+        repository.update_rates(rate_factory.create_list(2) + [Rate([1], Interval(900, 1000), None, 1500)])
+
+    # Expect
+    assert repository.get_rates() == rates
+    assert repository.version == 1
+
+
+def test_connections_are_per_thread(database_path):
+    # Prepare
+    repository = SqliteRatesRepository(database_path)
+    repository.update_rates(rate_factory.create_list(2))
+    seen = []
+
+    # Run
+    def read():
+        seen.append((repository._connection(), repository.get_rates()))
+
+    thread = threading.Thread(target=read)
+    thread.start()
+    thread.join()
+
+    # Expect
+    assert seen[0][0] is not repository._connection()
+    assert seen[0][1] == repository.get_rates()
+
+
+def test_snapshot_is_rebuilt_per_version(database_path):
+    # Prepare
+    repository = SqliteRatesRepository(database_path)
+    repository.update_rates(rate_factory.create_list(2))
+
+    # Run
+    first = repository.snapshot
+    same = repository.snapshot
+    rates = rate_factory.create_list(3)
+    repository.update_rates(rates)
+
+    # Expect
+    assert first is same
+    assert repository.snapshot.version == 2
+    assert repository.snapshot.table.to_rates() == rates
+
+
+def test_version_is_only_read_after_updates(database_path):
+    # Prepare
+    repository = SqliteRatesRepository(database_path)
+    other = SqliteRatesRepository(database_path)
+    repository.update_rates(rate_factory.create_list(2))
+    statements = []
+    repository._connection().set_trace_callback(statements.append)
+
+    # Run
+    versions = [repository.version for _ in range(3)]
+    other.update_rates(rate_factory.create_list(1))
+    versions += [repository.version for _ in range(3)]
+    repository.update_rates(rate_factory.create_list(3))
+    versions.append(repository.version)
+
+    # Expect
+    assert versions == [1, 1, 1, 2, 2, 2, 3]
+    assert sum('rates_meta' in statement and statement.startswith('SELECT') for statement in statements) == 3
+
+
+def test_patch_rates(database_path):
+    # Prepare
+    rates = rate_factory.create_list(3)
+    repository = SqliteRatesRepository(database_path)
+    repository.update_rates(rates)
+    snapshot = repository.snapshot
+    replacement = rate_factory.create()
+    inserted = rate_factory.create()
+
+    # Run
+    ids = repository.patch_rates([(2, replacement), (None, inserted)], [0])
+    with pytest.raises(KeyError):
+        repository.patch_rates([], [0])
+
+    # Expect
+    assert ids == [2, 3]
+    assert repository.version == 2
+    assert repository.get_rates() == [rates[1], replacement, inserted]
+    assert repository.snapshot.table.ids() == [1, 2, 3]
+    assert repository.snapshot.table.to_rates() == repository.get_rates()
+    assert SqliteRatesRepository(database_path).snapshot.table.ids() == [1, 2, 3]
+    assert snapshot.table.to_rates() == rates
+
+
+def test_patch_rates_merges_duplicates(database_path):
+    # Prepare
+    rates = rate_factory.create_list(2)
+    repository = SqliteRatesRepository(database_path)
+    repository.update_rates(rates)
+
+    # Run
+    ids = repository.patch_rates([(1, rates[0]), (None, rates[0])])
+
+    # Expect
+    assert ids == [0, 0]
+    assert repository.get_rates() == rates[:1]
+    assert SqliteRatesRepository(database_path).snapshot.table.ids() == [0]
@@ -1,9 +1,52 @@
-from datetime import datetime
-import pytz
+import re
+from datetime import datetime, timedelta, timezone
+
+_ISO_DATETIME = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2})(?::(\d{2})(?:[.,](\d{1,6})\d*)?)?'
+    r'(Z|[+-]\d{2}(?::?[0-5]\d)?)'
+)
+_MAX_CACHED_OFFSETS = 1024
+_offsets: dict[str, timezone] = {'Z': timezone.utc}
 
 
 def isodate_to_datetime(isodate) -> datetime:
-    return datetime.strptime(isodate, '%Y-%m-%dT%H:%M:%S%z')
+    """
+    Parse an ISO-8601 datetime with a timezone.
+
+    Accepts 'YYYY-MM-DDTHH:MM[:SS[.ffffff]]' followed by 'Z' or an offset as '±HH:MM',
+    '±HHMM' or '±HH'. Other inputs are parsed with the '%Y-%m-%dT%H:%M:%S%z' format.
+
+    Parameters:
+    - isodate (str): Datetime in ISO-8601 format.
+
+    Returns:
+    - datetime: Timezone-aware datetime.
+    """
+    match = _ISO_DATETIME.fullmatch(isodate) if isinstance(isodate, str) else None
+    if match is None:
+        return datetime.strptime(isodate, '%Y-%m-%dT%H:%M:%S%z')
+
+    year, month, day, hour, minute, second, fraction, offset = match.groups()
+    return datetime(
+        int(year), int(month), int(day), int(hour), int(minute),
+        int(second) if second else 0,
+        int(fraction.ljust(6, '0')) if fraction else 0,
+        tzinfo=_parse_offset(offset)
+    )
+
+
+def _parse_offset(offset: str) -> timezone:
+    """
+    Parse a UTC offset, reusing the timezone object of offsets already seen.
+    """
+    tz = _offsets.get(offset)
+    if tz is None:
+        digits = offset[1:].replace(':', '')
+        delta = timedelta(hours=int(digits[:2]), minutes=int(digits[2:] or 0))
+        tz = timezone(-delta if offset[0] == '-' else delta)
+        if len(_offsets) < _MAX_CACHED_OFFSETS:
+            _offsets[offset] = tz
+    return tz
 
 
 def get_timezone_offset_from_datetime(dt: datetime) -> str:
@@ -19,6 +62,24 @@ def get_timezone_offset_from_datetime(dt: datetime) -> str:
     return dt.strftime('%z')
 
 
+def format_utc_offset(offset: timedelta) -> str:
+    """
+    Format a UTC offset the same way as strftime('%z').
+
+    Parameters:
+    - offset (timedelta): Offset from UTC.
+
+    Returns:
+    - str: Timezone offset in the format '±HHMM' (with seconds appended if any).
+    """
+    total_seconds = int(offset.total_seconds())
+    sign = '-' if total_seconds < 0 else '+'
+    minutes, seconds = divmod(abs(total_seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    formatted = f"{sign}{hours:02d}{minutes:02d}"
+    return f"{formatted}{seconds:02d}" if seconds else formatted
+
+
 def get_timezone_offset_from_name(timezone_name):
     """
     Get the timezone offset from the given timezone name.
@@ -30,6 +91,8 @@ def get_timezone_offset_from_name(timezone_name):
     str: String representing the timezone offset (e.g., '-05:00').
     """
     # Get the timezone object
+    import pytz
+
     tz = pytz.timezone(timezone_name)
 
     # Get the current time in the timezone
@@ -22,4 +22,35 @@ class MultipleRatesError(CustomError):
 
     def __init__(self, message="Multiple rates found for price interval"):
         self.message = message
-        super().__init__(self.message)
\ No newline at end of file
+        super().__init__(self.message)
+class RatesValidationError(CustomError, ValueError):
+    """Exception raised for invalid rates, reporting every invalid rate at once
+
+    Attributes:
+        errors -- list of (index of the rate, explanation of the error), by index
+        message -- explanation of the error
+    """
+
+    def __init__(self, errors: list[tuple[int, str]], message=None):
+        self.errors = errors
+        if message is None:
+            message = errors[0][1] if len(errors) == 1 else f"{len(errors)} rates are invalid"
+        self.message = message
+        super().__init__(self.message)
+
+
+class RateConflictError(CustomError, ValueError):
+    """Exception raised for rates overlapping each other, reporting overlapping pairs at once
+
+    Attributes:
+        conflicts -- list of (index of a rate, index of a rate overlapping it), a sample if there are many
+        message -- explanation of the error
+    """
+
+    def __init__(self, conflicts: list[tuple[int, int]], message=None):
+        self.conflicts = conflicts
+        if message is None:
+            message = f"Rates {conflicts[0][0]} and {conflicts[0][1]} overlap" if len(conflicts) == 1 \
+                else f"{len(conflicts)} pairs of rates overlap"
+        self.message = message
+        super().__init__(self.message)
@@ -0,0 +1,122 @@
+import codecs
+import json
+import re
+from typing import IO, Any, Iterator
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = tuple(',:]}' + _WHITESPACE)
+_SKIP_WHITESPACE = re.compile(f'[{_WHITESPACE}]*').match
+
+
+class _Reader:
+    """
+    Text buffer over a stream, refilled in chunks and trimmed as values are consumed.
+    """
+
+    def __init__(self, stream: IO, chunk_size: int):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+        self._decoder = codecs.getincrementaldecoder('utf-8-sig')()
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        # A chunk ending within a UTF-8 sequence decodes to nothing until the sequence is complete
+        while isinstance(chunk, bytes):
+            data = chunk
+            chunk = self._decoder.decode(data, final=not data)
+            if chunk or not data:
+                break
+            chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Get the next significant character, skipping whitespace. Empty at the end of the stream.
+        """
+        while True:
+            self.position = _SKIP_WHITESPACE(self.buffer, self.position).end()
+            if self.position < len(self.buffer) or not self.fill():
+                return self.buffer[self.position:self.position + 1]
+
+    def expect(self, character: str) -> None:
+        if self.peek() != character:
+            raise json.JSONDecodeError(f"Expecting '{character}'", self.buffer, self.position)
+        self.position += 1
+
+    def value(self, decoder: json.JSONDecoder) -> Any:
+        """
+        Decode the next JSON value, reading more of the stream until it is complete.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # A value not followed by a delimiter, such as a number, may continue in the next chunk
+            if self.buffer[end:end + 1] not in _DELIMITERS and self.fill():
+                continue
+            self.position = end
+            return value
+
+
+def iter_array_items(stream: IO, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Parse the items of an array held by a key of a top-level JSON object, one at a time.
+
+    Only one item and a chunk of the stream are held in memory at once, so arbitrarily
+    large documents can be processed. Other keys of the object are parsed and discarded.
+
+    Parameters:
+    - stream (IO): Binary (UTF-8) or text stream holding the JSON document.
+    - key (str): Key of the array in the top-level object.
+    - chunk_size (int): Number of bytes or characters read from the stream at once.
+
+    Returns:
+    - Iterator[Any]: The decoded items of the array, in order. Nothing if the key is missing.
+
+    Raises:
+    - json.JSONDecodeError: If the document is not valid JSON.
+    - ValueError: If the document is not an object or the key does not hold an array.
+    """
+    reader = _Reader(stream, chunk_size)
+    decoder = json.JSONDecoder()
+
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        name = reader.value(decoder)
+        reader.expect(':')
+        if name == key:
+            if reader.peek() != '[':
+                raise ValueError(f"Expecting an array for '{key}'")
+            reader.expect('[')
+            if reader.peek() != ']':
+                while True:
+                    yield reader.value(decoder)
+                    if reader.peek() != ',':
+                        break
+                    reader.expect(',')
+            reader.expect(']')
+        else:
+            reader.value(decoder)
+
+        if reader.peek() != ',':
+            break
+        reader.expect(',')
+    reader.expect('}')
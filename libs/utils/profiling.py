@@ -0,0 +1,120 @@
+"""
+Profilers for single calls, producing pstats or collapsed-stack artifacts.
+
+A deterministic profile records every call through cProfile, at a large overhead. A
+sampled profile records the stack of the profiled thread at a fixed interval from
+another thread, in the collapsed format read by flame graph tools.
+"""
+import cProfile
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Optional
+
+PSTATS = 'pstats'
+COLLAPSED = 'collapsed'
+FORMATS = (PSTATS, COLLAPSED)
+
+EXTENSIONS = {PSTATS: '.prof', COLLAPSED: '.collapsed'}
+
+
+class StackSampler:
+    """
+    Sampling profiler recording the stacks of one thread while it is active.
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = 0.001):
+        """
+        Initialize a StackSampler object.
+
+        Parameters:
+        - thread_id (int): Identifier of the thread to sample. Defaults to the current thread.
+        - interval (float): Seconds between two samples.
+        """
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'StackSampler':
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                             .replace(';', ':'))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """
+        Get the samples in the collapsed format, one stack per line, outermost frame first.
+
+        Returns:
+        - str: Lines of frames separated by ';', followed by the number of samples.
+        """
+        return ''.join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+class CallProfiler:
+    """
+    Profiler of the calls made while it is active, in one of the FORMATS.
+    """
+
+    def __init__(self, output_format: str = PSTATS, interval: float = 0.001):
+        """
+        Initialize a CallProfiler object.
+
+        Parameters:
+        - output_format (str): 'pstats' for a deterministic profile, 'collapsed' for sampled stacks.
+        - interval (float): Seconds between two samples of a sampled profile.
+
+        Raises:
+        - ValueError: If the format is not supported.
+        """
+        if output_format not in FORMATS:
+            raise ValueError(f"Unsupported profile format: {output_format}")
+        self.output_format = output_format
+        self._profile = cProfile.Profile() if output_format == PSTATS else None
+        self._sampler = StackSampler(interval=interval) if output_format == COLLAPSED else None
+
+    def __enter__(self) -> 'CallProfiler':
+        if self._profile is not None:
+            self._profile.enable()
+        else:
+            self._sampler.__enter__()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._profile is not None:
+            self._profile.disable()
+        else:
+            self._sampler.__exit__(*exc_info)
+
+    def write(self, path: str) -> None:
+        """
+        Write the profile.
+
+        Parameters:
+        - path (str): Path of the file, usually ending with the extension of the format.
+        """
+        if self._profile is not None:
+            self._profile.dump_stats(path)
+        else:
+            with open(path, 'w') as file:
+                file.write(self._sampler.collapsed())
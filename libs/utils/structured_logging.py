@@ -0,0 +1,90 @@
+"""
+JSON log records written from a background thread.
+
+Loggers hand their records to a DeferredQueueHandler, which only puts them on a bounded
+queue: the message is neither formatted nor written by the thread that logs it. A
+QueueListener thread formats them as JSON lines and writes them to the real handlers.
+"""
+import json
+import logging
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Iterable, Optional
+
+# Attributes of every record, the other ones come from the `extra` argument of the logging calls
+_RECORD_ATTRIBUTES = frozenset(logging.LogRecord('', 0, '', 0, '', None, None).__dict__) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line, with their extra attributes as fields.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for name, value in record.__dict__.items():
+            if name not in _RECORD_ATTRIBUTES and not name.startswith('_'):
+                entry[name] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler leaving the formatting of records to the listener thread.
+
+    The arguments of a message are formatted after the logging call returns, so objects
+    that are modified afterwards should not be passed as arguments. Records logged while
+    the queue is full are dropped rather than blocking the caller, and counted in `dropped`.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def start_queue_logging(logger: logging.Logger, handlers: Iterable[logging.Handler],
+                        filters: Iterable[logging.Filter] = (), max_queued: int = 10000,
+                        level: Optional[int] = None) -> tuple[DeferredQueueHandler, QueueListener]:
+    """
+    Route the records of a logger through a queue to handlers running in a background thread.
+
+    Parameters:
+    - logger (Logger): Logger whose records, and the ones of its children, are queued.
+    - handlers (Iterable[Handler]): Handlers writing the records, from the listener thread.
+    - filters (Iterable[Filter]): Filters applied before queuing, in the thread of the logging call.
+    - max_queued (int): Number of records queued before new ones are dropped.
+    - level (int): Level of the logger. Leaves it unchanged if None.
+
+    Returns:
+    - tuple[DeferredQueueHandler, QueueListener]: The handler added to the logger, and the
+      started listener, to be stopped to flush the queue.
+    """
+    handler = DeferredQueueHandler(queue.Queue(max_queued))
+    for log_filter in filters:
+        handler.addFilter(log_filter)
+    listener = QueueListener(handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+    logger.addHandler(handler)
+    if level is not None:
+        logger.setLevel(level)
+    return handler, listener
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from libs.utils.datetime_helper import isodate_to_datetime
+
+
+@pytest.mark.parametrize("isodate", [
+    '2024-02-12T09:05:00-05:00',
+    '2024-02-12T09:05:00-0500',
+    '2024-02-12T09:05:00+05:30',
+    '2024-02-12T23:59:59+00:00',
+    '2024-02-12T09:05:00Z',
+    '2024-2-1T9:5:0+0000',
+])
+def test_isodate_to_datetime_matches_strptime(isodate):
+    assert isodate_to_datetime(isodate) == datetime.strptime(isodate, '%Y-%m-%dT%H:%M:%S%z')
+    assert isodate_to_datetime(isodate).utcoffset() == \
+        datetime.strptime(isodate, '%Y-%m-%dT%H:%M:%S%z').utcoffset()
+
+
+@pytest.mark.parametrize("isodate, expected", [
+    ('2024-02-12T09:05:00.5-05:00', datetime(2024, 2, 12, 9, 5, 0, 500000, timezone(timedelta(hours=-5)))),
+    ('2024-02-12T09:05:00.123456789Z', datetime(2024, 2, 12, 9, 5, 0, 123456, timezone.utc)),
+    ('2024-02-12T09:05-05:00', datetime(2024, 2, 12, 9, 5, tzinfo=timezone(timedelta(hours=-5)))),
+    ('2024-02-12T09:05:00+05', datetime(2024, 2, 12, 9, 5, tzinfo=timezone(timedelta(hours=5)))),
+])
+def test_isodate_to_datetime_extended_forms(isodate, expected):
+    parsed = isodate_to_datetime(isodate)
+    assert parsed == expected
+    assert parsed.utcoffset() == expected.utcoffset()
+
+
+@pytest.mark.parametrize("isodate", [
+    '2024-02-12T09:05:00',
+    '2024-02-30T09:05:00Z',
+    '2024-02-12 09:05:00Z',
+    '2024-02-12T25:05:00Z',
+    '2024-02-12T09:05:00+05:99',
+    '2024-02-12T09:05:00+0560',
+    'invalid',
+])
+def test_isodate_to_datetime_invalid(isodate):
+    with pytest.raises(ValueError):
+        isodate_to_datetime(isodate)
@@ -0,0 +1,66 @@
+import io
+import json
+
+import pytest
+
+from libs.utils.json_stream import iter_array_items
+
+DOCUMENT = {
+    "version": 1.25,
+    "meta": {"source": "test", "tags": ["a", "b"]},
+    "rates": [
+        {"days": "mon,tues", "times": "0900-2100", "tz": "America/Chicago", "price": 1500},
+        {"days": "sun", "times": "0100-0700", "tz": "Europe/Paris", "price": 925, "note": "café ]},"},
+        [1, 2, 3],
+        12345678901234567890,
+    ],
+    "after": [None, True],
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 65536])
+@pytest.mark.parametrize("as_bytes", [True, False])
+def test_iter_array_items(chunk_size, as_bytes):
+    # Prepare
+    text = json.dumps(DOCUMENT, indent=2, ensure_ascii=False)
+    stream = io.BytesIO(text.encode()) if as_bytes else io.StringIO(text)
+
+    # Run
+    items = list(iter_array_items(stream, 'rates', chunk_size))
+
+    # Expect
+    assert items == DOCUMENT['rates']
+
+
+@pytest.mark.parametrize("text", ['{}', '{"other": [1, 2]}', '{"rates": []}', ' { "rates" : [ ] } '])
+def test_iter_array_items_empty(text):
+    assert list(iter_array_items(io.StringIO(text), 'rates', 3)) == []
+
+
+@pytest.mark.parametrize("text", [
+    '',
+    '[]',
+    '{"rates": [1, 2',
+    '{"rates": [1 2]}',
+    '{"rates": [{"days": "mon"]}',
+    '{"rates": {"days": "mon"}}',
+])
+def test_iter_array_items_invalid(text):
+    with pytest.raises(ValueError):
+        list(iter_array_items(io.StringIO(text), 'rates', 4))
+
+
+def test_iter_array_items_is_incremental():
+    # Prepare
+    text = '{"rates": [' + ','.join(['{"price": 1}'] * 1000) + ', oops]}'
+    stream = io.StringIO(text)
+    items = iter_array_items(stream, 'rates', 64)
+
+    # Run
+    first = next(items)
+
+    # Expect
+    assert first == {"price": 1}
+    assert stream.tell() < 256
+    with pytest.raises(ValueError):
+        list(items)
@@ -0,0 +1,100 @@
+import gc
+import threading
+
+import pytest
+
+from libs.utils.metrics import Registry
+
+
+def test_histogram():
+    # Prepare
+    registry = Registry()
+    histogram = registry.histogram('latency_seconds', "Latency", ['route'], buckets=(0.1, 1))
+
+    # Run
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.labels('/prices').observe(value)
+
+    # Expect
+    assert registry.render().splitlines() == [
+        '# HELP latency_seconds Latency',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{route="/prices",le="0.1"} 2',
+        'latency_seconds_bucket{route="/prices",le="1"} 3',
+        'latency_seconds_bucket{route="/prices",le="+Inf"} 4',
+        'latency_seconds_sum{route="/prices"} 3.65',
+        'latency_seconds_count{route="/prices"} 4',
+    ]
+
+
+def test_counter_adds_up_threads():
+    # Prepare
+    registry = Registry()
+    counter = registry.counter('requests_total', "Requests")
+
+    def record():
+        for _ in range(1000):
+            counter.inc()
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+
+    # Run
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    record()
+
+    # Expect
+    assert counter.value == 5000
+    assert 'requests_total 5000' in registry.render()
+
+
+def test_counter_retires_finished_threads():
+    # Prepare
+    registry = Registry()
+    counter = registry.counter('requests_total', "Requests")
+    histogram = registry.histogram('latency_seconds', "Latency", buckets=(0.1, 1))
+
+    def record():
+        counter.inc()
+        histogram.observe(0.5)
+
+    # Run
+    for _ in range(20):
+        thread = threading.Thread(target=record)
+        thread.start()
+        thread.join()
+    del thread
+    gc.collect()
+
+    # Expect
+    assert counter.value == 20
+    assert counter._shards._shards == []
+    assert 'latency_seconds_count 20' in registry.render()
+
+
+def test_callback_and_label_escaping():
+    # Prepare
+    registry = Registry()
+    registry.callback('rates_count', "Rates\nstored", lambda: 12)
+    registry.callback('missing', "Omitted", lambda: None)
+    registry.counter('errors_total', "Errors", ['error']).labels('say "hi"\\').inc(2)
+
+    # Run
+    lines = registry.render().splitlines()
+
+    # Expect
+    assert lines[:3] == ['# HELP rates_count Rates\\nstored', '# TYPE rates_count gauge', 'rates_count 12']
+    assert 'errors_total{error="say \\"hi\\"\\\\"} 2' in lines
+    assert not any('missing' in line for line in lines)
+
+
+def test_registration_errors():
+    registry = Registry()
+    family = registry.histogram('latency_seconds', "Latency", ['route'])
+
+    with pytest.raises(ValueError):
+        registry.counter('latency_seconds', "Latency")
+    with pytest.raises(ValueError):
+        family.labels('/prices', 'GET')
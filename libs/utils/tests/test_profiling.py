@@ -0,0 +1,44 @@
+import pstats
+import time
+
+import pytest
+
+from libs.utils.profiling import CallProfiler, StackSampler
+
+
+def busy_wait(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_stack_sampler():
+    # Run
+    with StackSampler(interval=0.001) as sampler:
+        busy_wait(0.05)
+
+    # Expect
+    lines = sampler.collapsed().splitlines()
+    assert lines
+    _, count = lines[-1].rsplit(' ', 1)
+    assert int(count) > 0
+    assert any('busy_wait (test_profiling.py:' in line for line in lines)
+
+
+def test_call_profiler_pstats(tmp_path):
+    # Prepare
+    path = str(tmp_path / 'call.prof')
+
+    # Run
+    with CallProfiler('pstats') as profiler:
+        busy_wait(0.001)
+    profiler.write(path)
+
+    # Expect
+    functions = {function for _, _, function in pstats.Stats(path).stats}
+    assert 'busy_wait' in functions
+
+
+def test_call_profiler_format():
+    with pytest.raises(ValueError):
+        CallProfiler('flamegraph')
@@ -0,0 +1,66 @@
+import json
+import logging
+import queue
+
+from libs.utils.structured_logging import DeferredQueueHandler, JsonFormatter, start_queue_logging
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+def test_json_formatter():
+    # Prepare
+    record = logging.LogRecord('rates', logging.INFO, __file__, 1, "Priced %s", ('lot-1',), None)
+    record.route = '/prices'
+
+    # Run
+    entry = json.loads(JsonFormatter().format(record))
+
+    # Expect
+    assert entry['level'] == 'INFO'
+    assert entry['logger'] == 'rates'
+    assert entry['message'] == 'Priced lot-1'
+    assert entry['route'] == '/prices'
+    assert entry['time'].endswith('+00:00')
+
+
+def test_queue_logging_formats_in_listener():
+    # Prepare
+    logger = logging.getLogger('test_queue_logging')
+    logger.propagate = False
+    output = ListHandler()
+    output.setFormatter(JsonFormatter())
+    handler, listener = start_queue_logging(logger, [output], level=logging.INFO)
+
+    # Run
+    try:
+        logger.debug("Suppressed %s", 'debug')
+        logger.info("Fetching price for start: %s", '2024-02-12T09:05:00-06:00')
+        logger.error("Error fetching prices: %s", ValueError('bad date'))
+    finally:
+        listener.stop()
+        logger.removeHandler(handler)
+
+    # Expect
+    messages = [json.loads(line)['message'] for line in output.lines]
+    assert messages == ["Fetching price for start: 2024-02-12T09:05:00-06:00", "Error fetching prices: bad date"]
+
+
+def test_full_queue_drops_records():
+    # Prepare
+    handler = DeferredQueueHandler(queue.Queue(1))
+    record = logging.LogRecord('rates', logging.INFO, __file__, 1, "Priced", None, None)
+
+    # Run
+    handler.handle(record)
+    handler.handle(record)
+
+    # Expect
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
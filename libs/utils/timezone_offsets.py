@@ -0,0 +1,116 @@
+import time
+from bisect import bisect_right
+from datetime import datetime
+from typing import Iterable, Optional
+
+from libs.utils.datetime_helper import format_utc_offset
+
+DEFAULT_OFFSET_YEARS = (2000, 2040)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class TimezoneOffsetTable:
+    """
+    Precomputed UTC offsets for a set of timezone names.
+
+    For every timezone the DST transitions falling within a range of years are
+    resolved once, so the offset in effect at any instant is a bisect over the
+    transition times. Instants outside the range use the closest known offset.
+    """
+
+    def __init__(self, timezone_names: Iterable[str], years: tuple[int, int] = DEFAULT_OFFSET_YEARS):
+        """
+        Build the transition tables for the given timezones.
+
+        Parameters:
+        - timezone_names (Iterable[str]): Names of the timezones (e.g., 'America/Chicago').
+        - years (tuple[int, int]): First and last year covered by the tables.
+        """
+        self.years = years
+        self._tables = {name: self._build(name, years) for name in set(timezone_names)}
+        self._transitions = sorted({transition for transitions, _ in self._tables.values() for transition in transitions})
+
+    def __contains__(self, timezone_name: str) -> bool:
+        return timezone_name in self._tables
+
+    def offset_at(self, timezone_name: str, at: Optional[datetime] = None) -> str:
+        """
+        Get the offset of a timezone at the given instant.
+
+        Parameters:
+        - timezone_name (str): Name of the timezone (e.g., 'America/Chicago').
+        - at (datetime): Instant to resolve the offset for. Defaults to now.
+
+        Returns:
+        - str: Timezone offset in the format '±HHMM'.
+        """
+        return self.offset_at_timestamp(timezone_name, at.timestamp() if at is not None else time.time())
+
+    def offset_at_timestamp(self, timezone_name: str, timestamp: float) -> str:
+        """
+        Get the offset of a timezone at the given epoch timestamp.
+
+        Parameters:
+        - timezone_name (str): Name of the timezone (e.g., 'America/Chicago').
+        - timestamp (float): Seconds since the epoch.
+
+        Returns:
+        - str: Timezone offset in the format '±HHMM'.
+        """
+        transitions, offsets = self._tables[timezone_name]
+        return offsets[max(bisect_right(transitions, timestamp) - 1, 0)]
+
+    def transition_epoch(self, timestamp: float) -> int:
+        """
+        Get the number of transitions, across every timezone of the table, up to a timestamp.
+
+        The offsets of all timezones are constant between two transitions, so instants with
+        the same epoch resolve to the same offsets.
+
+        Parameters:
+        - timestamp (float): Seconds since the epoch.
+
+        Returns:
+        - int: Index of the span between transitions containing the timestamp.
+        """
+        return bisect_right(self._transitions, timestamp)
+
+    def transitions(self, timezone_name: str) -> list[float]:
+        """
+        Get the epoch timestamps at which the offset of a timezone changes.
+
+        Parameters:
+        - timezone_name (str): Name of the timezone (e.g., 'America/Chicago').
+
+        Returns:
+        - list[float]: Sorted transition timestamps. The first one starts the covered range.
+        """
+        return self._tables[timezone_name][0]
+
+    @staticmethod
+    def _build(timezone_name: str, years: tuple[int, int]) -> tuple[list[float], list[str]]:
+        import pytz
+
+        tz = pytz.timezone(timezone_name)
+        range_start = (datetime(years[0], 1, 1) - _EPOCH).total_seconds()
+        range_end = (datetime(years[1] + 1, 1, 1) - _EPOCH).total_seconds()
+
+        utc_transition_times = getattr(tz, '_utc_transition_times', None)
+        if not utc_transition_times:
+            offset = tz.utcoffset(datetime(years[0], 1, 1))
+            return [range_start], [format_utc_offset(offset)]
+
+        transitions, offsets = [], []
+        for transition_time, (utc_offset, _, _) in zip(utc_transition_times, tz._transition_info):
+            transition = (transition_time - _EPOCH).total_seconds()
+            if transition >= range_end:
+                break
+            if transition <= range_start and transitions:
+                # Only the last transition before the range is kept
+                transitions.pop()
+                offsets.pop()
+            transitions.append(transition)
+            offsets.append(format_utc_offset(utc_offset))
+
+        return transitions, offsets